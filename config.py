@@ -23,11 +23,22 @@ class Config:
     
     # Database configuration
     DATABASE_PATH: str = os.getenv('DATABASE_PATH', 'data.duckdb')
+    DATABASE_READ_CONCURRENCY: int = int(os.getenv('DATABASE_READ_CONCURRENCY', '8'))
+    DATABASE_EXECUTOR_WORKERS: int = int(os.getenv('DATABASE_EXECUTOR_WORKERS', '4'))
+    DATABASE_WRITE_BATCH: int = int(os.getenv('DATABASE_WRITE_BATCH', '100'))
+    DATABASE_WRITE_DELAY_MS: float = float(os.getenv('DATABASE_WRITE_DELAY_MS', '0'))
+    PARTICIPANT_CACHE_SIZE: int = int(os.getenv('PARTICIPANT_CACHE_SIZE', '10000'))
+    PARTICIPANT_CACHE_TTL: float = float(os.getenv('PARTICIPANT_CACHE_TTL', '30'))
+    REGISTRATION_RESERVATION_TTL: float = float(os.getenv('REGISTRATION_RESERVATION_TTL', '1800'))
     
     # Web admin configuration
     SECRET_KEY: str = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
     WEB_PORT: int = int(os.getenv('WEB_PORT', '5000'))
     WEB_HOST: str = os.getenv('WEB_HOST', '127.0.0.1')
+    ADMIN_PAGE_SIZE: int = int(os.getenv('ADMIN_PAGE_SIZE', '50'))
+    ADMIN_MAX_PAGE_SIZE: int = int(os.getenv('ADMIN_MAX_PAGE_SIZE', '500'))
+    SEARCH_INDEX_MERGE_ROWS: int = int(os.getenv('SEARCH_INDEX_MERGE_ROWS', '200000'))
+    STATS_RECONCILE_SECONDS: float = float(os.getenv('STATS_RECONCILE_SECONDS', '3600'))
     
     # File storage configuration
     UPLOAD_FOLDER: str = os.getenv('UPLOAD_FOLDER', 'uploads')
@@ -36,7 +47,26 @@ class Config:
     
     # Lottery configuration
     MAX_PARTICIPANTS: int = int(os.getenv('MAX_PARTICIPANTS', '10000'))
+    AUDIT_SIGNING_KEY_PATH: str = os.getenv('AUDIT_SIGNING_KEY_PATH', 'audit_signing_key.pem')
     
+    # Broadcast configuration
+    BROADCAST_RATE_LIMIT: float = float(os.getenv('BROADCAST_RATE_LIMIT', '25'))  # messages per second
+    BROADCAST_PER_CHAT_INTERVAL: float = float(os.getenv('BROADCAST_PER_CHAT_INTERVAL', '1.0'))  # seconds
+    BROADCAST_WORKERS: int = int(os.getenv('BROADCAST_WORKERS', '10'))
+    BROADCAST_MAX_RETRIES: int = int(os.getenv('BROADCAST_MAX_RETRIES', '3'))
+    BROADCAST_FLUSH_BATCH: int = int(os.getenv('BROADCAST_FLUSH_BATCH', '200'))
+    BROADCAST_FLUSH_INTERVAL_MS: int = int(os.getenv('BROADCAST_FLUSH_INTERVAL_MS', '1000'))
+
+    # Notification configuration
+    NOTIFICATION_WORKERS: int = int(os.getenv('NOTIFICATION_WORKERS', '4'))
+    NOTIFICATION_QUEUE_SIZE: int = int(os.getenv('NOTIFICATION_QUEUE_SIZE', '10000'))
+    NOTIFICATION_OUTBOX_BATCH: int = int(os.getenv('NOTIFICATION_OUTBOX_BATCH', '100'))
+    NOTIFICATION_OUTBOX_POLL_SECONDS: float = float(os.getenv('NOTIFICATION_OUTBOX_POLL_SECONDS', '5'))
+    NOTIFICATION_SENDING_TIMEOUT_SECONDS: int = int(os.getenv('NOTIFICATION_SENDING_TIMEOUT_SECONDS', '600'))
+    NOTIFICATION_MAX_ATTEMPTS: int = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '6'))
+    NOTIFICATION_RETRY_BASE_SECONDS: float = float(os.getenv('NOTIFICATION_RETRY_BASE_SECONDS', '5'))
+    NOTIFICATION_RETRY_MAX_SECONDS: float = float(os.getenv('NOTIFICATION_RETRY_MAX_SECONDS', '3600'))
+
     # File size limits (in bytes)
     MAX_FILE_SIZE: int = int(os.getenv('MAX_FILE_SIZE', '10485760'))  # 10MB
     
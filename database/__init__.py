@@ -3,5 +3,6 @@ Database package initialization
 """
 
 from .db_manager import DatabaseManager
+from .uniqueness import DuplicateParticipantError
 
-__all__ = ['DatabaseManager']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'DuplicateParticipantError']
\ No newline at end of file
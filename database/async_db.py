@@ -0,0 +1,59 @@
+"""
+Awaitable access to DatabaseManager for asyncio code
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseManager:
+    """
+    Awaitable versions of every public DatabaseManager method
+
+    Calls run on a dedicated pool with a fixed number of threads, each of
+    which gets its own DuckDB cursor, so a slow query only occupies one
+    pool thread instead of stalling the event loop. Use it through
+    DatabaseManager.aio:
+
+        participant = await db_manager.aio.get_participant_by_telegram_id(user_id)
+    """
+
+    # Methods that only make sense on the calling thread
+    _EXCLUDED = {'connect', 'close', 'init_database'}
+
+    def __init__(self, db_manager, max_workers: int):
+        self.db_manager = db_manager
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='duckdb')
+        self._methods: Dict[str, Callable] = {}
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith('_') or name in self._EXCLUDED:
+            raise AttributeError(name)
+
+        method = self._methods.get(name)
+        if method is None:
+            target = getattr(self.db_manager, name)
+            if not callable(target):
+                raise AttributeError(name)
+            method = self._wrap(target)
+            self._methods[name] = method
+        return method
+
+    def _wrap(self, target: Callable) -> Callable:
+        """Turn a blocking method into a coroutine function running on the pool"""
+        @functools.wraps(target)
+        async def method(*args, **kwargs) -> Any:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(target, *args, **kwargs)
+            )
+        return method
+
+    def shutdown(self) -> None:
+        """Wait for running queries and stop the pool threads"""
+        self._executor.shutdown(wait=True)
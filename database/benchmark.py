@@ -0,0 +1,129 @@
+"""
+Benchmark hot lookups before and after the index migration
+
+Usage:
+    python -m database.benchmark --rows 1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from database.db_manager import DatabaseManager
+from database.migrations import latest_version
+
+# Last migration before the indexes were added
+UNINDEXED_VERSION = 4
+
+RECIPIENTS_PER_BROADCAST = 1000
+
+# Multiplier coprime with the row count; scatters looked-up keys across the
+# table the way real Telegram ids and foreign keys arrive, so min/max zone
+# maps cannot prune the scans that an index would avoid
+SCATTER = 7919
+
+QUERIES = {
+    'participants by status': (
+        "SELECT COUNT(*) FROM participants WHERE status = 'approved'", lambda n: []
+    ),
+    'winners by participant_id': (
+        "SELECT * FROM winners WHERE participant_id = ?", lambda n: [f'p{n // 2}']
+    ),
+    'support_tickets by user_id': (
+        "SELECT * FROM support_tickets WHERE user_id = ? ORDER BY created_at DESC", lambda n: [n // 2]
+    ),
+    'support_messages by ticket_id': (
+        "SELECT * FROM support_messages WHERE ticket_id = ? ORDER BY sent_at", lambda n: [f't{n // 2}']
+    ),
+    'broadcast_recipients by broadcast_id, status': (
+        "SELECT COUNT(*) FROM broadcast_recipients WHERE broadcast_id = ? AND status = 'pending'",
+        lambda n: [f'b{n // RECIPIENTS_PER_BROADCAST // 2}']
+    ),
+}
+
+def load_rows(db_manager: DatabaseManager, rows: int) -> None:
+    """Fill every benchmarked table with synthetic rows"""
+    broadcasts = max(1, rows // RECIPIENTS_PER_BROADCAST)
+
+    if rows % SCATTER == 0:
+        raise ValueError(f"Row count must not be a multiple of {SCATTER}")
+
+    def load(conn):
+        conn.execute("""
+            INSERT INTO participants (id, telegram_id, full_name, phone_number, loyalty_card, status)
+            SELECT 'p' || i, i, 'Participant ' || i, '+7' || i, 'c' || i,
+                   CASE i % 3 WHEN 0 THEN 'approved' WHEN 1 THEN 'pending' ELSE 'rejected' END
+            FROM range(?) t(i)
+        """, [rows])
+        conn.execute("""
+            INSERT INTO winners (id, participant_id, seed_hash, draw_number)
+            SELECT 'w' || i, 'p' || (i * ? % ?), 'hash', i FROM range(?) t(i)
+        """, [SCATTER, rows, rows])
+        conn.execute("""
+            INSERT INTO support_tickets (id, ticket_number, user_id, subject)
+            SELECT 't' || i, 'T' || i, i * ? % ?, 'Subject' FROM range(?) t(i)
+        """, [SCATTER, rows, rows])
+        conn.execute("""
+            INSERT INTO support_messages (id, ticket_id, sender_id, sender_type, message_text)
+            SELECT 'm' || i, 't' || (i * ? % ?), i, 'user', 'Message' FROM range(?) t(i)
+        """, [SCATTER, rows, rows])
+        conn.execute("""
+            INSERT INTO broadcasts (id, title, message_text, target_audience, created_by)
+            SELECT 'b' || i, 'Broadcast', 'Text', 'all', 1 FROM range(?) t(i)
+        """, [broadcasts])
+        conn.execute("""
+            INSERT INTO broadcast_recipients (id, broadcast_id, participant_id, telegram_id)
+            SELECT 'r' || i, 'b' || (i * ? % ? // ?), 'p' || i, i FROM range(?) t(i)
+        """, [SCATTER, rows, RECIPIENTS_PER_BROADCAST, rows])
+
+    db_manager.write(load)
+
+def time_query(conn, query: str, params: List, repeat: int) -> float:
+    """Median execution time of a query in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def run_queries(db_manager: DatabaseManager, rows: int, repeat: int) -> Dict[str, float]:
+    """Time every benchmarked query"""
+    conn = db_manager.connect()
+    return {
+        name: time_query(conn, query, make_params(rows), repeat)
+        for name, (query, make_params) in QUERIES.items()
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows per table')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'benchmark.duckdb'))
+        db_manager.init_database(target_version=UNINDEXED_VERSION)
+
+        started = time.perf_counter()
+        load_rows(db_manager, args.rows)
+        print(f"Loaded {args.rows:,} rows per table in {time.perf_counter() - started:.1f}s")
+
+        before = run_queries(db_manager, args.rows, args.repeat)
+
+        started = time.perf_counter()
+        db_manager.init_database()
+        print(f"Migrated to version {latest_version()} in {time.perf_counter() - started:.1f}s\n")
+
+        after = run_queries(db_manager, args.rows, args.repeat)
+        db_manager.close()
+
+    print(f"{'query':<46}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in QUERIES:
+        print(f"{name:<46}{before[name]:>12.2f}{after[name]:>12.2f}{before[name] / after[name]:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Column-oriented query results
+"""
+
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+class ColumnarResult:
+    """
+    Query result stored as one NumPy array per column
+
+    Built straight from DuckDB's fetchnumpy(), so a 100k-row result costs a
+    handful of arrays instead of 100k dicts. Columns containing NULLs are
+    masked arrays. Rows can still be read one at a time through RowView
+    when a template or caller needs key or attribute access.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_cursor(cls, cursor) -> 'ColumnarResult':
+        """Fetch the remaining result of an executed query"""
+        return cls(cursor.fetchnumpy())
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __iter__(self) -> Iterator['RowView']:
+        for index in range(self._length):
+            yield RowView(self, index)
+
+    def row(self, index: int) -> 'RowView':
+        """Return a view of one row (negative indexes count from the end)"""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Row index out of range")
+        return RowView(self, index)
+
+    def value(self, name: str, index: int) -> Any:
+        """Return one cell as a plain Python value (None for NULL)"""
+        value = self.columns[name][index]
+        if value is np.ma.masked:
+            return None
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def take(self, mask_or_indexes) -> 'ColumnarResult':
+        """Return the rows selected by a boolean mask or an index array"""
+        return ColumnarResult({name: column[mask_or_indexes] for name, column in self.columns.items()})
+
+    def to_pandas(self):
+        """Build a pandas DataFrame over the column arrays"""
+        import pandas as pd
+        return pd.DataFrame(self.columns, copy=False)
+
+    def to_arrow(self):
+        """Build a pyarrow Table (requires the optional pyarrow package)"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow is required for Arrow results: pip install pyarrow")
+        return pa.table({name: pa.array(column) for name, column in self.columns.items()})
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Materialize every row as a dict (only for small results)"""
+        return [row.to_dict() for row in self]
+
+class RowView:
+    """Read-only key and attribute access to one row of a ColumnarResult"""
+
+    __slots__ = ('_result', '_index')
+
+    def __init__(self, result: ColumnarResult, index: int):
+        self._result = result
+        self._index = index
+
+    def __getitem__(self, name: str) -> Any:
+        return self._result.value(name, self._index)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._result.value(name, self._index)
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._result
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name not in self._result:
+            return default
+        return self._result.value(name, self._index)
+
+    def keys(self) -> List[str]:
+        return self._result.names
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: self._result.value(name, self._index) for name in self._result.names}
+
+    def __repr__(self) -> str:
+        return f"RowView({self.to_dict()!r})"
@@ -0,0 +1,147 @@
+"""
+Thread-safe access to a DuckDB database file
+"""
+
+import atexit
+import duckdb
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from database.writer import WriteQueue
+
+logger = logging.getLogger(__name__)
+
+class ConnectionManager:
+    """
+    Owns one DuckDB database instance and hands out a cursor per thread
+
+    A DuckDBPyConnection must not be used from several threads at once, so
+    every thread (the bot event loop, Flask request threads, the background
+    loop) gets its own cursor on the shared instance. Managers are shared
+    per database file, so the bot and the admin panel in one process use
+    the same instance. Read queries can additionally be capped with a
+    semaphore so a burst of admin panel reports cannot starve bot traffic.
+    All writes go through the manager's single WriteQueue, and caches of
+    the file's rows are shared through shared() so every user of the
+    manager sees the same invalidations.
+    """
+
+    _instances: Dict[str, 'ConnectionManager'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str, read_concurrency: int, write_batch: int,
+                 write_delay_ms: float = 0):
+        self.db_path = db_path
+        self.read_concurrency = read_concurrency
+        self.writer = WriteQueue(self, write_batch, write_delay_ms)
+        self._root = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cursors = weakref.WeakSet()
+        self._read_slots = threading.BoundedSemaphore(read_concurrency)
+        self._shared: Dict[str, Any] = {}
+        self._users = 0
+        self._closed = False
+
+    @classmethod
+    def acquire(cls, db_path: str, read_concurrency: int, write_batch: int,
+                write_delay_ms: float = 0) -> 'ConnectionManager':
+        """Return the manager for a database file, creating it on first use"""
+        with cls._instances_lock:
+            manager = cls._instances.get(db_path)
+            if manager is None:
+                manager = cls(db_path, read_concurrency, write_batch, write_delay_ms)
+                cls._instances[db_path] = manager
+            manager._users += 1
+            return manager
+
+    def release(self) -> None:
+        """Drop one user of the manager, closing the database after the last one"""
+        with self._instances_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            self._instances.pop(self.db_path, None)
+        self.close()
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        Close every open database (registered with atexit)
+
+        Call it on shutdown after the last write: it stops the writers and
+        checkpoints, so a clean exit leaves no WAL to replay.
+        """
+        with cls._instances_lock:
+            managers = list(cls._instances.values())
+            cls._instances.clear()
+        for manager in managers:
+            manager.close()
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """Return the calling thread's cursor, creating it on first use"""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"Database {self.db_path} is closed")
+                if self._root is None:
+                    self._root = duckdb.connect(self.db_path)
+                    logger.info(f"Opened DuckDB database {self.db_path}")
+                cursor = self._root.cursor()
+                self._cursors.add(cursor)
+            self._local.cursor = cursor
+        return cursor
+
+    def shared(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the object registered under name, creating it with factory on first use"""
+        with self._lock:
+            if name not in self._shared:
+                self._shared[name] = factory()
+            return self._shared[name]
+
+    @contextmanager
+    def reading(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Hold one of the read slots while running read queries"""
+        # Nested reads on the same thread reuse the slot already held
+        if getattr(self._local, 'reading', False):
+            yield self.cursor()
+            return
+
+        with self._read_slots:
+            self._local.reading = True
+            try:
+                yield self.cursor()
+            finally:
+                self._local.reading = False
+
+    def close(self) -> None:
+        """Apply queued writes, checkpoint, and close every cursor and the database instance"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self.writer.stop()
+        with self._lock:
+            for cursor in list(self._cursors):
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            self._cursors = weakref.WeakSet()
+            self._local = threading.local()
+
+            if self._root is not None:
+                # After the cursors, whose open transactions would block it
+                try:
+                    self._root.execute("CHECKPOINT")
+                except Exception as e:
+                    logger.warning(f"Checkpoint of {self.db_path} on close failed: {e}")
+                self._root.close()
+                self._root = None
+
+atexit.register(ConnectionManager.close_all)
@@ -3,162 +3,160 @@ Database manager for DuckDB operations
 """
 
 import duckdb
+import json
+import numpy as np
+import time
 import uuid
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
+from config import Config
+from database.async_db import AsyncDatabaseManager
+from database.cache import MISSING, TTLCache
+from database.columnar import ColumnarResult
+from database.pagination import Page, fetch_page, fetch_ranked_page
+from database import search
+from database import snapshots
+from database import stats
+from database import migrations
+from database.uniqueness import LOYALTY_CARD, PHONE_NUMBER, DuplicateParticipantError, UniquenessIndex
+from database.connection import ConnectionManager
+
 logger = logging.getLogger(__name__)
 
+# Columns that may be projected in get_all_participants_columns
+PARTICIPANT_COLUMNS = {
+    'id', 'telegram_id', 'username', 'full_name', 'phone_number', 'loyalty_card',
+    'leaflet_photo_path', 'registration_date', 'status', 'admin_notes'
+}
+
+# Approved participants without a valid win (FROM and WHERE clauses)
+ELIGIBLE_PARTICIPANTS_SQL = """
+    FROM participants p
+    WHERE p.status = 'approved'
+      AND NOT EXISTS (
+          SELECT 1 FROM winners w WHERE w.participant_id = p.id AND w.is_valid = TRUE
+      )
+"""
+
+def read_query(method):
+    """Run a read-only DatabaseManager method inside a read slot"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.connections.reading():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class DatabaseManager:
     """Manages DuckDB database operations"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, read_concurrency: int = None):
         self.db_path = db_path
-        self.connection = None
+        self.connections = ConnectionManager.acquire(
+            db_path, read_concurrency or Config.DATABASE_READ_CONCURRENCY,
+            Config.DATABASE_WRITE_BATCH, Config.DATABASE_WRITE_DELAY_MS
+        )
+        self._aio = None
+        self._stats_reconciled_at = None
+        # Shared with every manager of the file, so admin panel changes reach the bot
+        self.participant_cache = self.connections.shared('participant_cache', lambda: TTLCache(
+            Config.PARTICIPANT_CACHE_SIZE, Config.PARTICIPANT_CACHE_TTL
+        ))
+        self.uniqueness = self.connections.shared('uniqueness_index', lambda: UniquenessIndex(
+            Config.REGISTRATION_RESERVATION_TTL
+        ))
+    
+    @property
+    def aio(self) -> AsyncDatabaseManager:
+        """Awaitable versions of the methods for use in async handlers"""
+        if self._aio is None:
+            self._aio = AsyncDatabaseManager(self, Config.DATABASE_EXECUTOR_WORKERS)
+        return self._aio
         
     def connect(self) -> duckdb.DuckDBPyConnection:
-        """Create and return database connection"""
-        if not self.connection:
-            self.connection = duckdb.connect(self.db_path)
-        return self.connection
+        """Return the database cursor of the calling thread"""
+        return self.connections.cursor()
     
-    def init_database(self) -> None:
-        """Initialize database with all required tables"""
-        conn = self.connect()
-        
-        # Create participants table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS participants (
-                id VARCHAR PRIMARY KEY,
-                telegram_id BIGINT UNIQUE NOT NULL,
-                username VARCHAR,
-                full_name VARCHAR NOT NULL,
-                phone_number VARCHAR UNIQUE NOT NULL,
-                loyalty_card VARCHAR UNIQUE NOT NULL,
-                leaflet_photo_path VARCHAR,
-                registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status VARCHAR DEFAULT 'pending',
-                admin_notes TEXT
-            )
-        """)
-        
-        # Create winners table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS winners (
-                id VARCHAR PRIMARY KEY,
-                participant_id VARCHAR NOT NULL,
-                draw_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                seed_hash VARCHAR NOT NULL,
-                draw_number INTEGER DEFAULT 1,
-                is_valid BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (participant_id) REFERENCES participants(id)
-            )
-        """)
-        
-        # Create admin_logs table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS admin_logs (
-                id VARCHAR PRIMARY KEY,
-                admin_id BIGINT NOT NULL,
-                action VARCHAR NOT NULL,
-                target_participant_id VARCHAR,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                details TEXT,
-                FOREIGN KEY (target_participant_id) REFERENCES participants(id)
-            )
-        """)
-        
-        # Create support_tickets table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS support_tickets (
-                id VARCHAR PRIMARY KEY,
-                ticket_number VARCHAR UNIQUE NOT NULL,
-                user_id BIGINT NOT NULL,
-                username VARCHAR,
-                participant_id VARCHAR,
-                status VARCHAR DEFAULT 'open',
-                priority VARCHAR DEFAULT 'medium',
-                subject VARCHAR NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                closed_at TIMESTAMP,
-                assigned_admin BIGINT,
-                FOREIGN KEY (participant_id) REFERENCES participants(id)
-            )
-        """)
-        
-        # Create support_messages table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS support_messages (
-                id VARCHAR PRIMARY KEY,
-                ticket_id VARCHAR NOT NULL,
-                sender_id BIGINT NOT NULL,
-                sender_type VARCHAR NOT NULL,
-                message_text TEXT NOT NULL,
-                attachment_path VARCHAR,
-                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_read BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (ticket_id) REFERENCES support_tickets(id)
-            )
-        """)
-        
-        # Create broadcasts table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS broadcasts (
-                id VARCHAR PRIMARY KEY,
-                title VARCHAR NOT NULL,
-                message_text TEXT NOT NULL,
-                message_type VARCHAR DEFAULT 'text',
-                image_path VARCHAR,
-                target_audience VARCHAR NOT NULL,
-                created_by BIGINT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                scheduled_at TIMESTAMP,
-                status VARCHAR DEFAULT 'draft',
-                total_recipients INTEGER DEFAULT 0,
-                sent_count INTEGER DEFAULT 0,
-                failed_count INTEGER DEFAULT 0
-            )
-        """)
+    def write(self, fn: Callable, *args) -> Any:
+        """
+        Apply a mutation through the single database writer
+        
+        fn is called with the writer's cursor and the given arguments inside a
+        transaction that may be shared with other queued writes. Returns fn's
+        result once the transaction is committed.
+        """
+        return self.connections.writer.write(fn, *args)
+    
+    def init_database(self, target_version: int = None) -> None:
+        """Create or upgrade the schema by applying pending migrations"""
+        self.write(migrations.create_migrations_table)
         
-        # Create broadcast_recipients table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS broadcast_recipients (
-                id VARCHAR PRIMARY KEY,
-                broadcast_id VARCHAR NOT NULL,
-                participant_id VARCHAR,
-                telegram_id BIGINT NOT NULL,
-                status VARCHAR DEFAULT 'pending',
-                sent_at TIMESTAMP,
-                error_message TEXT,
-                FOREIGN KEY (broadcast_id) REFERENCES broadcasts(id),
-                FOREIGN KEY (participant_id) REFERENCES participants(id)
-            )
-        """)
+        pending = migrations.get_pending_migrations(self.connect(), target_version)
+        for version, description, statements in pending:
+            # One transaction per migration, so a failure keeps the earlier ones
+            self.write(migrations.apply_migration, version, description, statements)
         
-        logger.info("Database initialized successfully")
+        self._uniqueness_index()
+        logger.info(f"Database initialized successfully ({len(pending)} migrations applied)")
     
     # Participant operations
     def add_participant(self, telegram_id: int, username: str, full_name: str, 
                        phone_number: str, loyalty_card: str, 
                        leaflet_photo_path: str = None) -> str:
-        """Add new participant and return participant ID"""
-        conn = self.connect()
+        """
+        Add new participant and return participant ID
+        
+        Raises DuplicateParticipantError if the Telegram account, phone number
+        or loyalty card is already registered, or the phone or card is
+        reserved by another user's registration.
+        """
         participant_id = str(uuid.uuid4())
         
-        conn.execute("""
-            INSERT INTO participants 
-            (id, telegram_id, username, full_name, phone_number, loyalty_card, leaflet_photo_path)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, [participant_id, telegram_id, username, full_name, phone_number, loyalty_card, leaflet_photo_path])
+        index = self._uniqueness_index()
+        for field, value in ((PHONE_NUMBER, phone_number), (LOYALTY_CARD, loyalty_card)):
+            if index.is_taken(field, value, telegram_id):
+                raise DuplicateParticipantError(field, value)
         
+        def insert(conn):
+            # Sees registrations committed or queued ahead in this transaction,
+            # which the in-memory index only learns about after the commit
+            self._check_unique_fields(conn, telegram_id, phone_number, loyalty_card)
+            conn.execute("""
+                INSERT INTO participants 
+                (id, telegram_id, username, full_name, phone_number, loyalty_card, leaflet_photo_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [participant_id, telegram_id, username, full_name, phone_number, loyalty_card, leaflet_photo_path])
+            stats.count_registration(conn, participant_id)
+            conn.execute(search.INSERT_RECENT_GRAMS_SQL, [telegram_id])
+            return conn.execute("SELECT COUNT(*) FROM participant_search_grams_recent").fetchone()[0]
+        
+        recent_grams = self.write(insert)
+        index.add(phone_number, loyalty_card)
+        index.release(telegram_id)
+        self.participant_cache.invalidate(telegram_id)
+        if recent_grams >= Config.SEARCH_INDEX_MERGE_ROWS:
+            # Queued without waiting; the merge rewrites the whole sorted table
+            self.connections.writer.submit(self._merge_search_grams)
         logger.info(f"Added participant {participant_id} (telegram_id: {telegram_id})")
         return participant_id
     
     def get_participant_by_telegram_id(self, telegram_id: int) -> Optional[Dict]:
-        """Get participant by Telegram ID"""
+        """Get participant by Telegram ID, from the participant cache when possible"""
+        participant = self.participant_cache.get(telegram_id)
+        if participant is MISSING:
+            generation = self.participant_cache.generation()
+            participant = self._load_participant_by_telegram_id(telegram_id)
+            self.participant_cache.put(telegram_id, participant, generation)
+        
+        # Callers may modify the dict they get
+        return dict(participant) if participant is not None else None
+    
+    @read_query
+    def _load_participant_by_telegram_id(self, telegram_id: int) -> Optional[Dict]:
+        """Query a participant by Telegram ID"""
         conn = self.connect()
         result = conn.execute("""
             SELECT * FROM participants WHERE telegram_id = ?
@@ -169,6 +167,7 @@ class DatabaseManager:
             return dict(zip(columns, result))
         return None
     
+    @read_query
     def get_participant_by_id(self, participant_id: str) -> Optional[Dict]:
         """Get participant by ID"""
         conn = self.connect()
@@ -182,39 +181,91 @@ class DatabaseManager:
         return None
     
     def update_participant_status(self, participant_id: str, status: str, 
-                                admin_id: int, notes: str = None) -> bool:
-        """Update participant status"""
-        conn = self.connect()
-        
-        # Update participant
-        conn.execute("""
-            UPDATE participants 
-            SET status = ?, admin_notes = ?
-            WHERE id = ?
-        """, [status, notes, participant_id])
-        
-        # Log admin action
-        self.log_admin_action(admin_id, "status_change", participant_id, 
-                            f"Status changed to {status}")
+                                admin_id: int, notes: str = None, notify: bool = False) -> bool:
+        """Update participant status, optionally queueing a notification in the outbox"""
+        def update(conn):
+            previous = conn.execute("""
+                SELECT status, telegram_id FROM participants WHERE id = ?
+            """, [participant_id]).fetchone()
+            
+            # Update participant
+            conn.execute("""
+                UPDATE participants 
+                SET status = ?, admin_notes = ?
+                WHERE id = ?
+            """, [status, notes, participant_id])
+            
+            if previous and previous[0] != status:
+                if previous[0] is not None:
+                    stats.add_to_counter(conn, stats.STATUS_PREFIX + previous[0], -1)
+                stats.add_to_counter(conn, stats.STATUS_PREFIX + status, 1)
+            
+            # Log admin action
+            self._insert_admin_log(conn, admin_id, "status_change", participant_id, 
+                                   f"Status changed to {status}")
+            
+            if notify:
+                participant = conn.execute("""
+                    SELECT telegram_id, full_name FROM participants WHERE id = ?
+                """, [participant_id]).fetchone()
+                
+                if participant:
+                    self._insert_notification(conn, participant[0], 'status_change', {
+                        'participant_name': participant[1],
+                        'new_status': status,
+                        'admin_notes': notes or None
+                    })
+            
+            return previous[1] if previous else None
         
+        telegram_id = self.write(update)
+        if telegram_id is not None:
+            self.participant_cache.invalidate(telegram_id)
         return True
     
-    def check_phone_exists(self, phone_number: str) -> bool:
-        """Check if phone number already exists"""
-        conn = self.connect()
-        result = conn.execute("""
-            SELECT COUNT(*) FROM participants WHERE phone_number = ?
-        """, [phone_number]).fetchone()
-        return result[0] > 0
+    def _check_unique_fields(self, conn: duckdb.DuckDBPyConnection, telegram_id: int,
+                             phone_number: str, loyalty_card: str) -> None:
+        """Raise DuplicateParticipantError if a participant already holds one of the unique values"""
+        taken = conn.execute("""
+            SELECT EXISTS (SELECT 1 FROM participants WHERE telegram_id = ?),
+                   EXISTS (SELECT 1 FROM participants WHERE phone_number = ?),
+                   EXISTS (SELECT 1 FROM participants WHERE loyalty_card = ?)
+        """, [telegram_id, phone_number, loyalty_card]).fetchone()
+        
+        fields = (('telegram_id', telegram_id), (PHONE_NUMBER, phone_number), (LOYALTY_CARD, loyalty_card))
+        for is_taken, (field, value) in zip(taken, fields):
+            if is_taken:
+                raise DuplicateParticipantError(field, value)
     
-    def check_loyalty_card_exists(self, loyalty_card: str) -> bool:
-        """Check if loyalty card already exists"""
-        conn = self.connect()
-        result = conn.execute("""
-            SELECT COUNT(*) FROM participants WHERE loyalty_card = ?
-        """, [loyalty_card]).fetchone()
-        return result[0] > 0
+    def _uniqueness_index(self) -> UniquenessIndex:
+        """Return the uniqueness index, loading it on first use"""
+        index = self.uniqueness
+        if not index.loaded:
+            with self.connections.reading():
+                index.load(self.connect())
+        return index
+    
+    def check_phone_exists(self, phone_number: str, telegram_id: int = None) -> bool:
+        """Check if phone number is registered or reserved by a user other than telegram_id"""
+        return self._uniqueness_index().is_taken(PHONE_NUMBER, phone_number, telegram_id)
     
+    def check_loyalty_card_exists(self, loyalty_card: str, telegram_id: int = None) -> bool:
+        """Check if loyalty card is registered or reserved by a user other than telegram_id"""
+        return self._uniqueness_index().is_taken(LOYALTY_CARD, loyalty_card, telegram_id)
+    
+    def reserve_phone_number(self, phone_number: str, telegram_id: int) -> bool:
+        """Reserve a phone number for telegram_id's registration; False if it is taken"""
+        return self._uniqueness_index().reserve(PHONE_NUMBER, phone_number, telegram_id)
+    
+    def reserve_loyalty_card(self, loyalty_card: str, telegram_id: int) -> bool:
+        """Reserve a loyalty card for telegram_id's registration; False if it is taken"""
+        return self._uniqueness_index().reserve(LOYALTY_CARD, loyalty_card, telegram_id)
+    
+    def release_registration(self, telegram_id: int) -> None:
+        """Drop the reservations of an abandoned registration"""
+        self.uniqueness.release(telegram_id)
+    
+    @read_query
     def get_all_participants(self, status: str = None) -> List[Dict]:
         """Get all participants, optionally filtered by status"""
         conn = self.connect()
@@ -231,20 +282,217 @@ class DatabaseManager:
         columns = [desc[0] for desc in conn.description]
         return [dict(zip(columns, row)) for row in results]
     
+    @read_query
+    def get_participants_page(self, status: str = None, after: str = None,
+                              before: str = None, limit: int = None) -> Page:
+        """Get one page of participants, newest first, optionally filtered by status"""
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        
+        return fetch_page(
+            self.connect(), "*", "participants", conditions, params,
+            key=('registration_date', 'id'), key_fields=('registration_date', 'id'),
+            after=after, before=before, limit=limit
+        )
+    
+    def _merge_search_grams(self, conn: duckdb.DuckDBPyConnection) -> None:
+        """Merge the grams of recent participants into the sorted search table"""
+        # Several registrations may have queued a merge
+        if conn.execute("SELECT COUNT(*) FROM participant_search_grams_recent").fetchone()[0] == 0:
+            return
+        for statement in search.MERGE_GRAMS_SQL:
+            conn.execute(statement)
+        logger.info("Merged recent participant search grams")
+    
+    @read_query
+    def search_participants(self, query: str, status: str = None, after: str = None,
+                            before: str = None, limit: int = None) -> Page:
+        """
+        Search participants by name, username, phone or loyalty card
+        
+        Candidates are found through the trigram index and checked against
+        the normalized text. Results are ranked: whole name, username, phone
+        or card first, then matches at the start of a word, then anywhere;
+        newest first within a rank. Every word of the query must match.
+        """
+        words = search.normalize_query(query)
+        if not words:
+            return self.get_participants_page(status=status, after=after, before=before, limit=limit)
+        
+        conn = self.connect()
+        grams = search.query_grams(words)
+        # Equality lookups, one per gram and table, so each one reads only
+        # the row groups of the sorted table that can contain the gram
+        lookups = [(f"SELECT telegram_id FROM {table} WHERE gram = ?", gram)
+                   for gram in grams for table in search.GRAM_TABLES]
+        
+        counts = dict.fromkeys(grams, 0)
+        for gram, count in conn.execute(
+            " UNION ALL ".join(f"SELECT ?, COUNT(*) FROM ({lookup})" for lookup, _ in lookups),
+            [value for _, gram in lookups for value in (gram, gram)]
+        ).fetchall():
+            counts[gram] += count
+        total = conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+        
+        rarest = sorted(grams, key=counts.get)[:search.CANDIDATE_GRAMS]
+        candidates, candidate_params = "", []
+        if counts[rarest[0]] <= total * search.CANDIDATE_MAX_FRACTION:
+            # Intersect the postings of the rarest grams; the text check
+            # below filters out what the skipped grams would have
+            selected = [(lookup, gram) for lookup, gram in lookups if gram in rarest]
+            candidates = f"""
+                JOIN (
+                    SELECT telegram_id FROM ({" UNION ALL ".join(lookup for lookup, _ in selected)})
+                    GROUP BY telegram_id HAVING COUNT(*) = ?
+                ) candidates ON candidates.telegram_id = p.telegram_id
+            """
+            candidate_params = [gram for _, gram in selected] + [len(rarest)]
+        # Otherwise the grams match too many participants for the postings
+        # to be cheaper than checking the text of every row
+        
+        phrase = ' '.join(words)
+        where = "WHERE p.status = ?" if status else ""
+        filter_params = candidate_params + ([status] if status else [])
+        word_filters = " AND ".join(
+            "contains(doc, ?)" if len(word) >= 3 else "contains(' ' || doc, ?)" for word in words
+        )
+        params = [f' {phrase} ', f' {phrase}', *filter_params]
+        params.extend(word if len(word) >= 3 else f' {word}' for word in words)
+        
+        # OFFSET 0 keeps DuckDB from pushing the text check below the
+        # candidate filter, which would build the text of every participant
+        return fetch_ranked_page(conn, f"""
+            SELECT * EXCLUDE (doc),
+                   CASE WHEN contains(' ' || doc || ' ', ?) THEN 3
+                        WHEN contains(' ' || doc, ?) THEN 2
+                        ELSE 1 END AS search_rank
+            FROM (
+                SELECT p.*, {search.SEARCH_DOCUMENT} AS doc
+                FROM participants p
+                {candidates}
+                {where}
+                OFFSET 0
+            )
+            WHERE {word_filters}
+        """, params, key_fields=('search_rank', 'registration_date', 'id'),
+            after=after, before=before, limit=limit)
+    
+    @read_query
+    def get_all_participants_columns(self, status: str = None,
+                                     columns: List[str] = None) -> ColumnarResult:
+        """Columnar version of get_all_participants, optionally projected to some columns"""
+        if columns:
+            unknown = set(columns) - PARTICIPANT_COLUMNS
+            if unknown:
+                raise ValueError(f"Unknown participant columns: {', '.join(sorted(unknown))}")
+            projection = ', '.join(columns)
+        else:
+            projection = '*'
+        
+        conn = self.connect()
+        if status:
+            conn.execute(f"""
+                SELECT {projection} FROM participants WHERE status = ? ORDER BY registration_date DESC
+            """, [status])
+        else:
+            conn.execute(f"""
+                SELECT {projection} FROM participants ORDER BY registration_date DESC
+            """)
+        return ColumnarResult.from_cursor(conn)
+    
+    @read_query
+    def get_eligible_participant_ids(self) -> np.ndarray:
+        """Ids of the participants eligible for a draw, newest registration first"""
+        conn = self.connect()
+        conn.execute(f"""
+            SELECT p.id {ELIGIBLE_PARTICIPANTS_SQL}
+            ORDER BY p.registration_date DESC, p.id DESC
+        """)
+        return conn.fetchnumpy()['id']
+    
+    @read_query
+    def count_eligible_participants(self) -> int:
+        """Number of participants eligible for a draw"""
+        conn = self.connect()
+        return conn.execute(f"SELECT COUNT(*) {ELIGIBLE_PARTICIPANTS_SQL}").fetchone()[0]
+    
+    @read_query
+    def count_participants(self) -> int:
+        """Number of registered participants"""
+        conn = self.connect()
+        return conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+    
+    @read_query
+    def get_participants_by_ids(self, participant_ids: List[str]) -> List[Dict]:
+        """Get participants by ID, in the order of the given ids (missing ones are skipped)"""
+        if not participant_ids:
+            return []
+        
+        conn = self.connect()
+        results = conn.execute("""
+            SELECT * FROM participants WHERE id IN (SELECT unnest(?))
+        """, [list(participant_ids)]).fetchall()
+        
+        columns = [desc[0] for desc in conn.description]
+        by_id = {row[0]: dict(zip(columns, row)) for row in results}
+        return [by_id[participant_id] for participant_id in participant_ids if participant_id in by_id]
+    
     # Winner operations
     def add_winner(self, participant_id: str, seed_hash: str, draw_number: int = 1) -> str:
         """Add winner record"""
-        conn = self.connect()
         winner_id = str(uuid.uuid4())
         
-        conn.execute("""
-            INSERT INTO winners (id, participant_id, seed_hash, draw_number)
-            VALUES (?, ?, ?, ?)
-        """, [winner_id, participant_id, seed_hash, draw_number])
+        def insert(conn):
+            conn.execute("""
+                INSERT INTO winners (id, participant_id, seed_hash, draw_number)
+                VALUES (?, ?, ?, ?)
+            """, [winner_id, participant_id, seed_hash, draw_number])
+            stats.add_to_counter(conn, stats.TOTAL_WINNERS, 1)
         
+        self.write(insert)
         logger.info(f"Added winner {winner_id} (participant: {participant_id})")
         return winner_id
     
+    def add_winners(self, participant_ids: List[str], seed_hash: str,
+                    draw_number: int = None, snapshot: Dict[str, Any] = None) -> Tuple[int, List[str]]:
+        """
+        Add the winners of one draw in a single transaction
+        
+        Without draw_number the draw gets the number after the highest one
+        used so far, taken inside the transaction so concurrent draws cannot
+        share it. snapshot ({'seed', 'algorithm', 'participant_ids',
+        'merkle_root'}) is stored in draw_snapshots with the winners.
+        Returns (draw_number, winner ids in participant order).
+        """
+        winner_ids = [str(uuid.uuid4()) for _ in participant_ids]
+        
+        def insert(conn):
+            number = draw_number
+            if number is None:
+                number = conn.execute("SELECT COALESCE(MAX(draw_number), 0) + 1 FROM winners").fetchone()[0]
+            
+            conn.execute("""
+                INSERT INTO winners (id, participant_id, seed_hash, draw_number)
+                SELECT unnest(?), unnest(?), ?, ?
+            """, [winner_ids, list(participant_ids), seed_hash, number])
+            stats.add_to_counter(conn, stats.TOTAL_WINNERS, len(winner_ids))
+            
+            if snapshot is not None:
+                conn.execute(snapshots.INSERT_SNAPSHOT_SQL, [
+                    seed_hash, number, snapshot['seed'], snapshot['algorithm'],
+                    len(snapshot['participant_ids']),
+                    snapshots.encode_participant_ids(snapshot['participant_ids']),
+                    snapshot['merkle_root'], list(participant_ids)
+                ])
+            return number
+        
+        number = self.write(insert)
+        logger.info(f"Added {len(winner_ids)} winners of draw #{number}")
+        return number, winner_ids
+    
+    @read_query
     def get_winners(self) -> List[Dict]:
         """Get all winners with participant info"""
         conn = self.connect()
@@ -259,6 +507,42 @@ class DatabaseManager:
         columns = [desc[0] for desc in conn.description]
         return [dict(zip(columns, row)) for row in results]
     
+    @read_query
+    def get_winners_columns(self) -> ColumnarResult:
+        """Columnar version of get_winners"""
+        conn = self.connect()
+        conn.execute("""
+            SELECT w.*, p.full_name, p.phone_number, p.telegram_id
+            FROM winners w
+            JOIN participants p ON w.participant_id = p.id
+            WHERE w.is_valid = TRUE
+            ORDER BY w.draw_date DESC
+        """)
+        return ColumnarResult.from_cursor(conn)
+    
+    @read_query
+    def get_draw_snapshot(self, seed_hash: str) -> Optional[Dict]:
+        """Get the frozen participant pool of a draw, with participant_ids decoded"""
+        conn = self.connect()
+        result = conn.execute(snapshots.SELECT_SNAPSHOT_SQL, [seed_hash]).fetchone()
+        
+        if result:
+            columns = [desc[0] for desc in conn.description]
+            snapshot = dict(zip(columns, result))
+            snapshot['participant_ids'] = snapshots.decode_participant_ids(snapshot['participant_ids'])
+            return snapshot
+        return None
+    
+    @read_query
+    def get_draw_winner_participant_ids(self, seed_hash: str) -> List[str]:
+        """Participant ids of the winner rows of one draw or reroll, valid or not"""
+        conn = self.connect()
+        results = conn.execute("""
+            SELECT participant_id FROM winners WHERE seed_hash = ?
+        """, [seed_hash]).fetchall()
+        return [row[0] for row in results]
+    
+    @read_query
     def get_winner_by_id(self, winner_id: str) -> Optional[Dict]:
         """Get winner by ID with participant info"""
         conn = self.connect()
@@ -276,8 +560,8 @@ class DatabaseManager:
     
     def invalidate_winner(self, winner_id: str, admin_id: int, reason: str = None) -> bool:
         """Invalidate a winner (for reroll)"""
-        try:
-            conn = self.connect()
+        def invalidate(conn):
+            self._uncount_winner(conn, winner_id)
             
             # Invalidate the winner
             conn.execute("""
@@ -285,12 +569,16 @@ class DatabaseManager:
             """, [winner_id])
             
             # Log the action
-            self.log_admin_action(
+            self._insert_admin_log(
+                conn,
                 admin_id=admin_id,
                 action='invalidate_winner',
                 target_participant_id=None,
                 details=f'Winner {winner_id} invalidated. Reason: {reason or "No reason provided"}'
             )
+        
+        try:
+            self.write(invalidate)
             
             logger.info(f"Winner {winner_id} invalidated by admin {admin_id}")
             return True
@@ -301,24 +589,28 @@ class DatabaseManager:
     
     def delete_winner(self, winner_id: str, admin_id: int) -> bool:
         """Permanently delete a winner record"""
-        try:
-            conn = self.connect()
-            
-            # Get winner info before deletion for logging
-            winner = self.get_winner_by_id(winner_id)
-            if not winner:
-                return False
+        def delete(conn, winner):
+            self._uncount_winner(conn, winner_id)
             
             # Delete the winner
             conn.execute("DELETE FROM winners WHERE id = ?", [winner_id])
             
             # Log the action
-            self.log_admin_action(
+            self._insert_admin_log(
+                conn,
                 admin_id=admin_id,
                 action='delete_winner',
                 target_participant_id=winner.get('participant_id'),
                 details=f'Winner record deleted: {winner.get("full_name")} from draw #{winner.get("draw_number")}'
             )
+        
+        try:
+            # Get winner info before deletion for logging
+            winner = self.get_winner_by_id(winner_id)
+            if not winner:
+                return False
+            
+            self.write(delete, winner)
             
             logger.info(f"Winner {winner_id} deleted by admin {admin_id}")
             return True
@@ -327,11 +619,21 @@ class DatabaseManager:
             logger.error(f"Error deleting winner {winner_id}: {e}")
             return False
     
+    def _uncount_winner(self, conn: duckdb.DuckDBPyConnection, winner_id: str) -> None:
+        """Take a winner that is about to be invalidated or deleted out of the winners counter"""
+        row = conn.execute("SELECT is_valid FROM winners WHERE id = ?", [winner_id]).fetchone()
+        if row and row[0]:
+            stats.add_to_counter(conn, stats.TOTAL_WINNERS, -1)
+    
     # Admin logging
     def log_admin_action(self, admin_id: int, action: str, 
                         target_participant_id: str = None, details: str = None) -> str:
         """Log admin action"""
-        conn = self.connect()
+        return self.write(self._insert_admin_log, admin_id, action, target_participant_id, details)
+    
+    def _insert_admin_log(self, conn: duckdb.DuckDBPyConnection, admin_id: int, action: str,
+                          target_participant_id: str = None, details: str = None) -> str:
+        """Write an admin_logs row using the caller's connection (and transaction)"""
         log_id = str(uuid.uuid4())
         
         conn.execute("""
@@ -341,81 +643,203 @@ class DatabaseManager:
         
         return log_id
     
+    def get_participant_cache_stats(self) -> Dict[str, Any]:
+        """Hit and miss counters of the participant cache"""
+        return self.participant_cache.stats()
+    
     # Statistics
+    @read_query
     def get_statistics(self) -> Dict[str, Any]:
-        """Get general statistics"""
+        """
+        Get general statistics
+        
+        Reads the counters kept up to date by the writes that change them, so
+        the cost does not grow with the tables. They are recounted from the
+        tables in the background every STATS_RECONCILE_SECONDS.
+        """
         conn = self.connect()
         
-        stats = {}
+        reconciled_at = self._stats_reconciled_at
+        if reconciled_at is None or time.monotonic() - reconciled_at >= Config.STATS_RECONCILE_SECONDS:
+            self._stats_reconciled_at = time.monotonic()
+            # Queued without waiting; this read still sees the old counters
+            self.connections.writer.submit(self._reconcile_statistics)
         
-        # Total participants
-        result = conn.execute("SELECT COUNT(*) FROM participants").fetchone()
-        stats['total_participants'] = result[0]
+        counters = stats.read_counters(conn)
         
-        # Participants by status
-        results = conn.execute("""
-            SELECT status, COUNT(*) FROM participants GROUP BY status
-        """).fetchall()
-        stats['by_status'] = {row[0]: row[1] for row in results}
-        
-        # Total winners
-        result = conn.execute("SELECT COUNT(*) FROM winners WHERE is_valid = TRUE").fetchone()
-        stats['total_winners'] = result[0]
+        result = {
+            'total_participants': counters.get(stats.TOTAL_PARTICIPANTS, 0),
+            'by_status': {
+                name[len(stats.STATUS_PREFIX):]: value
+                for name, value in counters.items()
+                if name.startswith(stats.STATUS_PREFIX) and value
+            },
+            'total_winners': counters.get(stats.TOTAL_WINNERS, 0),
+        }
         
         # Registration trends (last 7 days)
         results = conn.execute("""
-            SELECT DATE(registration_date) as date, COUNT(*) as count
-            FROM participants 
-            WHERE registration_date >= CURRENT_DATE - INTERVAL '7 days'
-            GROUP BY DATE(registration_date)
-            ORDER BY date
+            SELECT day, registrations FROM stats_daily_registrations
+            WHERE day >= CURRENT_DATE - INTERVAL '7 days'
+            ORDER BY day
         """).fetchall()
-        stats['registration_trend'] = {str(row[0]): row[1] for row in results}
+        result['registration_trend'] = {str(row[0]): row[1] for row in results}
         
-        return stats
+        return result
+    
+    def reconcile_statistics(self) -> Dict[str, int]:
+        """Recount the statistics counters from the tables; returns the corrections applied"""
+        self._stats_reconciled_at = time.monotonic()
+        return self.write(self._reconcile_statistics)
+    
+    def _reconcile_statistics(self, conn: duckdb.DuckDBPyConnection) -> Dict[str, int]:
+        """Recount the counters inside the writer's transaction"""
+        drift = stats.recount(conn)
+        if drift:
+            logger.warning(f"Statistics counters drifted from the tables, corrected: {drift}")
+        return drift
     
     # Support ticket operations
     def create_support_ticket(self, user_id: int, username: str, subject: str, 
                             participant_id: str = None) -> str:
         """Create new support ticket"""
-        conn = self.connect()
         ticket_id = str(uuid.uuid4())
         ticket_number = f"T{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
         
-        conn.execute("""
-            INSERT INTO support_tickets 
-            (id, ticket_number, user_id, username, subject, participant_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, [ticket_id, ticket_number, user_id, username, subject, participant_id])
+        def insert(conn):
+            conn.execute("""
+                INSERT INTO support_tickets 
+                (id, ticket_number, user_id, username, subject, participant_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [ticket_id, ticket_number, user_id, username, subject, participant_id])
         
+        self.write(insert)
         logger.info(f"Created support ticket {ticket_number} for user {user_id}")
         return ticket_id
     
     def add_support_message(self, ticket_id: str, sender_id: int, sender_type: str, 
-                          message_text: str, attachment_path: str = None) -> str:
-        """Add message to support ticket"""
-        conn = self.connect()
+                          message_text: str, attachment_path: str = None,
+                          notify: bool = False) -> str:
+        """Add message to support ticket, optionally notifying the ticket author"""
         message_id = str(uuid.uuid4())
         
-        conn.execute("""
-            INSERT INTO support_messages 
-            (id, ticket_id, sender_id, sender_type, message_text, attachment_path)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, [message_id, ticket_id, sender_id, sender_type, message_text, attachment_path])
-        
-        # Update ticket timestamp
-        conn.execute("""
-            UPDATE support_tickets SET updated_at = CURRENT_TIMESTAMP WHERE id = ?
-        """, [ticket_id])
-        
+        def insert(conn):
+            conn.execute("""
+                INSERT INTO support_messages 
+                (id, ticket_id, sender_id, sender_type, message_text, attachment_path)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [message_id, ticket_id, sender_id, sender_type, message_text, attachment_path])
+            
+            # Update ticket timestamp
+            conn.execute("""
+                UPDATE support_tickets SET updated_at = CURRENT_TIMESTAMP WHERE id = ?
+            """, [ticket_id])
+            
+            if notify:
+                ticket = conn.execute("""
+                    SELECT st.user_id, st.ticket_number, p.full_name, st.username
+                    FROM support_tickets st
+                    LEFT JOIN participants p ON st.participant_id = p.id
+                    WHERE st.id = ?
+                """, [ticket_id]).fetchone()
+                
+                if ticket:
+                    self._insert_notification(conn, ticket[0], 'support_response', {
+                        'participant_name': ticket[2] or ticket[3] or '',
+                        'ticket_number': ticket[1],
+                        'response_text': message_text
+                    })
+        
+        self.write(insert)
         return message_id
     
+    # Notification outbox operations
+    def _insert_notification(self, conn: duckdb.DuckDBPyConnection, telegram_id: int,
+                             kind: str, payload: Dict[str, Any]) -> str:
+        """Write an outbox row using the caller's connection (and transaction)"""
+        notification_id = str(uuid.uuid4())
+        conn.execute("""
+            INSERT INTO notification_outbox (id, telegram_id, kind, payload)
+            VALUES (?, ?, ?, ?)
+        """, [notification_id, telegram_id, kind, json.dumps(payload, ensure_ascii=False)])
+        return notification_id
+    
+    def claim_due_notifications(self, limit: int) -> List[Dict]:
+        """
+        Mark up to limit due notifications as 'sending' and return them
+        
+        A claim holds a row for NOTIFICATION_SENDING_TIMEOUT_SECONDS; a row
+        still in 'sending' after that (its outcome was never recorded) is
+        claimed again.
+        """
+        def claim(conn):
+            results = conn.execute("""
+                SELECT id, telegram_id, kind, payload, attempts
+                FROM notification_outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at
+                LIMIT ?
+            """, [limit]).fetchall()
+            
+            if results:
+                conn.execute("""
+                    UPDATE notification_outbox
+                    SET status = 'sending',
+                        next_attempt_at = CURRENT_TIMESTAMP + to_seconds(CAST(? AS BIGINT))
+                    WHERE id IN (SELECT UNNEST(?))
+                """, [Config.NOTIFICATION_SENDING_TIMEOUT_SECONDS, [row[0] for row in results]])
+            return results
+        
+        results = self.write(claim)
+        return [
+            {'id': row[0], 'telegram_id': row[1], 'kind': row[2],
+             'payload': json.loads(row[3]), 'attempts': row[4]}
+            for row in results
+        ]
+    
+    def record_notification_outcomes(self, outcomes: List[tuple]) -> None:
+        """
+        Store delivery outcomes of claimed notifications
+        
+        Args:
+            outcomes: (id, status, attempts, next_attempt_at, last_error) tuples;
+                      status is 'sent', 'pending' (retry later) or 'failed'
+        """
+        if not outcomes:
+            return
+        
+        values = ', '.join(['(?, ?, ?, CAST(? AS TIMESTAMP), ?)'] * len(outcomes))
+        self.write(lambda conn: conn.execute(f"""
+            UPDATE notification_outbox
+            SET status = outcome.status,
+                attempts = outcome.attempts,
+                next_attempt_at = COALESCE(outcome.next_attempt_at, notification_outbox.next_attempt_at),
+                last_error = outcome.last_error,
+                sent_at = CASE WHEN outcome.status = 'sent'
+                               THEN CURRENT_TIMESTAMP ELSE notification_outbox.sent_at END
+            FROM (VALUES {values}) AS outcome(id, status, attempts, next_attempt_at, last_error)
+            WHERE notification_outbox.id = outcome.id
+        """, [value for outcome in outcomes for value in outcome]))
+    
+    def reset_stuck_notifications(self) -> int:
+        """Return notifications left in 'sending' by a crashed worker to the queue"""
+        result = self.write(lambda conn: conn.execute("""
+            UPDATE notification_outbox SET status = 'pending'
+            WHERE status = 'sending'
+        """).fetchone())
+        return result[0] if result else 0
+    
     def close(self) -> None:
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+        """Release the database connection"""
+        if self._aio is not None:
+            self._aio.shutdown()
+            self._aio = None
+        
+        if self.connections:
+            self.connections.release()
+            self.connections = None
     
+    @read_query
     def get_support_tickets(self, status: str = None) -> List[Dict]:
         """Get support tickets, optionally filtered by status"""
         conn = self.connect()
@@ -439,6 +863,47 @@ class DatabaseManager:
         columns = [desc[0] for desc in conn.description]
         return [dict(zip(columns, row)) for row in results]
     
+    @read_query
+    def get_support_tickets_page(self, status: str = None, after: str = None,
+                                 before: str = None, limit: int = None) -> Page:
+        """Get one page of support tickets, newest first, optionally filtered by status"""
+        conditions, params = [], []
+        if status:
+            conditions.append("st.status = ?")
+            params.append(status)
+        
+        return fetch_page(
+            self.connect(), "st.*, p.full_name as participant_name",
+            "support_tickets st LEFT JOIN participants p ON st.participant_id = p.id",
+            conditions, params,
+            key=('st.created_at', 'st.id'), key_fields=('created_at', 'id'),
+            after=after, before=before, limit=limit
+        )
+    
+    @read_query
+    def get_support_ticket_status_counts(self) -> Dict[str, int]:
+        """Count support tickets by status"""
+        conn = self.connect()
+        results = conn.execute("""
+            SELECT status, COUNT(*) FROM support_tickets GROUP BY status
+        """).fetchall()
+        return {row[0]: row[1] for row in results}
+    
+    @read_query
+    def get_user_support_tickets(self, user_id: int) -> List[Dict]:
+        """Get tickets created by a Telegram user, newest first"""
+        conn = self.connect()
+        results = conn.execute("""
+            SELECT ticket_number, subject, status, created_at
+            FROM support_tickets 
+            WHERE user_id = ?
+            ORDER BY created_at DESC
+        """, [user_id]).fetchall()
+        
+        columns = [desc[0] for desc in conn.description]
+        return [dict(zip(columns, row)) for row in results]
+    
+    @read_query
     def get_support_ticket_by_id(self, ticket_id: str) -> Optional[Dict]:
         """Get support ticket by ID"""
         conn = self.connect()
@@ -454,6 +919,7 @@ class DatabaseManager:
             return dict(zip(columns, result))
         return None
     
+    @read_query
     def get_support_messages(self, ticket_id: str) -> List[Dict]:
         """Get all messages for a support ticket"""
         conn = self.connect()
@@ -468,19 +934,19 @@ class DatabaseManager:
     
     def update_support_ticket_status(self, ticket_id: str, status: str) -> bool:
         """Update support ticket status"""
-        conn = self.connect()
-        
-        if status == 'closed':
-            conn.execute("""
-                UPDATE support_tickets 
-                SET status = ?, updated_at = CURRENT_TIMESTAMP, closed_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, [status, ticket_id])
-        else:
-            conn.execute("""
-                UPDATE support_tickets 
-                SET status = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, [status, ticket_id])
-        
+        def update(conn):
+            if status == 'closed':
+                conn.execute("""
+                    UPDATE support_tickets 
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP, closed_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, [status, ticket_id])
+            else:
+                conn.execute("""
+                    UPDATE support_tickets 
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, [status, ticket_id])
+        
+        self.write(update)
         return True
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Versioned schema migrations for the DuckDB database
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (version, description, statements); append new migrations, never edit applied ones.
+# Every statement is idempotent so that files created before the runner existed,
+# which already have part of the schema, can be migrated from version 1.
+# Statements are frozen copies: do not build them from SQL constants of other
+# modules, which may change after the migration has been applied.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, 'Initial schema', [
+        """
+            CREATE TABLE IF NOT EXISTS participants (
+                id VARCHAR PRIMARY KEY,
+                telegram_id BIGINT UNIQUE NOT NULL,
+                username VARCHAR,
+                full_name VARCHAR NOT NULL,
+                phone_number VARCHAR UNIQUE NOT NULL,
+                loyalty_card VARCHAR UNIQUE NOT NULL,
+                leaflet_photo_path VARCHAR,
+                registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status VARCHAR DEFAULT 'pending',
+                admin_notes TEXT
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS winners (
+                id VARCHAR PRIMARY KEY,
+                participant_id VARCHAR NOT NULL,
+                draw_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                seed_hash VARCHAR NOT NULL,
+                draw_number INTEGER DEFAULT 1,
+                is_valid BOOLEAN DEFAULT TRUE,
+                FOREIGN KEY (participant_id) REFERENCES participants(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS admin_logs (
+                id VARCHAR PRIMARY KEY,
+                admin_id BIGINT NOT NULL,
+                action VARCHAR NOT NULL,
+                target_participant_id VARCHAR,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                details TEXT,
+                FOREIGN KEY (target_participant_id) REFERENCES participants(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS support_tickets (
+                id VARCHAR PRIMARY KEY,
+                ticket_number VARCHAR UNIQUE NOT NULL,
+                user_id BIGINT NOT NULL,
+                username VARCHAR,
+                participant_id VARCHAR,
+                status VARCHAR DEFAULT 'open',
+                priority VARCHAR DEFAULT 'medium',
+                subject VARCHAR NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                closed_at TIMESTAMP,
+                assigned_admin BIGINT,
+                FOREIGN KEY (participant_id) REFERENCES participants(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS support_messages (
+                id VARCHAR PRIMARY KEY,
+                ticket_id VARCHAR NOT NULL,
+                sender_id BIGINT NOT NULL,
+                sender_type VARCHAR NOT NULL,
+                message_text TEXT NOT NULL,
+                attachment_path VARCHAR,
+                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_read BOOLEAN DEFAULT FALSE,
+                FOREIGN KEY (ticket_id) REFERENCES support_tickets(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id VARCHAR PRIMARY KEY,
+                title VARCHAR NOT NULL,
+                message_text TEXT NOT NULL,
+                message_type VARCHAR DEFAULT 'text',
+                image_path VARCHAR,
+                target_audience VARCHAR NOT NULL,
+                created_by BIGINT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                scheduled_at TIMESTAMP,
+                status VARCHAR DEFAULT 'draft',
+                total_recipients INTEGER DEFAULT 0,
+                sent_count INTEGER DEFAULT 0,
+                failed_count INTEGER DEFAULT 0
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS broadcast_recipients (
+                id VARCHAR PRIMARY KEY,
+                broadcast_id VARCHAR NOT NULL,
+                participant_id VARCHAR,
+                telegram_id BIGINT NOT NULL,
+                status VARCHAR DEFAULT 'pending',
+                sent_at TIMESTAMP,
+                error_message TEXT,
+                FOREIGN KEY (broadcast_id) REFERENCES broadcasts(id),
+                FOREIGN KEY (participant_id) REFERENCES participants(id)
+            )
+        """,
+    ]),
+    (2, 'Telegram file_id of uploaded broadcast photos', [
+        "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS photo_file_id VARCHAR",
+    ]),
+    (3, 'Suppression list of chats that blocked the bot', [
+        """
+            CREATE TABLE IF NOT EXISTS broadcast_suppressions (
+                telegram_id BIGINT PRIMARY KEY,
+                reason VARCHAR NOT NULL,
+                broadcast_id VARCHAR,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+        "ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS suppressed_count INTEGER DEFAULT 0",
+    ]),
+    (4, 'Notification outbox', [
+        """
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id VARCHAR PRIMARY KEY,
+                telegram_id BIGINT NOT NULL,
+                kind VARCHAR NOT NULL,
+                payload TEXT NOT NULL,
+                status VARCHAR DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP
+            )
+        """,
+    ]),
+    # DuckDB turns an UPDATE of an indexed column into delete + insert, which
+    # fails the primary key check, so columns that are updated in place
+    # (participants.status, broadcast_recipients.status, ...) cannot be indexed.
+    # Status filters rely on DuckDB's min/max zone maps instead.
+    (5, 'Indexes for hot lookups', [
+        "CREATE INDEX IF NOT EXISTS idx_winners_participant_id ON winners (participant_id)",
+        "CREATE INDEX IF NOT EXISTS idx_support_tickets_user_id ON support_tickets (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_support_messages_ticket_id ON support_messages (ticket_id)",
+        "CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_broadcast_id ON broadcast_recipients (broadcast_id)",
+    ]),
+    # Same as database.search.BUILD_GRAMS_SQL at the time
+    (6, 'Trigram index for participant search', [
+        """
+            CREATE OR REPLACE TABLE participant_search_grams AS
+            SELECT DISTINCT gram, telegram_id FROM (
+                SELECT telegram_id,
+                       unnest(list_transform(range(length(w) - 2), i -> substring(w, i + 1, 3))) AS gram
+                FROM (
+                    SELECT telegram_id, '  ' || word || ' ' AS w
+                    FROM (
+                        SELECT p.telegram_id, unnest(string_split_regex(
+                            concat_ws(' ', lower(p.full_name), lower(ltrim(p.username, '@')),
+                                      regexp_replace(p.phone_number, '[^0-9]', '', 'g'), p.loyalty_card),
+                            '\\s+'
+                        )) AS word
+                        FROM participants p
+                    )
+                    WHERE word <> ''
+                )
+            )
+            ORDER BY gram
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS participant_search_grams_recent (
+                gram VARCHAR NOT NULL,
+                telegram_id BIGINT NOT NULL
+            )
+        """,
+        "DELETE FROM participant_search_grams_recent",
+    ]),
+    # No primary keys: DuckDB rejects deleting and re-inserting a key in one
+    # transaction, which is how the counters are recounted. Seeded like
+    # database.stats.RECOUNT_SQL at the time
+    (7, 'Statistics counters', [
+        """
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                name VARCHAR NOT NULL,
+                value BIGINT NOT NULL
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS stats_daily_registrations (
+                day DATE NOT NULL,
+                registrations BIGINT NOT NULL
+            )
+        """,
+        "DELETE FROM stats_counters",
+        """
+            INSERT INTO stats_counters (name, value)
+            SELECT 'participants', COUNT(*) FROM participants
+            UNION ALL
+            SELECT 'status:' || status, COUNT(*) FROM participants
+            WHERE status IS NOT NULL GROUP BY status
+            UNION ALL
+            SELECT 'winners', COUNT(*) FROM winners WHERE is_valid = TRUE
+        """,
+        "DELETE FROM stats_daily_registrations",
+        """
+            INSERT INTO stats_daily_registrations (day, registrations)
+            SELECT CAST(registration_date AS DATE), COUNT(*) FROM participants
+            WHERE registration_date IS NOT NULL
+            GROUP BY CAST(registration_date AS DATE)
+        """,
+    ]),
+    # One row per seed (a draw or a reroll). participant_ids is the
+    # zlib-compressed, newline-separated list of eligible ids in the order
+    # winners were selected from; merkle_root commits to it (utils/merkle.py)
+    (8, 'Draw snapshots', [
+        """
+            CREATE TABLE IF NOT EXISTS draw_snapshots (
+                seed_hash VARCHAR PRIMARY KEY,
+                draw_number INTEGER NOT NULL,
+                seed VARCHAR NOT NULL,
+                algorithm VARCHAR NOT NULL,
+                participant_count INTEGER NOT NULL,
+                participant_ids BLOB NOT NULL,
+                merkle_root VARCHAR NOT NULL,
+                winner_ids VARCHAR[] NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+    ]),
+]
+
+def create_migrations_table(conn) -> None:
+    """Create the table recording applied migration versions"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def get_applied_versions(conn) -> List[int]:
+    """Return the versions already applied to the database"""
+    results = conn.execute("SELECT version FROM schema_migrations ORDER BY version").fetchall()
+    return [row[0] for row in results]
+
+def get_pending_migrations(conn, target_version: Optional[int] = None) -> List[Tuple[int, str, List[str]]]:
+    """Return migrations not applied yet, up to target_version if given"""
+    applied = set(get_applied_versions(conn))
+    return [
+        migration for migration in MIGRATIONS
+        if migration[0] not in applied and (target_version is None or migration[0] <= target_version)
+    ]
+
+def apply_migration(conn, version: int, description: str, statements: List[str]) -> None:
+    """Run one migration's statements and record its version (inside the caller's transaction)"""
+    # Another DatabaseManager in this process may have applied it meanwhile
+    if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", [version]).fetchone():
+        return
+
+    for statement in statements:
+        conn.execute(statement)
+
+    conn.execute("""
+        INSERT INTO schema_migrations (version, description) VALUES (?, ?)
+    """, [version, description])
+    logger.info(f"Applied migration {version}: {description}")
+
+def latest_version() -> int:
+    """Version of the newest known migration"""
+    return MIGRATIONS[-1][0]
@@ -0,0 +1,257 @@
+"""
+Keyset (cursor) pagination over (timestamp, id) sort keys
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+
+# Sample of the matching rows used to size the first window, in pages
+PAGE_SAMPLE_PAGES = 8
+
+# Smallest first window, for samples whose rows share one timestamp
+MIN_WINDOW = timedelta(seconds=1)
+
+# Bisection of a window stops at this precision
+MIN_BISECT_STEP = timedelta(microseconds=1)
+
+class Page:
+    """
+    One page of rows ordered newest first
+
+    next_cursor points past the last row and prev_cursor before the first
+    one; either is None at the corresponding end of the result.
+    """
+
+    def __init__(self, items: List[Dict], limit: int,
+                 next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None):
+        self.items = items
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'items': self.items,
+            'limit': self.limit,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+        }
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Apply the default and maximum page size"""
+    if not limit:
+        return Config.ADMIN_PAGE_SIZE
+    return max(1, min(int(limit), Config.ADMIN_MAX_PAGE_SIZE))
+
+def encode_cursor(sort_value: datetime, row_id: str, rank: int = None) -> str:
+    """Encode a (timestamp, id) key, optionally led by a search rank, as an opaque URL-safe token"""
+    values = [sort_value.isoformat(), row_id]
+    if rank is not None:
+        values.append(rank)
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, ranked: bool = False) -> tuple:
+    """Decode a token produced by encode_cursor into (timestamp, id) or (rank, timestamp, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != (3 if ranked else 2):
+            raise ValueError("wrong number of key values")
+        key = (datetime.fromisoformat(values[0]), str(values[1]))
+        return (int(values[2]),) + key if ranked else key
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor}") from e
+
+def _build_page(conn, results: List[tuple], limit: int, after: Optional[str], backwards: bool,
+                cursor_of: Callable[[Dict], str]) -> Page:
+    """Turn up to limit + 1 fetched rows into a Page with its cursors"""
+    names = [desc[0] for desc in conn.description]
+    items = [dict(zip(names, row)) for row in results]
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    if backwards:
+        items.reverse()
+
+    # Coming from a page means there is one on that side
+    if backwards:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    next_cursor = prev_cursor = None
+    if items:
+        if has_next:
+            next_cursor = cursor_of(items[-1])
+        if has_prev:
+            prev_cursor = cursor_of(items[0])
+
+    return Page(items, limit, next_cursor, prev_cursor)
+
+def _fetch_in_windows(conn, query: str, order: str, source: str, where: str, params: List,
+                      sort_expr: str, anchor: datetime, window: timedelta, backwards: bool,
+                      limit: int, cap: int) -> List[tuple]:
+    """
+    Fetch up to limit + 1 rows from the narrowest window found next to anchor
+
+    The window is widened from anchor until it holds more than limit rows,
+    then narrowed by bisection while it holds cap rows or more. Both steps
+    only count rows up to cap, so the final sort reads fewer than cap rows.
+    """
+    joiner = 'AND' if where else 'WHERE'
+    inside, beyond = ('<=', '>') if backwards else ('>=', '<')
+    window_query = f"{query} {joiner} {sort_expr} {inside} ?"
+
+    def rows_within(bound) -> int:
+        return conn.execute(f"SELECT COUNT(*) FROM ({window_query} LIMIT ?) window_rows",
+                            params + [bound, cap]).fetchone()[0]
+
+    # Widen: near holds at most limit rows, far holds more
+    near = anchor
+    while True:
+        try:
+            far = anchor + window if backwards else anchor - window
+        except OverflowError:
+            # The window covers every possible timestamp
+            return conn.execute(query + order, params + [limit + 1]).fetchall()
+
+        found = rows_within(far)
+        if found > limit:
+            break
+
+        # Done once no matching row lies beyond the window
+        more = conn.execute(f"SELECT 1 FROM {source}{where} {joiner} {sort_expr} {beyond} ? LIMIT 1",
+                            params + [far]).fetchone()
+        if more is None:
+            break
+        near = far
+        window *= 4
+
+    # Narrow: stop at cap rows or when the bound cannot move between tied timestamps
+    while found >= cap and abs(far - near) > MIN_BISECT_STEP:
+        middle = near + (far - near) / 2
+        middle_found = rows_within(middle)
+        if middle_found > limit:
+            far, found = middle, middle_found
+        else:
+            near = middle
+
+    return conn.execute(window_query + order, params + [far, limit + 1]).fetchall()
+
+def fetch_page(conn, columns: str, source: str, conditions: Sequence[str], params: Sequence,
+               key: Tuple[str, str], key_fields: Tuple[str, str],
+               after: str = None, before: str = None, limit: int = None) -> Page:
+    """
+    Run one page of a query ordered by key descending
+
+    Args:
+        conn: Cursor to run the query on
+        columns: Select list of the query
+        source: FROM clause of the query (tables and joins)
+        conditions: Filters joined with AND
+        params: Parameters of the filters
+        key: SQL expressions of the (timestamp, id) sort key, which must be
+            unique and non-NULL
+        key_fields: Result columns holding the values of key
+        after: Cursor of the page to continue after (older rows)
+        before: Cursor of the page to continue before (newer rows)
+        limit: Page size, clamped to the configured maximum
+
+    Rows are located by comparing with the cursor's key instead of OFFSET.
+    DuckDB still sorts every row matching the filters to find the top of an
+    ORDER BY ... LIMIT, so the page is looked for in a timestamp window
+    next to the cursor (or next to the current time for the first page)
+    and the window is widened until it holds a full page. A window is a
+    plain range on the timestamp, which min/max zone maps turn into a scan
+    of a few row groups. Its first size comes from the row density of a
+    bounded sample of the matching rows, so no query reads every matching
+    row up front. The cost of a page then depends on the rows near it,
+    except for the probe that ends the search at the oldest or newest
+    rows, and for filters so selective that the sample has to be looked
+    for across the whole table.
+    """
+    limit = clamp_page_size(limit)
+    conditions = list(conditions)
+    params = list(params)
+    sort_expr, id_expr = key
+
+    cursor = before or after
+    backwards = before is not None
+    sort_value = None
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        op = '>' if backwards else '<'
+        # The plain range conjunct lets the scan skip row groups; the OR alone is not pushed down
+        conditions.append(f"{sort_expr} {op}= ?")
+        conditions.append(f"({sort_expr} {op} ? OR ({sort_expr} = ? AND {id_expr} {op} ?))")
+        params.extend([sort_value, sort_value, sort_value, row_id])
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    direction = 'ASC' if backwards else 'DESC'
+    query = f"SELECT {columns} FROM {source}{where}"
+    order = f" ORDER BY {sort_expr} {direction}, {id_expr} {direction} LIMIT ?"
+
+    # Stops reading after sample_size rows in scan order
+    sample_size = PAGE_SAMPLE_PAGES * (limit + 1)
+    count, lowest, highest = conn.execute(
+        f"SELECT COUNT(*), MIN(s), MAX(s) FROM (SELECT {sort_expr} AS s FROM {source}{where} LIMIT ?) sample",
+        params + [sample_size]
+    ).fetchone()
+
+    if count < sample_size:
+        # Few enough matching rows to sort them all
+        results = conn.execute(query + order, params + [limit + 1]).fetchall()
+    else:
+        # Twice the span that holds limit + 1 rows at the sampled density
+        window = max((highest - lowest) * (2 * (limit + 1) / count), MIN_WINDOW)
+        anchor = sort_value if cursor else datetime.now()
+        results = _fetch_in_windows(conn, query, order, source, where, params, sort_expr,
+                                    anchor, window, backwards, limit, sample_size)
+
+    return _build_page(conn, results, limit, after, backwards,
+                       lambda row: encode_cursor(row[key_fields[0]], row[key_fields[1]]))
+
+def fetch_ranked_page(conn, query: str, params: Sequence, key_fields: Tuple[str, str, str],
+                      after: str = None, before: str = None, limit: int = None) -> Page:
+    """
+    Run one page of a ranked query, best rank first, then newest first
+
+    query must produce the (rank, timestamp, id) columns named by key_fields.
+    It is wrapped in a subquery and paged on the row value of the key, so it
+    is meant for bounded candidate sets such as search results.
+    """
+    limit = clamp_page_size(limit)
+    params = list(params)
+    rank_field, sort_field, id_field = key_fields
+    key = f"({rank_field}, {sort_field}, {id_field})"
+
+    cursor = before or after
+    backwards = before is not None
+    where = ""
+    if cursor:
+        where = f" WHERE {key} {'>' if backwards else '<'} (?, ?, ?)"
+        params.extend(decode_cursor(cursor, ranked=True))
+
+    direction = 'ASC' if backwards else 'DESC'
+    results = conn.execute(
+        f"SELECT * FROM ({query}) ranked{where} "
+        f"ORDER BY {rank_field} {direction}, {sort_field} {direction}, {id_field} {direction} LIMIT ?",
+        params + [limit + 1]
+    ).fetchall()
+
+    return _build_page(conn, results, limit, after, backwards,
+                       lambda row: encode_cursor(row[sort_field], row[id_field], rank=row[rank_field]))
@@ -0,0 +1,107 @@
+"""
+Trigram index for participant search in the admin panel
+"""
+
+import re
+from typing import List, Tuple
+
+# Searchable text of a participant (table alias p): lower-cased name and
+# username, phone digits and loyalty card, separated by spaces
+SEARCH_DOCUMENT = (
+    "concat_ws(' ', lower(p.full_name), lower(ltrim(p.username, '@')), "
+    "regexp_replace(p.phone_number, '[^0-9]', '', 'g'), p.loyalty_card)"
+)
+
+# Trigrams are looked up in two tables. participant_search_grams is kept
+# sorted by gram, so an equality lookup only reads the row groups whose
+# min/max zone maps contain the gram. It is always written with CREATE
+# TABLE AS: DuckDB does not prune parameterized lookups on row groups
+# appended by INSERT. Grams of new participants go to the small
+# participant_search_grams_recent table, which is scanned in full and
+# periodically merged into the sorted table. (An ART index on gram is not
+# an option: DuckDB builds it in minutes for this many duplicate keys.)
+GRAM_TABLES = ('participant_search_grams', 'participant_search_grams_recent')
+
+# Distinct trigrams of every word of SEARCH_DOCUMENT for the participants
+# matching {where}. Words are padded like pg_trgm ("  " + word + " "), so
+# the grams of a one or two letter word prefix are indexed too.
+SELECT_GRAMS_SQL = f"""
+    SELECT DISTINCT gram, telegram_id FROM (
+        SELECT telegram_id,
+               unnest(list_transform(range(length(w) - 2), i -> substring(w, i + 1, 3))) AS gram
+        FROM (
+            SELECT telegram_id, '  ' || word || ' ' AS w
+            FROM (
+                SELECT p.telegram_id, unnest(string_split_regex({SEARCH_DOCUMENT}, '\\s+')) AS word
+                FROM participants p
+                {{where}}
+            )
+            WHERE word <> ''
+        )
+    )
+"""
+
+# Rebuild the sorted table from scratch
+BUILD_GRAMS_SQL = f"""
+    CREATE OR REPLACE TABLE participant_search_grams AS
+    {SELECT_GRAMS_SQL.format(where='')}
+    ORDER BY gram
+"""
+
+# Add the grams of one participant (by telegram_id) to the recent table
+INSERT_RECENT_GRAMS_SQL = (
+    "INSERT INTO participant_search_grams_recent (gram, telegram_id) "
+    + SELECT_GRAMS_SQL.format(where="WHERE p.telegram_id = ?")
+)
+
+# Rewrite the sorted table with the recent grams merged in
+MERGE_GRAMS_SQL = [
+    """
+        CREATE OR REPLACE TABLE participant_search_grams AS
+        SELECT * FROM (
+            SELECT gram, telegram_id FROM participant_search_grams
+            UNION ALL
+            SELECT gram, telegram_id FROM participant_search_grams_recent
+        )
+        ORDER BY gram
+    """,
+    "DELETE FROM participant_search_grams_recent",
+]
+
+# Postings of at most this many of a query's rarest grams are intersected
+CANDIDATE_GRAMS = 3
+
+# Above this share of participants even the rarest gram is not selective
+# enough, and the text of every participant is checked instead
+CANDIDATE_MAX_FRACTION = 0.2
+
+PHONE_QUERY = re.compile(r'^[\d\s+()\-]+$')
+
+def normalize_query(query: str) -> List[str]:
+    """Split a search query into words normalized like SEARCH_DOCUMENT"""
+    query = query.strip().lower()
+    if PHONE_QUERY.match(query):
+        digits = re.sub(r'\D', '', query)
+        return [digits] if digits else []
+    return [word.lstrip('@') for word in query.split() if word.lstrip('@')]
+
+def word_grams(word: str) -> List[str]:
+    """
+    Trigrams a document must contain to match a query word
+
+    Words of three or more letters match anywhere in a document word; shorter
+    ones only match its start, through the padded grams.
+    """
+    if len(word) < 3:
+        padded = '  ' + word
+        return [padded[i:i + 3] for i in range(len(word))]
+    return [word[i:i + 3] for i in range(len(word) - 2)]
+
+def query_grams(words: List[str]) -> Tuple[str, ...]:
+    """Distinct trigrams of all query words"""
+    grams = []
+    for word in words:
+        for gram in word_grams(word):
+            if gram not in grams:
+                grams.append(gram)
+    return tuple(grams)
@@ -0,0 +1,37 @@
+"""
+Frozen participant pools of lottery draws
+"""
+
+import zlib
+from typing import List, Sequence
+
+def encode_participant_ids(participant_ids: Sequence[str]) -> bytes:
+    """Compress an ordered list of ids into the participant_ids blob"""
+    return zlib.compress('\n'.join(participant_ids).encode(), 6)
+
+def decode_participant_ids(blob: bytes) -> List[str]:
+    """Inverse of encode_participant_ids"""
+    text = zlib.decompress(blob).decode()
+    return text.split('\n') if text else []
+
+INSERT_SNAPSHOT_SQL = """
+    INSERT INTO draw_snapshots
+    (seed_hash, draw_number, seed, algorithm, participant_count, participant_ids, merkle_root, winner_ids)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SELECT_SNAPSHOT_SQL = """
+    SELECT * FROM draw_snapshots WHERE seed_hash = ?
+"""
+
+# One row per seed_hash recorded in winners (draws and rerolls, valid or
+# not), oldest first, with the participant ids of its winner rows
+DRAWS_SQL = """
+    SELECT w.draw_number, w.seed_hash, MIN(w.draw_date) AS draw_date,
+           list(w.participant_id ORDER BY w.participant_id) AS participant_ids,
+           s.seed_hash IS NOT NULL AS has_snapshot
+    FROM winners w
+    LEFT JOIN draw_snapshots s ON s.seed_hash = w.seed_hash
+    GROUP BY w.draw_number, w.seed_hash, s.seed_hash
+    ORDER BY w.draw_number, MIN(w.draw_date)
+"""
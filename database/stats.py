@@ -0,0 +1,86 @@
+"""
+Incrementally maintained statistics counters
+"""
+
+from typing import Dict
+
+# Counter names in stats_counters; participants per status are stored as
+# STATUS_PREFIX + status
+TOTAL_PARTICIPANTS = 'participants'
+TOTAL_WINNERS = 'winners'
+STATUS_PREFIX = 'status:'
+
+# Fresh values of every counter, computed from the tables themselves
+RECOUNT_COUNTERS_SQL = f"""
+    SELECT '{TOTAL_PARTICIPANTS}', COUNT(*) FROM participants
+    UNION ALL
+    SELECT '{STATUS_PREFIX}' || status, COUNT(*) FROM participants
+    WHERE status IS NOT NULL GROUP BY status
+    UNION ALL
+    SELECT '{TOTAL_WINNERS}', COUNT(*) FROM winners WHERE is_valid = TRUE
+"""
+
+RECOUNT_REGISTRATIONS_SQL = """
+    SELECT CAST(registration_date AS DATE), COUNT(*) FROM participants
+    WHERE registration_date IS NOT NULL
+    GROUP BY CAST(registration_date AS DATE)
+"""
+
+# Replace the stored counters with fresh ones (also used to seed them)
+RECOUNT_SQL = [
+    "DELETE FROM stats_counters",
+    f"INSERT INTO stats_counters (name, value) {RECOUNT_COUNTERS_SQL}",
+    "DELETE FROM stats_daily_registrations",
+    f"INSERT INTO stats_daily_registrations (day, registrations) {RECOUNT_REGISTRATIONS_SQL}",
+]
+
+def add_to_counter(conn, name: str, delta: int) -> None:
+    """Add delta to a counter, creating it when missing"""
+    updated = conn.execute(
+        "UPDATE stats_counters SET value = value + ? WHERE name = ?", [delta, name]
+    ).fetchone()[0]
+    if not updated:
+        conn.execute("INSERT INTO stats_counters (name, value) VALUES (?, ?)", [name, delta])
+
+def count_registration(conn, participant_id: str) -> None:
+    """Count a just inserted participant in the totals and its registration day"""
+    row = conn.execute("""
+        SELECT status, CAST(registration_date AS DATE) FROM participants WHERE id = ?
+    """, [participant_id]).fetchone()
+    if row is None:
+        return
+
+    status, day = row
+    add_to_counter(conn, TOTAL_PARTICIPANTS, 1)
+    if status is not None:
+        add_to_counter(conn, STATUS_PREFIX + status, 1)
+
+    updated = conn.execute("""
+        UPDATE stats_daily_registrations SET registrations = registrations + 1 WHERE day = ?
+    """, [day]).fetchone()[0]
+    if not updated:
+        conn.execute("INSERT INTO stats_daily_registrations (day, registrations) VALUES (?, 1)", [day])
+
+def read_counters(conn) -> Dict[str, int]:
+    """Return the stored counters by name"""
+    return dict(conn.execute("SELECT name, value FROM stats_counters").fetchall())
+
+def recount(conn) -> Dict[str, int]:
+    """
+    Recompute the counters from the tables and store them
+
+    Returns the counters whose stored value was off, with the correction
+    applied to each.
+    """
+    stored = read_counters(conn)
+    fresh = dict(conn.execute(RECOUNT_COUNTERS_SQL).fetchall())
+
+    drift = {}
+    for name in stored.keys() | fresh.keys():
+        difference = fresh.get(name, 0) - stored.get(name, 0)
+        if difference:
+            drift[name] = difference
+
+    for statement in RECOUNT_SQL:
+        conn.execute(statement)
+    return drift
@@ -0,0 +1,100 @@
+"""
+In-memory index of the unique participant fields checked during registration
+"""
+
+import threading
+import time
+from typing import Dict, Set, Tuple
+
+PHONE_NUMBER = 'phone_number'
+LOYALTY_CARD = 'loyalty_card'
+FIELDS = (PHONE_NUMBER, LOYALTY_CARD)
+
+class DuplicateParticipantError(ValueError):
+    """A registration reuses a value that must be unique among participants"""
+
+    def __init__(self, field: str, value):
+        super().__init__(f"Participant with this {field} already exists: {value}")
+        self.field = field
+        self.value = value
+
+class UniquenessIndex:
+    """
+    Registered phone numbers and loyalty cards plus in-progress reservations
+
+    The sets mirror the UNIQUE columns of participants: they are loaded once
+    and extended after every committed registration, so a duplicate check is
+    a set lookup. A user going through the registration dialog reserves the
+    phone and card they entered; until the reservation expires or they
+    finish, nobody else can reserve or register the same value.
+    """
+
+    def __init__(self, reservation_ttl: float):
+        self.reservation_ttl = reservation_ttl
+        self.loaded = False
+        self._values: Dict[str, Set[str]] = {field: set() for field in FIELDS}
+        # (field, value) -> (telegram_id, expires_at)
+        self._reservations: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, conn) -> None:
+        """Read every registered value from the participants table"""
+        rows = conn.execute(f"SELECT {', '.join(FIELDS)} FROM participants").fetchall()
+        with self._lock:
+            for index, field in enumerate(FIELDS):
+                self._values[field].update(row[index] for row in rows)
+            self.loaded = True
+
+    def add(self, phone_number: str, loyalty_card: str) -> None:
+        """Record a committed registration"""
+        with self._lock:
+            self._values[PHONE_NUMBER].add(phone_number)
+            self._values[LOYALTY_CARD].add(loyalty_card)
+
+    def _holder(self, field: str, value: str) -> int:
+        """telegram_id holding an unexpired reservation of value, or None (lock held)"""
+        reservation = self._reservations.get((field, value))
+        if reservation is None:
+            return None
+        telegram_id, expires_at = reservation
+        if expires_at <= time.monotonic():
+            del self._reservations[(field, value)]
+            return None
+        return telegram_id
+
+    def is_taken(self, field: str, value: str, telegram_id: int = None) -> bool:
+        """Whether value is registered or reserved by someone other than telegram_id"""
+        with self._lock:
+            if value in self._values[field]:
+                return True
+            holder = self._holder(field, value)
+            return holder is not None and holder != telegram_id
+
+    def reserve(self, field: str, value: str, telegram_id: int) -> bool:
+        """
+        Reserve value for telegram_id's registration
+
+        Replaces the user's earlier reservation of the same field. Returns
+        False if the value is registered or reserved by another user.
+        """
+        with self._lock:
+            if value in self._values[field]:
+                return False
+            holder = self._holder(field, value)
+            if holder is not None and holder != telegram_id:
+                return False
+
+            # Also forget reservations of abandoned registrations
+            now = time.monotonic()
+            for key, (owner, expires_at) in list(self._reservations.items()):
+                if (owner == telegram_id and key[0] == field) or expires_at <= now:
+                    del self._reservations[key]
+            self._reservations[(field, value)] = (telegram_id, now + self.reservation_ttl)
+            return True
+
+    def release(self, telegram_id: int) -> None:
+        """Drop every reservation held by telegram_id"""
+        with self._lock:
+            for key, (owner, _) in list(self._reservations.items()):
+                if owner == telegram_id:
+                    del self._reservations[key]
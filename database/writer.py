@@ -0,0 +1,166 @@
+"""
+Single writer thread with group commit for DuckDB mutations
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A queued write: the caller's future, the write function and its arguments
+WriteItem = Tuple[Future, Callable, tuple]
+
+class WriteQueue:
+    """
+    Applies every mutation of one database on a dedicated thread
+
+    A write is a function taking the writer's cursor as its first argument.
+    Writes that queue up while a transaction is being committed are applied
+    together in the next transaction (group commit), so a burst of
+    registrations costs one commit instead of one per row and writers
+    never race each other for DuckDB's write lock. If any write in a group
+    fails, the group is rolled back and its writes are retried one per
+    transaction, so every caller gets exactly its own result or error.
+    """
+
+    def __init__(self, connections, max_batch: int, max_delay_ms: float = 0):
+        """
+        Args:
+            connections: ConnectionManager providing the writer's cursor
+            max_batch: Maximum number of writes committed together
+            max_delay_ms: How long to wait for more writes before committing
+        """
+        self.connections = connections
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay_ms / 1000
+        self._queue: "queue.Queue[WriteItem]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stopped = False
+
+    def start(self) -> None:
+        """Start the writer thread if it is not running yet"""
+        with self._lock:
+            self._start()
+
+    def _start(self) -> None:
+        """Start the writer thread (lock held)"""
+        if self._stopped:
+            raise RuntimeError("Database writer is stopped")
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='duckdb-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Queue a write and return a future resolved after it is committed"""
+        if threading.current_thread() is self._thread:
+            # Nested write from inside another write joins its transaction
+            future = Future()
+            try:
+                future.set_result(fn(self._conn, *args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        future = Future()
+        with self._lock:
+            # Queued under the lock so nothing lands behind stop()'s marker
+            self._start()
+            self._queue.put((future, fn, args))
+        return future
+
+    def write(self, fn: Callable, *args) -> Any:
+        """Queue a write and wait until it is committed"""
+        return self.submit(fn, *args).result()
+
+    def stop(self) -> None:
+        """Apply the writes already queued and stop the thread; later writes are refused"""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            self._thread = None
+            if thread is not None and thread.is_alive():
+                self._queue.put(None)
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=10)
+
+    def _run(self) -> None:
+        """Thread body: collect writes into groups and commit them"""
+        try:
+            self._conn = self.connections.cursor()
+        except Exception as e:
+            logger.error(f"Database writer could not open a cursor: {e}")
+            self._fail_pending(e)
+            return
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    timeout = deadline - time.monotonic()
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+            if stop:
+                return
+
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail every queued write; the next submit starts a new thread"""
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[0].set_running_or_notify_cancel():
+                    item[0].set_exception(error)
+
+    def _commit(self, batch: List[WriteItem]) -> None:
+        """Apply a group of writes, skipping any cancelled by their callers"""
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if batch:
+            self._apply(batch)
+
+    def _apply(self, batch: List[WriteItem]) -> None:
+        """Run writes in one transaction and resolve their futures"""
+        try:
+            self._conn.execute("BEGIN TRANSACTION")
+            results = [fn(self._conn, *args) for _, fn, args in batch]
+            self._conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                self._conn.execute("ROLLBACK")
+            except Exception:
+                pass
+
+            if len(batch) == 1:
+                batch[0][0].set_exception(e)
+                return
+
+            # Find the failing write by committing each one on its own
+            logger.warning(f"Group commit of {len(batch)} writes failed, retrying one by one: {e}")
+            for item in batch:
+                self._apply([item])
+            return
+
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
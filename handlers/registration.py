@@ -16,7 +16,7 @@ from models import RegistrationStates
 from keyboards import *
 from utils.validators import validate_phone, validate_loyalty_card, validate_name
 from utils.file_handler import save_photo
-from database import DatabaseManager
+from database import DatabaseManager, DuplicateParticipantError
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +24,18 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
     """Create and configure registration router"""
     router = Router()
     
+    async def abandon_registration(state: FSMContext, telegram_id: int):
+        """Clear the registration dialog and free the phone and card it reserved"""
+        await state.clear()
+        await db_manager.aio.release_registration(telegram_id)
+    
     @router.message(Command("start"))
     async def start_handler(message: Message, state: FSMContext):
         """Handle /start command"""
-        await state.clear()
+        await abandon_registration(state, message.from_user.id)
         
         # Check if user is already registered
-        participant = db_manager.get_participant_by_telegram_id(message.from_user.id)
+        participant = await db_manager.aio.get_participant_by_telegram_id(message.from_user.id)
         
         if participant:
             status_text = {
@@ -63,7 +68,7 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
     async def start_registration(message: Message, state: FSMContext):
         """Start registration process"""
         # Check if already registered
-        participant = db_manager.get_participant_by_telegram_id(message.from_user.id)
+        participant = await db_manager.aio.get_participant_by_telegram_id(message.from_user.id)
         
         if participant:
             await message.answer(
@@ -85,7 +90,7 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
     async def process_name(message: Message, state: FSMContext):
         """Process name input"""
         if message.text == "⬅️ Назад в меню":
-            await state.clear()
+            await abandon_registration(state, message.from_user.id)
             await message.answer(
                 "Регистрация отменена. Возвращаемся в главное меню.",
                 reply_markup=get_main_menu_keyboard()
@@ -130,15 +135,15 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
             )
             return
         
-        # Check if phone already exists
-        if db_manager.check_phone_exists(phone):
+        # Reserve the phone for this registration, unless it is already taken
+        if not await db_manager.aio.reserve_phone_number(phone, message.from_user.id):
             await message.answer(
                 "❌ Этот номер телефона уже используется!\n\n"
                 "Каждый участник может зарегистрироваться только один раз.\n"
                 "Если это ваш номер, проверьте статус в разделе '📋 Мой статус'",
                 reply_markup=get_main_menu_keyboard()
             )
-            await state.clear()
+            await abandon_registration(state, message.from_user.id)
             return
         
         await state.update_data(phone_number=phone)
@@ -189,14 +194,14 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
             )
             return
         
-        # Check if phone exists
-        if db_manager.check_phone_exists(phone):
+        # Reserve the phone for this registration, unless it is already taken
+        if not await db_manager.aio.reserve_phone_number(phone, message.from_user.id):
             await message.answer(
                 "❌ Этот номер телефона уже используется!\n\n"
                 "Каждый участник может зарегистрироваться только один раз.",
                 reply_markup=get_main_menu_keyboard()
             )
-            await state.clear()
+            await abandon_registration(state, message.from_user.id)
             return
         
         await state.update_data(phone_number=phone)
@@ -220,7 +225,7 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
             return
         
         if message.text == "🏠 Главное меню":
-            await state.clear()
+            await abandon_registration(state, message.from_user.id)
             await message.answer(
                 "Регистрация отменена.",
                 reply_markup=get_main_menu_keyboard()
@@ -239,14 +244,14 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
             )
             return
         
-        # Check if card exists
-        if db_manager.check_loyalty_card_exists(loyalty_card):
+        # Reserve the card for this registration, unless it is already taken
+        if not await db_manager.aio.reserve_loyalty_card(loyalty_card, message.from_user.id):
             await message.answer(
                 "❌ Эта карта лояльности уже используется!\n\n"
                 "Каждая карта может быть использована только один раз.",
                 reply_markup=get_main_menu_keyboard()
             )
-            await state.clear()
+            await abandon_registration(state, message.from_user.id)
             return
         
         await state.update_data(loyalty_card=loyalty_card)
@@ -354,7 +359,7 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
             return
         
         if message.text == "🏠 Главное меню":
-            await state.clear()
+            await abandon_registration(state, message.from_user.id)
             await message.answer(
                 "Регистрация отменена.",
                 reply_markup=get_main_menu_keyboard()
@@ -374,7 +379,7 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
         data = await state.get_data()
         
         try:
-            participant_id = db_manager.add_participant(
+            participant_id = await db_manager.aio.add_participant(
                 telegram_id=callback.from_user.id,
                 username=callback.from_user.username or "",
                 full_name=data['full_name'],
@@ -400,6 +405,27 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
             
             logger.info(f"User {callback.from_user.id} registered successfully")
             
+        except DuplicateParticipantError as e:
+            # Someone else registered the same data while this dialog was open
+            await abandon_registration(state, callback.from_user.id)
+            
+            reason = {
+                'telegram_id': "❗️ Вы уже зарегистрированы в розыгрыше!",
+                'phone_number': "❌ Этот номер телефона уже используется другим участником!",
+                'loyalty_card': "❌ Эта карта лояльности уже используется другим участником!",
+            }[e.field]
+            
+            await callback.message.edit_text(
+                f"{reason}\n\n"
+                "Каждый участник может зарегистрироваться только один раз.\n"
+                "Если это ваши данные, проверьте статус в разделе '📋 Мой статус'"
+            )
+            await callback.message.answer(
+                "Возвращаемся в главное меню:",
+                reply_markup=get_main_menu_keyboard()
+            )
+            logger.info(f"Registration of user {callback.from_user.id} rejected: duplicate {e.field}")
+            
         except Exception as e:
             logger.error(f"Registration error: {e}")
             await callback.answer("❌ Ошибка при регистрации. Попробуйте позже.")
@@ -467,7 +493,7 @@ def create_registration_router(db_manager: DatabaseManager) -> Router:
     @router.callback_query(F.data == "cancel_registration", StateFilter(RegistrationStates.CONFIRMATION))
     async def cancel_registration(callback: CallbackQuery, state: FSMContext):
         """Cancel registration"""
-        await state.clear()
+        await abandon_registration(state, callback.from_user.id)
         await callback.message.edit_text("❌ Регистрация отменена.")
         await callback.message.answer(
             "Возвращаемся в главное меню:",
@@ -16,7 +16,7 @@ def create_status_router(db_manager: DatabaseManager) -> Router:
     @router.message(F.text == "📋 Мой статус")
     async def check_status(message: Message):
         """Check user registration status"""
-        participant = db_manager.get_participant_by_telegram_id(message.from_user.id)
+        participant = await db_manager.aio.get_participant_by_telegram_id(message.from_user.id)
         
         if not participant:
             await message.answer(
@@ -64,7 +64,7 @@ def create_status_router(db_manager: DatabaseManager) -> Router:
     async def about_lottery(message: Message):
         """Show lottery information"""
         # Get basic statistics
-        stats = db_manager.get_statistics()
+        stats = await db_manager.aio.get_statistics()
         
         info_text = (
             "🎉 О нашем розыгрыше\n\n"
@@ -204,7 +204,7 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
             return
         
         if message.text == "✅ Отправить обращение":
-            await self._create_ticket(message, state)
+            await _create_ticket(message, state)
             return
         
         if message.text == "⬅️ Изменить категорию":
@@ -265,9 +265,9 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
     @router.message(F.text == "✅ Отправить обращение", StateFilter(SupportStates.WAITING_DESCRIPTION, SupportStates.WAITING_ATTACHMENT))
     async def create_ticket(message: Message, state: FSMContext):
         """Create support ticket"""
-        await self._create_ticket(message, state)
+        await _create_ticket(message, state)
     
-    async def _create_ticket(self, message: Message, state: FSMContext):
+    async def _create_ticket(message: Message, state: FSMContext):
         """Internal method to create ticket"""
         data = await state.get_data()
         
@@ -281,10 +281,10 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
         
         try:
             # Get participant info
-            participant = db_manager.get_participant_by_telegram_id(message.from_user.id)
+            participant = await db_manager.aio.get_participant_by_telegram_id(message.from_user.id)
             
             # Create ticket
-            ticket_id = db_manager.create_support_ticket(
+            ticket_id = await db_manager.aio.create_support_ticket(
                 user_id=message.from_user.id,
                 username=message.from_user.username or "",
                 subject=data.get('category', 'Обращение в поддержку'),
@@ -292,7 +292,7 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
             )
             
             # Add initial message
-            db_manager.add_support_message(
+            await db_manager.aio.add_support_message(
                 ticket_id=ticket_id,
                 sender_id=message.from_user.id,
                 sender_type='user',
@@ -301,12 +301,9 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
             )
             
             # Get ticket number for user
-            conn = db_manager.connect()
-            ticket_info = conn.execute("""
-                SELECT ticket_number FROM support_tickets WHERE id = ?
-            """, [ticket_id]).fetchone()
+            ticket_info = await db_manager.aio.get_support_ticket_by_id(ticket_id)
             
-            ticket_number = ticket_info[0] if ticket_info else "Unknown"
+            ticket_number = ticket_info['ticket_number'] if ticket_info else "Unknown"
             
             await state.clear()
             
@@ -332,14 +329,7 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
     @router.message(F.text == "📞 Мои обращения")
     async def my_tickets(message: Message):
         """Show user's tickets"""
-        conn = db_manager.connect()
-        
-        tickets = conn.execute("""
-            SELECT ticket_number, subject, status, created_at
-            FROM support_tickets 
-            WHERE user_id = ?
-            ORDER BY created_at DESC
-        """, [message.from_user.id]).fetchall()
+        tickets = await db_manager.aio.get_user_support_tickets(message.from_user.id)
         
         if not tickets:
             await message.answer(
@@ -356,18 +346,18 @@ def create_support_router(db_manager: DatabaseManager) -> Router:
                 'open': '🟡',
                 'in_progress': '🔵',
                 'closed': '🟢'
-            }.get(ticket[2], '⚪')
+            }.get(ticket['status'], '⚪')
             
             status_text = {
                 'open': 'Открыто',
                 'in_progress': 'В работе',
                 'closed': 'Закрыто'
-            }.get(ticket[2], 'Неизвестно')
+            }.get(ticket['status'], 'Неизвестно')
             
             tickets_text += (
-                f"{status_emoji} {ticket[0]}\n"
-                f"📝 {ticket[1]}\n"
-                f"📅 {ticket[3]}\n"
+                f"{status_emoji} {ticket['ticket_number']}\n"
+                f"📝 {ticket['subject']}\n"
+                f"📅 {ticket['created_at']}\n"
                 f"Status: {status_text}\n\n"
             )
         
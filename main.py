@@ -10,6 +10,7 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from config import Config
 from handlers import setup_handlers
+from database.connection import ConnectionManager
 from database.db_manager import DatabaseManager
 from web.app import create_app
 import threading
@@ -28,9 +29,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def run_web_app():
+def run_web_app(app):
     """Run Flask web application in a separate thread"""
-    app = create_app()
     app.run(host='127.0.0.1', port=5000, debug=False)
 
 async def main():
@@ -51,14 +51,22 @@ async def main():
     setup_handlers(dp, db_manager)
     
     # Start web application in a separate thread
-    web_thread = threading.Thread(target=run_web_app, daemon=True)
+    app = create_app()
+    web_thread = threading.Thread(target=run_web_app, args=(app,), daemon=True)
     web_thread.start()
     
     logger.info("Starting Telegram Bot...")
     logger.info("Web admin panel available at: http://127.0.0.1:5000")
     
     # Start polling
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        # Stop broadcasts and notifications first so their last outcomes
+        # are still written, then apply queued writes and checkpoint so a
+        # clean exit leaves no WAL
+        app.extensions['shutdown']()
+        ConnectionManager.close_all()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+Shared fixtures for the test suite
+"""
+
+import pytest
+
+from database import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    """A migrated database in a temporary directory"""
+    manager = DatabaseManager(str(tmp_path / 'lottery_bot.duckdb'))
+    manager.init_database()
+    yield manager
+    manager.close()
@@ -0,0 +1,127 @@
+"""
+Tests for the parallel draw audit and its signed report
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import duckdb
+import pytest
+
+from config import Config
+from database import DatabaseManager
+from utils import audit
+from utils.lottery import LotterySystem
+from utils.merkle import merkle_root
+from utils.selection import SHA256_CTR_V2, select_winners
+
+@pytest.fixture(scope='module')
+def history(tmp_path_factory):
+    """
+    A closed database with draws in every state the audit reports
+
+    Returns the path and the seed hash of each draw by name.
+    """
+    path = str(tmp_path_factory.mktemp('audit') / 'lottery_bot.duckdb')
+    db = DatabaseManager(path)
+    db.init_database()
+    db.write(lambda conn: conn.execute("""
+        INSERT INTO participants (id, telegram_id, full_name, phone_number, loyalty_card, status)
+        SELECT 'p' || i, i, 'Name ' || i, '+7900' || i, 'card' || i, 'approved'
+        FROM range(300) t(i)
+    """))
+    lottery = LotterySystem(db)
+    draws = {name: lottery.conduct_lottery(3) for name in ('valid', 'tampered', 'deleted', 'extra')}
+    reroll = lottery.reroll_winner(draws['valid']['winners'][0]['winner_id'], 1, 'test')
+
+    db.write(lambda conn: conn.execute("UPDATE draw_snapshots SET merkle_root = '00' WHERE seed_hash = ?",
+                                       [draws['tampered']['seed_hash']]))
+    db.delete_winner(draws['deleted']['winners'][0]['winner_id'], 1)
+    db.add_winner('p299', draws['extra']['seed_hash'], draws['extra']['draw_number'])
+    # A draw from before snapshots were stored
+    db.add_winner('p0', 'f' * 64, 0)
+    db.close()
+
+    seed_hashes = {name: result['seed_hash'] for name, result in draws.items()}
+    seed_hashes.update(reroll=reroll['seed_hash'], legacy='f' * 64)
+    return path, seed_hashes
+
+@pytest.fixture(scope='module')
+def results(history):
+    path, seed_hashes = history
+    conn = duckdb.connect(path, read_only=True)
+    try:
+        results = audit.audit_draws(conn, workers=2)
+    finally:
+        conn.close()
+    by_hash = {result['seed_hash']: result for result in results}
+    return results, {name: by_hash[seed_hash] for name, seed_hash in seed_hashes.items()}
+
+def test_every_draw_is_audited_in_draw_order(results):
+    ordered, by_name = results
+    assert len(ordered) == len(by_name)
+    assert [result['draw_number'] for result in ordered] == sorted(result['draw_number'] for result in ordered)
+
+@pytest.mark.parametrize('name, status, failed_checks', [
+    ('valid', audit.PASSED, []),
+    ('reroll', audit.PASSED, []),
+    ('tampered', audit.FAILED, ['merkle root']),
+    ('deleted', audit.FAILED, ['winner rows']),
+    ('extra', audit.FAILED, ['winner rows']),
+    ('legacy', audit.NO_SNAPSHOT, []),
+])
+def test_draws_are_classified(results, name, status, failed_checks):
+    result = results[1][name]
+    assert result['status'] == status
+    assert result['failed_checks'] == failed_checks
+
+def test_check_snapshot_reports_each_check():
+    snapshot = {
+        'seed': 'seed', 'algorithm': SHA256_CTR_V2, 'participant_count': 3,
+        'participant_ids': ['a', 'b', 'c'], 'merkle_root': merkle_root(['a', 'b', 'c']),
+    }
+    positions = select_winners('seed', 3, 2, SHA256_CTR_V2)
+    snapshot['winner_ids'] = [snapshot['participant_ids'][position] for position in positions]
+    seed_hash = hashlib.sha256(b'seed').hexdigest()
+
+    checks = audit.check_snapshot(snapshot, seed_hash, reversed(snapshot['winner_ids']))
+    assert checks == dict.fromkeys(['seed hash', 'pool size', 'merkle root', 'winners', 'winner rows'], True)
+    assert not audit.check_snapshot(snapshot, '0' * 64, snapshot['winner_ids'])['seed hash']
+    assert not audit.check_snapshot(snapshot, seed_hash, snapshot['winner_ids'][:1])['winner rows']
+
+@pytest.fixture
+def key(tmp_path):
+    return audit.load_signing_key(str(tmp_path / 'audit_key.pem'))
+
+def test_signing_key_is_created_once_and_private(tmp_path, key):
+    path = str(tmp_path / 'audit_key.pem')
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert audit.public_key_hex(audit.load_signing_key(path)) == audit.public_key_hex(key)
+
+def test_report_signature(results, key):
+    report = json.loads(json.dumps(audit.build_report(results[0], key, 1.0)))
+    assert report['summary'] == {audit.PASSED: 2, audit.FAILED: 3, audit.NO_SNAPSHOT: 1}
+    assert audit.verify_report(report)
+    assert audit.verify_report(report, audit.public_key_hex(key))
+    assert not audit.verify_report(report, '00' * 32)
+
+    report['draws'][0]['status'] = audit.PASSED + '!'
+    assert not audit.verify_report(report)
+
+def test_command_writes_a_verifiable_report(history, tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'report.json')
+    monkeypatch.setattr(Config, 'DATABASE_PATH', history[0])
+    monkeypatch.setattr(sys, 'argv', ['audit', '--workers', '1', '--output', output,
+                                      '--key', str(tmp_path / 'audit_key.pem')])
+    with pytest.raises(SystemExit) as exit_info:
+        audit.main()
+    # Failed draws make the command fail
+    assert exit_info.value.code == 1
+
+    monkeypatch.setattr(sys, 'argv', ['audit', '--verify', output])
+    with pytest.raises(SystemExit) as exit_info:
+        audit.main()
+    assert exit_info.value.code == 0
+    assert 'Signature valid' in capsys.readouterr().out
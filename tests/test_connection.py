@@ -0,0 +1,83 @@
+"""
+Tests for per-thread cursors on a shared DuckDB instance
+"""
+
+import threading
+
+import pytest
+
+from database.connection import ConnectionManager
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ConnectionManager.acquire(str(tmp_path / 'connection.duckdb'), 2, 10)
+    yield manager
+    manager.release()
+
+def cursor_in_thread(manager):
+    cursors = []
+    thread = threading.Thread(target=lambda: cursors.append(manager.cursor()))
+    thread.start()
+    thread.join()
+    return cursors[0]
+
+def test_cursor_is_reused_within_a_thread(manager):
+    assert manager.cursor() is manager.cursor()
+
+def test_each_thread_gets_its_own_cursor(manager):
+    assert cursor_in_thread(manager) is not manager.cursor()
+
+def test_cursors_share_one_database(manager):
+    manager.cursor().execute("CREATE TABLE items (id INTEGER)")
+    manager.cursor().execute("INSERT INTO items VALUES (1)")
+    other = cursor_in_thread(manager)
+    assert other.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+def test_managers_are_shared_per_file(tmp_path):
+    path = str(tmp_path / 'shared.duckdb')
+    first = ConnectionManager.acquire(path, 2, 10)
+    second = ConnectionManager.acquire(path, 2, 10)
+    assert first is second
+
+    first.release()
+    assert ConnectionManager.acquire(path, 2, 10) is second
+    second.release()
+    second.release()
+
+    # The last release closed it, so the file gets a new manager
+    reopened = ConnectionManager.acquire(path, 2, 10)
+    assert reopened is not first
+    reopened.release()
+
+def test_reading_limits_concurrent_readers(manager):
+    inside, release = threading.Semaphore(0), threading.Event()
+    peak, active, lock = [0], [0], threading.Lock()
+
+    def read():
+        with manager.reading():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            inside.release()
+            release.wait(5)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(2):
+        assert inside.acquire(timeout=5)
+    # The other two readers wait for a slot
+    assert not inside.acquire(timeout=0.2)
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == manager.read_concurrency == 2
+
+def test_nested_reads_reuse_the_slot(manager):
+    with manager.reading():
+        with manager.reading():
+            with manager.reading() as cursor:
+                assert cursor.execute("SELECT 1").fetchone()[0] == 1
@@ -0,0 +1,89 @@
+"""
+Tests for the Merkle commitment of draw pools and draw verification from snapshots
+"""
+
+import hashlib
+
+import pytest
+
+from database.snapshots import encode_participant_ids
+from utils.lottery import LotterySystem
+from utils.merkle import build_levels, inclusion_proof, leaf_hash, merkle_root, verify_inclusion
+
+def ids(count):
+    return [f'participant-{index}' for index in range(count)]
+
+def test_root_of_empty_and_single_lists():
+    assert merkle_root([]) == hashlib.sha256(b'').hexdigest()
+    assert merkle_root(['only']) == leaf_hash(0, 'only').hex()
+
+def test_root_commits_to_order():
+    assert merkle_root(['a', 'b', 'c']) != merkle_root(['b', 'a', 'c'])
+
+@pytest.mark.parametrize('count', list(range(1, 18)) + [1000])
+def test_every_position_has_a_valid_proof(count):
+    participant_ids = ids(count)
+    levels = build_levels(participant_ids)
+    root = merkle_root(participant_ids)
+    for position, participant_id in enumerate(participant_ids):
+        proof = inclusion_proof(levels, position)
+        assert len(proof) <= max(1, (count - 1).bit_length())
+        assert verify_inclusion(participant_id, position, proof, root)
+
+def test_altered_proofs_are_rejected():
+    participant_ids = ids(11)
+    levels = build_levels(participant_ids)
+    root = merkle_root(participant_ids)
+    proof = inclusion_proof(levels, 6)
+
+    assert not verify_inclusion('participant-7', 6, proof, root)
+    assert not verify_inclusion('participant-6', 7, proof, root)
+    assert not verify_inclusion('participant-6', 6, proof, merkle_root(participant_ids[:-1]))
+    flipped = [dict(step, side='left' if step['side'] == 'right' else 'right') for step in proof]
+    assert not verify_inclusion('participant-6', 6, flipped, root)
+    assert not verify_inclusion('participant-6', 6, proof[:-1], root)
+
+@pytest.fixture
+def lottery(db):
+    db.write(lambda conn: conn.execute("""
+        INSERT INTO participants (id, telegram_id, full_name, phone_number, loyalty_card, status)
+        SELECT 'p' || i, i, 'Name ' || i, '+7900' || i, 'card' || i, 'approved'
+        FROM range(200) t(i)
+    """))
+    return LotterySystem(db)
+
+def test_draw_is_verified_from_its_snapshot(lottery):
+    result = lottery.conduct_lottery(5)
+    assert lottery.verify_draw(result['seed_hash'])
+    assert not lottery.verify_draw('0' * 64)
+
+@pytest.mark.parametrize('column, value', [
+    ('merkle_root', "'0000'"),
+    ('seed', "'another seed'"),
+    ('participant_count', "participant_count + 1"),
+])
+def test_tampered_snapshot_fails_verification(lottery, db, column, value):
+    result = lottery.conduct_lottery(5)
+    db.write(lambda conn: conn.execute(
+        f"UPDATE draw_snapshots SET {column} = {value} WHERE seed_hash = ?", [result['seed_hash']]
+    ))
+    assert not lottery.verify_draw(result['seed_hash'])
+
+def test_reordered_pool_fails_verification(lottery, db):
+    # A consistent snapshot of another pool order draws other winners
+    result = lottery.conduct_lottery(5)
+    pool = list(reversed(db.get_draw_snapshot(result['seed_hash'])['participant_ids']))
+    db.write(lambda conn: conn.execute(
+        "UPDATE draw_snapshots SET participant_ids = ?, merkle_root = ? WHERE seed_hash = ?",
+        [encode_participant_ids(pool), merkle_root(pool), result['seed_hash']]
+    ))
+    assert not lottery.verify_draw(result['seed_hash'])
+
+def test_inclusion_proof_checks_against_the_published_root(lottery):
+    result = lottery.conduct_lottery(3)
+    proof = lottery.get_inclusion_proof(result['seed_hash'], 'p42')
+
+    assert proof['participants_merkle_root'] == result['participants_merkle_root']
+    assert verify_inclusion('p42', proof['position'], proof['proof'], result['participants_merkle_root'])
+    assert lottery.get_inclusion_proof(result['seed_hash'], 'not-a-participant') is None
+    assert lottery.get_inclusion_proof('0' * 64, 'p42') is None
@@ -0,0 +1,117 @@
+"""
+Tests for keyset pagination
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+from config import Config
+from database.pagination import decode_cursor, encode_cursor, fetch_page
+
+BASE = datetime(2024, 1, 1)
+
+def timestamps(layout, rng, count):
+    """Sort values spread out in different ways, to exercise the page windows"""
+    if layout == 'ties':
+        return [BASE + timedelta(seconds=rng.randint(0, 9)) for _ in range(count)]
+    if layout == 'seconds':
+        return [BASE + timedelta(seconds=rng.randint(0, 100)) for _ in range(count)]
+    if layout == 'years':
+        return [BASE + timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86400)) for _ in range(count)]
+    if layout == 'future':
+        # The first page starts looking at the current time
+        now = datetime.now()
+        return [now + timedelta(days=rng.randint(-30, 30)) for _ in range(count)]
+    raise ValueError(layout)
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE items (created_at TIMESTAMP, id VARCHAR, kind VARCHAR)")
+    yield conn
+    conn.close()
+
+def fill(conn, layout, count, seed=1):
+    rng = random.Random(seed)
+    rows = [(created_at, f'id{index:05d}', rng.choice('aab'))
+            for index, created_at in enumerate(timestamps(layout, rng, count))]
+    if rows:
+        conn.executemany("INSERT INTO items VALUES (?, ?, ?)", rows)
+    return rows
+
+def page(conn, conditions=(), params=(), **kwargs):
+    return fetch_page(conn, "*", "items", list(conditions), list(params),
+                      key=('created_at', 'id'), key_fields=('created_at', 'id'), **kwargs)
+
+def newest_first(rows, kind=None):
+    rows = [row for row in rows if kind is None or row[2] == kind]
+    return [row[1] for row in sorted(rows, key=lambda row: (row[0], row[1]), reverse=True)]
+
+def walk_forward(conn, limit, conditions=(), params=()):
+    pages = [page(conn, conditions, params, limit=limit)]
+    while pages[-1].next_cursor:
+        pages.append(page(conn, conditions, params, after=pages[-1].next_cursor, limit=limit))
+    return pages
+
+@pytest.mark.parametrize('layout', ['ties', 'seconds', 'years', 'future'])
+@pytest.mark.parametrize('count', [0, 1, 7, 120])
+@pytest.mark.parametrize('limit', [1, 3, 20])
+def test_pages_cover_every_row_in_both_directions(conn, layout, count, limit):
+    rows = fill(conn, layout, count)
+    for conditions, params, kind in (((), (), None), (("kind = ?",), ('b',), 'b')):
+        expected = newest_first(rows, kind)
+
+        pages = walk_forward(conn, limit, conditions, params)
+        assert [row['id'] for current in pages for row in current] == expected
+        assert pages[0].prev_cursor is None
+        assert all(len(current) == limit for current in pages[:-1])
+
+        # Back from the last page to the first
+        backward = [pages[-1]]
+        while backward[-1].prev_cursor:
+            backward.append(page(conn, conditions, params, before=backward[-1].prev_cursor, limit=limit))
+        assert [row['id'] for current in reversed(backward) for row in current] == expected
+
+def test_before_returns_the_rows_just_newer_than_the_cursor(conn):
+    rows = fill(conn, 'seconds', 50)
+    expected = newest_first(rows)
+    third = walk_forward(conn, 10)[2]
+
+    previous = page(conn, before=third.prev_cursor, limit=10)
+    assert [row['id'] for row in previous] == expected[10:20]
+    assert previous.next_cursor and previous.prev_cursor
+
+def test_page_size_is_clamped(conn):
+    fill(conn, 'seconds', 5)
+    assert page(conn, limit=10 ** 6).limit == Config.ADMIN_MAX_PAGE_SIZE
+    assert page(conn).limit == Config.ADMIN_PAGE_SIZE
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(BASE, 'abc')) == (BASE, 'abc')
+
+@pytest.mark.parametrize('cursor', ['garbage', encode_cursor(BASE, 'abc')[:-3]])
+def test_invalid_cursor_is_rejected(conn, cursor):
+    with pytest.raises(ValueError):
+        page(conn, after=cursor)
+
+def test_participants_page_filters_by_status(db):
+    db.write(lambda conn: conn.execute("""
+        INSERT INTO participants (id, telegram_id, full_name, phone_number, loyalty_card, status, registration_date)
+        SELECT 'p' || i, i, 'Name ' || i, '+7900' || i, 'card' || i,
+               CASE WHEN i % 3 = 0 THEN 'approved' ELSE 'pending' END,
+               TIMESTAMP '2024-01-01' + INTERVAL (i) MINUTE
+        FROM range(100) t(i)
+    """))
+
+    ids, cursor = [], None
+    while True:
+        current = db.get_participants_page(status='approved', after=cursor, limit=7)
+        ids += [row['telegram_id'] for row in current]
+        assert all(row['status'] == 'approved' for row in current)
+        cursor = current.next_cursor
+        if not cursor:
+            break
+    assert ids == list(range(99, -1, -3))
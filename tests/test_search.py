@@ -0,0 +1,99 @@
+"""
+Tests for participant search through the trigram index
+"""
+
+import pytest
+
+from database import DatabaseManager
+from database.search import normalize_query, word_grams
+
+PARTICIPANTS = [
+    (1, '@vanya', 'Иван Петров', '+7 (900) 123-45-67', '12345678'),
+    (2, None, 'Петр Иванов', '89001112233', '87654321'),
+    (3, 'ann', 'Ann Smith', '+79005556677', '11112222'),
+    (4, 'annabel', 'Annabel Lee', '+79007778899', '33334444'),
+    (5, 'x', 'Joanna Ann', '+79990001122', '55556666'),
+]
+
+def register(db, layout):
+    """
+    Register the participants above alone ('few', so every gram is common
+    and the text of each row is checked), among unrelated ones ('many', so
+    the postings of the rarest grams are used), or with the index merged
+    into the sorted table and one participant registered after that
+    ('merged')
+    """
+    for row in PARTICIPANTS[:-1]:
+        db.add_participant(*row)
+    if layout != 'few':
+        for index in range(40):
+            db.add_participant(100 + index, None, f'Кузнецова Ольга {index}',
+                               f'+7811{index:07d}', f'{90000000 + index}')
+    if layout == 'merged':
+        db.write(db._merge_search_grams)
+    db.add_participant(*PARTICIPANTS[-1])
+    return db
+
+@pytest.fixture(scope='module', params=['few', 'many', 'merged'])
+def searchable(request, tmp_path_factory):
+    """A database per layout of register(), shared by the read-only tests"""
+    db = DatabaseManager(str(tmp_path_factory.mktemp('search') / 'lottery_bot.duckdb'))
+    db.init_database()
+    yield register(db, request.param)
+    db.close()
+
+def ranks(db, query, **kwargs):
+    page = db.search_participants(query, limit=500, **kwargs)
+    results = [(row['full_name'], row['search_rank']) for row in page]
+    assert [rank for _, rank in results] == sorted((rank for _, rank in results), reverse=True)
+    return dict(results)
+
+@pytest.mark.parametrize('query, expected', [
+    ('ann', {'Ann Smith': 3, 'Joanna Ann': 3, 'Annabel Lee': 2}),
+    ('ANN', {'Ann Smith': 3, 'Joanna Ann': 3, 'Annabel Lee': 2}),
+    ('an', {'Ann Smith': 2, 'Joanna Ann': 2, 'Annabel Lee': 2}),
+    ('иван', {'Иван Петров': 3, 'Петр Иванов': 2}),
+    ('ив', {'Иван Петров': 2, 'Петр Иванов': 2}),
+    ('ванов', {'Петр Иванов': 1}),
+    ('ann smith', {'Ann Smith': 3}),
+    ('@vanya', {'Иван Петров': 3}),
+    ('+7 (900) 123-45-67', {'Иван Петров': 3}),
+    ('900 123', {'Иван Петров': 1}),
+    ('1234', {'Иван Петров': 2}),
+    ('zzz', {}),
+    ('ов', {}),
+])
+def test_search_finds_and_ranks_matches(searchable, query, expected):
+    assert ranks(searchable, query) == expected
+
+def test_search_filters_by_status(db):
+    register(db, 'many')
+    participant = db.get_participant_by_telegram_id(3)
+    db.update_participant_status(participant['id'], 'approved', 1)
+    assert ranks(db, 'ann', status='approved') == {'Ann Smith': 3}
+
+def test_blank_query_lists_every_participant(searchable):
+    page = searchable.search_participants('   ', limit=500)
+    assert len(page) == searchable.connect().execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+
+def test_search_results_page_in_both_directions(searchable):
+    expected = [row['id'] for row in searchable.search_participants('an', limit=500)]
+
+    pages = [searchable.search_participants('an', limit=1)]
+    while pages[-1].next_cursor:
+        pages.append(searchable.search_participants('an', after=pages[-1].next_cursor, limit=1))
+    assert [row['id'] for page in pages for row in page] == expected
+
+    backward = [pages[-1]]
+    while backward[-1].prev_cursor:
+        backward.append(searchable.search_participants('an', before=backward[-1].prev_cursor, limit=1))
+    assert [row['id'] for page in reversed(backward) for row in page] == expected
+
+def test_normalize_query():
+    assert normalize_query('  @Ann  Smith ') == ['ann', 'smith']
+    assert normalize_query('+7 (900) 123-45-67') == ['79001234567']
+    assert normalize_query(' @ ') == []
+
+def test_short_words_only_match_word_starts():
+    assert word_grams('ab') == ['  a', ' ab']
+    assert word_grams('anna') == ['ann', 'nna']
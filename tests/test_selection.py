@@ -0,0 +1,108 @@
+"""
+Tests for the deterministic winner selection algorithms
+"""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from utils import selection
+from utils.lottery import LotterySystem
+from utils.selection import (DEFAULT_ALGORITHM, SHA256_CTR_V2, SHA256_INDEX_V1, resolve_algorithm,
+                             select_winners, sha256_ctr_ranks)
+
+SEEDS = ['a' * 64, '0f1e2d3c4b5a69788796a5b4c3d2e1f0', 'seed with spaces']
+
+def baseline_selection(seed, population, count):
+    """The list.pop() loop conduct_lottery used before selection was versioned"""
+    remaining = list(range(population))
+    positions = []
+    for index in range(count):
+        if not remaining:
+            break
+        digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+        positions.append(remaining.pop(int.from_bytes(digest[:8], byteorder='big') % len(remaining)))
+    return positions
+
+def reference_ctr_v2(seed, population, count):
+    """SHA256_CTR_V2 as specified, one word and one list.pop() at a time"""
+    def words():
+        block = 0
+        while True:
+            digest = hashlib.sha256(f"{seed}:".encode() + block.to_bytes(8, 'big')).digest()
+            for offset in range(0, 32, 8):
+                yield int.from_bytes(digest[offset:offset + 8], 'big')
+            block += 1
+
+    stream = words()
+    remaining = list(range(population))
+    positions = []
+    for index in range(min(count, population)):
+        bound = population - index
+        word = next(stream)
+        while word - word % bound > 2 ** 64 - bound:
+            word = next(stream)
+        positions.append(remaining.pop(word % bound))
+    return positions
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('population, count', [
+    (1, 1), (2, 2), (7, 3), (1000, 10), (1000, 1000), (4097, 300), (5, 9),
+])
+def test_sha256_index_v1_matches_the_original_draw(seed, population, count):
+    assert select_winners(seed, population, count, SHA256_INDEX_V1) == baseline_selection(seed, population, count)
+
+def test_empty_population_has_no_winners():
+    assert select_winners(SEEDS[0], 0, 3, SHA256_INDEX_V1) == []
+
+def test_legacy_algorithm_name_is_sha256_index_v1():
+    assert resolve_algorithm('SHA-256 deterministic selection') == SHA256_INDEX_V1
+    assert (select_winners(SEEDS[1], 500, 20, 'SHA-256 deterministic selection')
+            == select_winners(SEEDS[1], 500, 20, SHA256_INDEX_V1))
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        select_winners(SEEDS[0], 10, 1, 'md5-index-v0')
+
+def test_new_draws_use_sha256_ctr_v2():
+    assert DEFAULT_ALGORITHM == SHA256_CTR_V2
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('population, count', [
+    (1, 1), (2, 2), (7, 3), (1000, 10), (1000, 1000), (4097, 300), (5, 9),
+])
+def test_sha256_ctr_v2_matches_its_specification(seed, population, count):
+    assert select_winners(seed, population, count, SHA256_CTR_V2) == reference_ctr_v2(seed, population, count)
+
+def test_sha256_ctr_v2_differs_from_v1():
+    assert select_winners(SEEDS[0], 10 ** 6, 5, SHA256_CTR_V2) != select_winners(SEEDS[0], 10 ** 6, 5, SHA256_INDEX_V1)
+
+def test_rejected_words_are_skipped(monkeypatch):
+    # 2**64 - 1 is the only word rejected for a bound of 3 (2**64 mod 3 == 1);
+    # no word is rejected for the bounds 2 and 1 of the later draws
+    stream = [2 ** 64 - 1, 2 ** 64 - 1, 7, 9, 4]
+
+    class FixedStream:
+        def __init__(self, seed):
+            self.words_left = list(stream)
+
+        def words(self, count):
+            taken, self.words_left = self.words_left[:count], self.words_left[count:]
+            return np.array(taken, dtype=np.uint64)
+
+    monkeypatch.setattr(selection, 'CounterStream', FixedStream)
+    assert sha256_ctr_ranks('seed', 3, 3).tolist() == [7 % 3, 9 % 2, 0]
+
+def test_verification_defaults_to_sha256_index_v1(db):
+    seed = SEEDS[1]
+    seed_hash = hashlib.sha256(seed.encode()).hexdigest()
+    participants = [{'id': f'p{index}'} for index in range(50)]
+    lottery = LotterySystem(db)
+
+    def winners(algorithm):
+        return [participants[position] for position in select_winners(seed, 50, 5, algorithm)]
+
+    assert lottery.verify_lottery_result(seed, seed_hash, participants, winners(SHA256_INDEX_V1))
+    assert lottery.verify_lottery_result(seed, seed_hash, participants, winners(SHA256_CTR_V2), SHA256_CTR_V2)
+    assert not lottery.verify_lottery_result(seed, seed_hash, participants, winners(SHA256_CTR_V2))
@@ -0,0 +1,140 @@
+"""
+Tests for the group-committing database writer
+"""
+
+import threading
+
+import duckdb
+import pytest
+
+from database.connection import ConnectionManager
+from database.writer import WriteQueue
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ConnectionManager.acquire(str(tmp_path / 'writer.duckdb'), 2, 50)
+    manager.cursor().execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+    yield manager
+    manager.release()
+
+def record_groups(writer, monkeypatch):
+    """Sizes of the transactions the writer runs, in order"""
+    sizes = []
+    apply = writer._apply
+
+    def recording_apply(batch):
+        sizes.append(len(batch))
+        apply(batch)
+
+    monkeypatch.setattr(writer, '_apply', recording_apply)
+    return sizes
+
+@pytest.fixture
+def groups(manager, monkeypatch):
+    return record_groups(manager.writer, monkeypatch)
+
+def hold(writer):
+    """Keep the writer busy until the returned event is set, so later writes queue up"""
+    started, release = threading.Event(), threading.Event()
+
+    def block(conn):
+        started.set()
+        release.wait(5)
+
+    writer.submit(block)
+    assert started.wait(5)
+    return release
+
+def insert(conn, item_id):
+    conn.execute("INSERT INTO items VALUES (?)", [item_id])
+    return item_id
+
+def insert_and_fail(conn, item_id):
+    insert(conn, item_id)
+    raise ValueError("write failed")
+
+def item_ids(manager):
+    return [row[0] for row in manager.cursor().execute("SELECT id FROM items ORDER BY id").fetchall()]
+
+def test_write_returns_its_result_once_committed(manager):
+    assert manager.writer.write(insert, 1) == 1
+    assert item_ids(manager) == [1]
+
+def test_queued_writes_are_committed_together(manager, groups):
+    release = hold(manager.writer)
+    futures = [manager.writer.submit(insert, item_id) for item_id in range(5)]
+    release.set()
+
+    assert [future.result(5) for future in futures] == list(range(5))
+    assert groups == [1, 5]
+    assert item_ids(manager) == list(range(5))
+
+def test_groups_are_capped_at_the_batch_size(tmp_path, monkeypatch):
+    manager = ConnectionManager.acquire(str(tmp_path / 'small_batch.duckdb'), 2, 2)
+    try:
+        manager.cursor().execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        sizes = record_groups(manager.writer, monkeypatch)
+
+        release = hold(manager.writer)
+        futures = [manager.writer.submit(insert, item_id) for item_id in range(5)]
+        release.set()
+        for future in futures:
+            future.result(5)
+        assert sizes == [1, 2, 2, 1]
+    finally:
+        manager.release()
+
+def test_failed_group_is_rolled_back_and_retried_one_by_one(manager, groups):
+    release = hold(manager.writer)
+    first = manager.writer.submit(insert, 1)
+    failing = manager.writer.submit(insert_and_fail, 99)
+    last = manager.writer.submit(insert, 2)
+    release.set()
+
+    assert first.result(5) == 1
+    assert last.result(5) == 2
+    with pytest.raises(ValueError):
+        failing.result(5)
+    # The group, then each write on its own; the failed insert is not kept
+    assert groups == [1, 3, 1, 1, 1]
+    assert item_ids(manager) == [1, 2]
+
+def test_a_failed_write_does_not_affect_later_ones(manager):
+    manager.writer.write(insert, 1)
+    with pytest.raises(duckdb.ConstraintException):
+        manager.writer.write(insert, 1)
+
+    assert manager.writer.write(insert, 2) == 2
+    assert item_ids(manager) == [1, 2]
+
+def test_nested_write_joins_the_outer_transaction(manager):
+    def outer(conn):
+        insert(conn, 1)
+        return manager.writer.write(lambda inner: inner is conn)
+
+    assert manager.writer.write(outer) is True
+    assert item_ids(manager) == [1]
+
+def test_stop_applies_queued_writes_then_refuses_new_ones(manager):
+    release = hold(manager.writer)
+    futures = [manager.writer.submit(insert, item_id) for item_id in range(3)]
+    release.set()
+    manager.writer.stop()
+
+    assert all(future.done() for future in futures)
+    assert item_ids(manager) == [0, 1, 2]
+    with pytest.raises(RuntimeError):
+        manager.writer.submit(insert, 3)
+
+def test_pending_writes_fail_when_no_cursor_can_be_opened():
+    class BrokenConnections:
+        def cursor(self):
+            raise RuntimeError("database is closed")
+
+    writer = WriteQueue(BrokenConnections(), max_batch=10)
+    future = writer.submit(insert, 1)
+    with pytest.raises(RuntimeError, match="database is closed"):
+        future.result(5)
+    # The next write starts a new thread instead of queueing behind a dead one
+    with pytest.raises(RuntimeError, match="database is closed"):
+        writer.write(insert, 2)
@@ -0,0 +1,247 @@
+"""
+Re-verify every recorded draw from its snapshot and write a signed report
+
+The database is opened read-only, so the audit never writes to it or runs
+migrations. Draws are checked in parallel by a process pool; each worker
+decodes the frozen participant pool, recomputes its Merkle root and reruns
+the recorded selection algorithm. The report is signed with Ed25519 so
+anyone holding the published public key can check that it was not altered.
+
+Usage:
+    python -m utils.audit --workers 8 --output exports/draw_audit.json
+    python -m utils.audit --verify exports/draw_audit.json --public-key <hex>
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import duckdb
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from config import Config
+from database.snapshots import DRAWS_SQL, SELECT_SNAPSHOT_SQL, decode_participant_ids
+from utils.merkle import merkle_root
+from utils.selection import select_winners
+
+PASSED = 'passed'
+FAILED = 'failed'
+NO_SNAPSHOT = 'no snapshot'
+
+SIGNATURE_ALGORITHM = 'ed25519'
+
+def check_snapshot(snapshot: Dict, seed_hash: str, winner_rows: Sequence[str]) -> Dict[str, bool]:
+    """
+    Result of every check of a draw snapshot with decoded participant_ids
+
+    The seed must hash to seed_hash, the pool must match its count and
+    Merkle root, the recorded algorithm must reproduce the winners in
+    their original order, and winner_rows (participant ids of the winners
+    rows with this seed_hash) must be exactly those winners. A winner row
+    deleted by an admin therefore fails the draw too.
+    """
+    participant_ids = snapshot['participant_ids']
+    checks = {
+        'seed hash': hashlib.sha256(snapshot['seed'].encode()).hexdigest() == seed_hash,
+        'pool size': len(participant_ids) == snapshot['participant_count'],
+        'merkle root': merkle_root(participant_ids) == snapshot['merkle_root'],
+    }
+
+    positions = select_winners(snapshot['seed'], len(participant_ids),
+                               len(snapshot['winner_ids']), snapshot['algorithm'])
+    checks['winners'] = [participant_ids[position] for position in positions] == snapshot['winner_ids']
+    checks['winner rows'] = set(winner_rows) == set(snapshot['winner_ids'])
+    return checks
+
+def audit_draw(draw: Dict) -> Dict:
+    """
+    Verify one draw in a worker process
+
+    draw is a row of DRAWS_SQL with the undecoded snapshot under 'snapshot'
+    (None if the draw has none).
+    """
+    started = time.perf_counter()
+    result = {
+        'draw_number': draw['draw_number'],
+        'seed_hash': draw['seed_hash'],
+        'winners': len(draw['participant_ids']),
+    }
+
+    snapshot = draw['snapshot']
+    if snapshot is None:
+        result.update(status=NO_SNAPSHOT, failed_checks=[])
+        return result
+
+    try:
+        snapshot = dict(snapshot, participant_ids=decode_participant_ids(snapshot['participant_ids']))
+        checks = check_snapshot(snapshot, draw['seed_hash'], draw['participant_ids'])
+        failed = [name for name, passed in checks.items() if not passed]
+    except Exception as e:
+        failed = [f'error: {e}']
+
+    result.update(
+        status=FAILED if failed else PASSED,
+        failed_checks=failed,
+        algorithm=snapshot['algorithm'],
+        participant_count=snapshot['participant_count'],
+        participants_merkle_root=snapshot['merkle_root'],
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return result
+
+def _fetch_dicts(conn: duckdb.DuckDBPyConnection, sql: str, params: List = None) -> List[Dict]:
+    results = conn.execute(sql, params or []).fetchall()
+    columns = [desc[0] for desc in conn.description]
+    return [dict(zip(columns, row)) for row in results]
+
+def _draws_with_snapshots(conn: duckdb.DuckDBPyConnection, draws: List[Dict]) -> Iterator[Dict]:
+    for draw in draws:
+        snapshot = None
+        if draw['has_snapshot']:
+            snapshot = _fetch_dicts(conn, SELECT_SNAPSHOT_SQL, [draw['seed_hash']])[0]
+        yield dict(draw, draw_date=str(draw['draw_date']), snapshot=snapshot)
+
+def audit_draws(conn: duckdb.DuckDBPyConnection, workers: int = None) -> List[Dict]:
+    """
+    Verify every draw in winners across a pool of worker processes
+
+    conn should be read-only. Snapshots are read one at a time and at most
+    two per worker are in flight, so memory stays bounded by the largest
+    pools rather than the whole history. Workers are spawned rather than
+    forked, so they never inherit the open database handle. Results are in
+    draw order.
+    """
+    workers = workers or os.cpu_count() or 1
+    draws = _fetch_dicts(conn, DRAWS_SQL)
+    pending = _draws_with_snapshots(conn, draws)
+    results = []
+
+    mp_context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        in_flight = set()
+        for draw in pending:
+            in_flight.add(executor.submit(audit_draw, draw))
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+        results.extend(future.result() for future in in_flight)
+
+    order = {draw['seed_hash']: index for index, draw in enumerate(draws)}
+    return sorted(results, key=lambda result: order[result['seed_hash']])
+
+def _canonical(report: Dict) -> bytes:
+    """The signed bytes: the report without its signature, as canonical JSON"""
+    body = {key: value for key, value in report.items() if key != 'signature'}
+    return json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+def load_signing_key(path: str) -> Ed25519PrivateKey:
+    """Load the PEM signing key at path, creating it on first use"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+
+    key = Ed25519PrivateKey.generate()
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pem)
+    return key
+
+def public_key_hex(key: Ed25519PrivateKey) -> str:
+    return key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw).hex()
+
+def build_report(results: List[Dict], key: Ed25519PrivateKey, seconds: float) -> Dict:
+    """Summarize the audit results and sign them"""
+    summary = {status: sum(1 for result in results if result['status'] == status)
+               for status in (PASSED, FAILED, NO_SNAPSHOT)}
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'total_draws': len(results),
+        'summary': summary,
+        'seconds': round(seconds, 3),
+        'draws': results,
+    }
+    report['signature'] = {
+        'algorithm': SIGNATURE_ALGORITHM,
+        'public_key': public_key_hex(key),
+        'value': key.sign(_canonical(report)).hex(),
+    }
+    return report
+
+def verify_report(report: Dict, public_key: Optional[str] = None) -> bool:
+    """
+    Check the signature of a report
+
+    public_key (hex) should be the key published by the operator; without
+    it only the key embedded in the report is used, which proves the
+    report is intact but not who signed it.
+    """
+    signature = report.get('signature') or {}
+    if signature.get('algorithm') != SIGNATURE_ALGORITHM:
+        return False
+    if public_key is not None and public_key != signature.get('public_key'):
+        return False
+
+    try:
+        key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(signature['public_key']))
+        key.verify(bytes.fromhex(signature['value']), _canonical(report))
+    except (InvalidSignature, KeyError, ValueError):
+        return False
+    return True
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', default=None, help='Report path (default: a timestamped file in EXPORT_FOLDER)')
+    parser.add_argument('--key', default=Config.AUDIT_SIGNING_KEY_PATH, help='Ed25519 PEM signing key')
+    parser.add_argument('--verify', metavar='REPORT', help='Check the signature of a report instead of auditing')
+    parser.add_argument('--public-key', default=None, help='Expected signer public key (hex) for --verify')
+    args = parser.parse_args()
+
+    if args.verify:
+        with open(args.verify, encoding='utf-8') as f:
+            report = json.load(f)
+        valid = verify_report(report, args.public_key)
+        print(f"Signature {'valid' if valid else 'INVALID'}: {args.verify}")
+        sys.exit(0 if valid else 1)
+
+    key = load_signing_key(args.key)
+    conn = duckdb.connect(Config.DATABASE_PATH, read_only=True)
+    try:
+        started = time.perf_counter()
+        results = audit_draws(conn, args.workers)
+        report = build_report(results, key, time.perf_counter() - started)
+    finally:
+        conn.close()
+
+    output = args.output or os.path.join(
+        Config.EXPORT_FOLDER, f"draw_audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for result in results:
+        if result['status'] != PASSED:
+            details = f" ({', '.join(result['failed_checks'])})" if result['failed_checks'] else ''
+            print(f"Draw #{result['draw_number']} {result['seed_hash'][:16]}: {result['status']}{details}")
+
+    summary = report['summary']
+    print(f"Audited {report['total_draws']} draws in {report['seconds']:.1f}s: "
+          f"{summary[PASSED]} passed, {summary[FAILED]} failed, {summary[NO_SNAPSHOT]} without snapshot")
+    print(f"Report: {output}")
+    print(f"Signer public key: {report['signature']['public_key']}")
+    sys.exit(1 if summary[FAILED] else 0)
+
+if __name__ == '__main__':
+    main()
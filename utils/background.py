@@ -0,0 +1,83 @@
+"""
+Long-lived asyncio event loop running in a background thread
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+class BackgroundLoop:
+    """Event loop owned by a daemon thread, usable from synchronous code"""
+
+    def __init__(self, name: str = 'background-loop'):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread if it is not running yet"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self.loop
+
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+        self._started.wait()
+        return self.loop
+
+    def _run(self) -> None:
+        """Thread body: run the loop until stop() is called"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._started.set()
+
+        logger.info(f"Background loop '{self.name}' started")
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+            logger.info(f"Background loop '{self.name}' stopped")
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the loop from any thread"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args) -> None:
+        """Run a plain callback on the loop thread"""
+        self.start()
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Cancel the loop's tasks, then stop the loop and wait for its thread
+
+        Tasks get up to timeout seconds to run their cleanup, such as
+        writing buffered delivery outcomes, so stop the loop before the
+        database it writes to is closed.
+        """
+        if self.loop and self._thread and self._thread.is_alive():
+            future = asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self.loop)
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Background loop '{self.name}' tasks did not finish cleanly: {e}")
+
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+    async def _cancel_tasks(self) -> None:
+        """Cancel every other task on the loop and wait for them to finish"""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
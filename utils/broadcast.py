@@ -4,20 +4,130 @@ Broadcast system for mass messaging via Telegram
 
 import asyncio
 import logging
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from config import Config
 from database import DatabaseManager
+from database.pagination import Page, fetch_page
+from utils.rate_limiter import TokenBucket, ChatRateLimiter, bot_bucket
 
 logger = logging.getLogger(__name__)
 
+# Pagination sort key of broadcast recipients (sent_at with NULLs last)
+RECIPIENT_SENT_ORDER = "COALESCE(br.sent_at, TIMESTAMP '1970-01-01')"
+
+# update_broadcast value removing a broadcast's schedule (None keeps it)
+CLEAR_SCHEDULE = object()
+
+class DeliveryBuffer:
+    """
+    Buffers recipient delivery outcomes and writes them in bulk
+    
+    A batch is flushed as soon as it is full, and a background task flushes
+    whatever is buffered every flush interval, so outcomes are persisted on
+    time even while sending is paused by flood control. Writes run on the
+    database executor, so the event loop keeps sending while they commit.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, broadcast_id: str,
+                 batch_size: int = None, flush_interval_ms: int = None):
+        self.db_manager = db_manager
+        self.broadcast_id = broadcast_id
+        self.batch_size = batch_size or Config.BROADCAST_FLUSH_BATCH
+        self.flush_interval = (flush_interval_ms or Config.BROADCAST_FLUSH_INTERVAL_MS) / 1000
+        self._pending: List[Tuple[str, str, Optional[str]]] = []
+        self._suppressed: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start the periodic flush on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+    
+    async def close(self) -> None:
+        """Stop the periodic flush and write the outcomes still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush delivery outcomes of broadcast {self.broadcast_id}: {e}")
+    
+    async def record(self, recipient_id: str, status: str, error_message: str = None) -> None:
+        """Add one outcome, flushing when the batch is full"""
+        self._pending.append((recipient_id, status, error_message))
+        
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+    
+    def suppress(self, telegram_id: int, reason: str) -> None:
+        """Add a chat to the suppression list with the next flush"""
+        self._suppressed[telegram_id] = reason
+    
+    async def flush(self) -> None:
+        """Write buffered outcomes and progress counters in one transaction"""
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        suppressed, self._suppressed = self._suppressed, {}
+        sent = sum(1 for _, status, _ in batch if status == 'sent')
+        failed = len(batch) - sent
+        
+        values = ', '.join(['(?, ?, ?)'] * len(batch))
+        params = [value for outcome in batch for value in outcome]
+        
+        def apply(conn):
+            conn.execute(f"""
+                UPDATE broadcast_recipients
+                SET status = outcome.status,
+                    sent_at = CASE WHEN outcome.status = 'sent'
+                                   THEN CURRENT_TIMESTAMP ELSE broadcast_recipients.sent_at END,
+                    error_message = outcome.error_message
+                FROM (VALUES {values}) AS outcome(id, status, error_message)
+                WHERE broadcast_recipients.id = outcome.id
+            """, params)
+            
+            conn.execute("""
+                UPDATE broadcasts
+                SET sent_count = sent_count + ?, failed_count = failed_count + ?
+                WHERE id = ?
+            """, [sent, failed, self.broadcast_id])
+            
+            if suppressed:
+                rows = ', '.join(['(?, ?, ?)'] * len(suppressed))
+                conn.execute(f"""
+                    INSERT INTO broadcast_suppressions (telegram_id, reason, broadcast_id)
+                    SELECT * FROM (VALUES {rows}) AS blocked(telegram_id, reason, broadcast_id)
+                    ON CONFLICT DO NOTHING
+                """, [value for telegram_id, reason in suppressed.items()
+                      for value in (telegram_id, reason, self.broadcast_id)])
+        
+        await self.db_manager.aio.write(apply)
+
 class BroadcastSystem:
     """System for managing and sending mass messages"""
     
     def __init__(self, db_manager: DatabaseManager, bot: Bot = None):
         self.db_manager = db_manager
         self.bot = bot
+        # Telegram file_id of already uploaded broadcast images, by image path
+        self._photo_file_ids: Dict[str, str] = {}
+        # Optional BroadcastScheduler notified when schedules change
+        self.scheduler = None
     
     def create_broadcast(self, title: str, message_text: str, target_audience: str,
                         created_by: int, message_type: str = 'text',
@@ -37,61 +147,124 @@ class BroadcastSystem:
         Returns:
             Broadcast ID
         """
-        conn = self.db_manager.connect()
-        
         import uuid
         broadcast_id = str(uuid.uuid4())
         
-        # Get target recipients
-        recipients = self._get_target_recipients(target_audience)
-        total_recipients = len(recipients)
-        
-        # Insert broadcast record
-        conn.execute("""
+        # Insert broadcast record. It is committed on its own: DuckDB cannot
+        # replay a WAL transaction that inserts both a row and rows
+        # referencing it, and would drop everything logged after it.
+        self.db_manager.write(lambda conn: conn.execute("""
             INSERT INTO broadcasts 
             (id, title, message_text, message_type, image_path, target_audience,
-             created_by, scheduled_at, total_recipients)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+             created_by, scheduled_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, [broadcast_id, title, message_text, message_type, image_path,
-              target_audience, created_by, scheduled_at, total_recipients])
+              target_audience, created_by, scheduled_at]))
         
-        # Insert recipient records
-        for participant in recipients:
-            recipient_id = str(uuid.uuid4())
-            conn.execute("""
-                INSERT INTO broadcast_recipients
-                (id, broadcast_id, participant_id, telegram_id)
-                VALUES (?, ?, ?, ?)
-            """, [recipient_id, broadcast_id, participant.get('id'), participant['telegram_id']])
+        # Insert recipient records and set the total in the database
+        try:
+            total_recipients = self.db_manager.write(
+                self._materialize_recipients, broadcast_id, target_audience
+            )
+        except Exception:
+            self.db_manager.write(lambda conn: conn.execute("""
+                DELETE FROM broadcasts WHERE id = ?
+            """, [broadcast_id]))
+            raise
+        
+        if scheduled_at:
+            self._refresh_schedule(broadcast_id, scheduled_at)
         
         logger.info(f"Created broadcast {broadcast_id} for {total_recipients} recipients")
         return broadcast_id
     
-    def _get_target_recipients(self, target_audience: str) -> List[Dict]:
-        """Get list of recipients based on target audience"""
+    def _refresh_schedule(self, broadcast_id: str, scheduled_at: Optional[datetime]) -> None:
+        """Tell the scheduler about a new, changed or removed fire time"""
+        if self.scheduler:
+            self.scheduler.refresh(broadcast_id, scheduled_at)
+    
+    def _target_recipients_query(self, target_audience: str) -> Tuple[str, List]:
+        """Build the SELECT returning (participant_id, telegram_id) for an audience, without suppressed chats"""
+        query, params = self._audience_query(target_audience)
+        return f"""
+            SELECT audience.id, audience.telegram_id FROM ({query}) AS audience
+            WHERE NOT EXISTS (
+                SELECT 1 FROM broadcast_suppressions s WHERE s.telegram_id = audience.telegram_id
+            )
+        """, params
+    
+    def _audience_query(self, target_audience: str) -> Tuple[str, List]:
+        """Build the SELECT returning (participant_id, telegram_id) for every member of an audience"""
         if target_audience == 'all':
-            return self.db_manager.get_all_participants()
-        elif target_audience == 'approved':
-            return self.db_manager.get_all_participants(status='approved')
-        elif target_audience == 'pending':
-            return self.db_manager.get_all_participants(status='pending')
-        elif target_audience == 'rejected':
-            return self.db_manager.get_all_participants(status='rejected')
+            return "SELECT p.id, p.telegram_id FROM participants p", []
+        elif target_audience in ('approved', 'pending', 'rejected'):
+            return "SELECT p.id, p.telegram_id FROM participants p WHERE p.status = ?", [target_audience]
         elif target_audience == 'winners':
-            winners = self.db_manager.get_winners()
-            winner_participant_ids = [w['participant_id'] for w in winners]
-            participants = self.db_manager.get_all_participants()
-            return [p for p in participants if p['id'] in winner_participant_ids]
+            return """
+                SELECT p.id, p.telegram_id FROM participants p
+                WHERE EXISTS (
+                    SELECT 1 FROM winners w
+                    WHERE w.participant_id = p.id AND w.is_valid = TRUE
+                )
+            """, []
         else:
             raise ValueError(f"Unknown target audience: {target_audience}")
     
-    async def send_broadcast(self, broadcast_id: str, bot: Bot = None) -> Dict:
+    def _materialize_recipients(self, conn, broadcast_id: str, target_audience: str) -> int:
+        """Insert all recipients of an audience with one statement and return their count"""
+        query, params = self._target_recipients_query(target_audience)
+        
+        result = conn.execute(f"""
+            INSERT INTO broadcast_recipients (id, broadcast_id, participant_id, telegram_id)
+            SELECT gen_random_uuid()::VARCHAR, ?, audience.id, audience.telegram_id
+            FROM ({query}) AS audience
+        """, [broadcast_id] + params).fetchone()
+        total_recipients = result[0] if result else 0
+        
+        # Audience members left out because they blocked the bot
+        query, params = self._audience_query(target_audience)
+        suppressed_count = conn.execute(f"""
+            SELECT COUNT(*) FROM ({query}) AS audience
+            JOIN broadcast_suppressions s ON s.telegram_id = audience.telegram_id
+        """, params).fetchone()[0]
+        
+        conn.execute("""
+            UPDATE broadcasts SET total_recipients = ?, suppressed_count = ? WHERE id = ?
+        """, [total_recipients, suppressed_count, broadcast_id])
+        
+        return total_recipients
+    
+    def _get_target_recipients(self, target_audience: str) -> List[Dict]:
+        """Get list of recipients based on target audience"""
+        conn = self.db_manager.connect()
+        query, params = self._target_recipients_query(target_audience)
+        
+        results = conn.execute(query, params).fetchall()
+        return [{'id': row[0], 'telegram_id': row[1]} for row in results]
+    
+    def count_target_recipients(self, target_audience: str) -> int:
+        """Count recipients of an audience without loading them"""
+        conn = self.db_manager.connect()
+        query, params = self._target_recipients_query(target_audience)
+        
+        result = conn.execute(f"SELECT COUNT(*) FROM ({query}) AS audience", params).fetchone()
+        return result[0]
+    
+    async def send_broadcast(self, broadcast_id: str, bot: Bot = None,
+                             progress: Dict = None) -> Dict:
         """
         Send broadcast messages
         
+        Messages are sent by a pool of workers sharing the bot's global token
+        bucket (also used by notifications), so throughput follows
+        BROADCAST_RATE_LIMIT instead of a fixed delay. Database writes are
+        awaited through db_manager.aio, so a commit never stalls the loop
+        shared with the notification outbox.
+        
         Args:
             broadcast_id: ID of broadcast to send
             bot: Telegram bot instance
+            progress: Optional dict updated in place with total/sent/failed counts
             
         Returns:
             Results dictionary
@@ -116,88 +289,333 @@ class BroadcastSystem:
         columns = [desc[0] for desc in conn.description]
         broadcast = dict(zip(columns, broadcast_info))
         
-        # Update status to 'sending'
-        conn.execute("""
-            UPDATE broadcasts SET status = 'sending' WHERE id = ?
-        """, [broadcast_id])
+        # Reuse an already uploaded copy of the image if there is one
+        if broadcast['message_type'] == 'photo' and broadcast['image_path'] and not broadcast['photo_file_id']:
+            broadcast['photo_file_id'] = self._find_photo_file_id(broadcast['image_path'])
+        
+        # Update status to 'sending', unless it was cancelled or already
+        # sent since it was queued ('sending' means resuming an interrupted run)
+        # (DuckDB rejects RETURNING on a table referenced by foreign keys,
+        # so the updated row count tells whether it was started)
+        started = await self.db_manager.aio.write(lambda conn: conn.execute("""
+            UPDATE broadcasts SET status = 'sending'
+            WHERE id = ? AND status IN ('draft', 'sending')
+        """, [broadcast_id]).fetchone()[0])
+        
+        if not started:
+            raise ValueError(f"Broadcast {broadcast_id} cannot be sent in status '{broadcast['status']}'")
+        
+        # Sent now, so a pending schedule must not fire it again
+        self._refresh_schedule(broadcast_id, None)
         
-        # Get recipients
-        recipients = conn.execute("""
-            SELECT * FROM broadcast_recipients 
+        # Count recipients left for this run (all of them unless resuming)
+        total_recipients = conn.execute("""
+            SELECT COUNT(*) FROM broadcast_recipients 
             WHERE broadcast_id = ? AND status = 'pending'
-        """, [broadcast_id]).fetchall()
+        """, [broadcast_id]).fetchone()[0]
+        
+        # Shared sending state
+        bucket = bot_bucket(self.bot, Config.BROADCAST_RATE_LIMIT)
+        chat_limiter = ChatRateLimiter(Config.BROADCAST_PER_CHAT_INTERVAL)
+        counters = progress if progress is not None else {}
+        counters.update({'total': total_recipients, 'sent': 0, 'failed': 0, 'blocked': 0})
+        delivery_buffer = DeliveryBuffer(self.db_manager, broadcast_id)
+        upload_lock = asyncio.Lock()
+        queue: asyncio.Queue = asyncio.Queue()
+        num_workers = max(1, min(Config.BROADCAST_WORKERS, total_recipients))
+        # Claimed recipients not yet handled by a worker. A crash fails the
+        # claimed ones, so only as many are claimed as the workers and
+        # queue hold, not a whole flush batch.
+        capacity = num_workers * 3
+        slots = asyncio.Semaphore(capacity)
+        
+        started_at = time.monotonic()
+        delivery_buffer.start()
+        workers = [
+            asyncio.create_task(
+                self._send_worker(queue, slots, broadcast, bucket, chat_limiter,
+                                  upload_lock, delivery_buffer, counters)
+            )
+            for _ in range(num_workers)
+        ]
         
-        columns = [desc[0] for desc in conn.description]
-        recipients = [dict(zip(columns, row)) for row in recipients]
+        try:
+            # Claim recipients in chunks so a restart never sends to them twice
+            while True:
+                # Wait for room for one recipient per worker, then take any more that is free
+                count = 0
+                while count < num_workers or (count < capacity and not slots.locked()):
+                    await slots.acquire()
+                    count += 1
+                
+                recipients = await self._claim_recipients(broadcast_id, count)
+                for _ in range(count - len(recipients)):
+                    slots.release()
+                if not recipients:
+                    break
+                
+                for recipient in recipients:
+                    queue.put_nowait(recipient)
+            
+            # One stop marker per worker
+            for _ in workers:
+                queue.put_nowait(None)
+            
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            
+            # Recipients still queued were never attempted and can be sent later
+            unsent = []
+            while not queue.empty():
+                recipient = queue.get_nowait()
+                if recipient is not None:
+                    unsent.append(recipient['id'])
+            if unsent:
+                await self.db_manager.aio.write(lambda conn: conn.execute("""
+                    UPDATE broadcast_recipients SET status = 'pending'
+                    WHERE id IN (SELECT UNNEST(?))
+                """, [unsent]))
+            raise
+        finally:
+            # Persist whatever was delivered, even if sending was interrupted
+            await delivery_buffer.close()
+        
+        duration = time.monotonic() - started_at
+        sent_count = counters['sent']
+        failed_count = counters['failed']
+        blocked_count = counters['blocked']
+        
+        # Counters were written at each flush, only the status is left
+        # (a broadcast cancelled while sending keeps its 'cancelled' status)
+        await self.db_manager.aio.write(lambda conn: conn.execute("""
+            UPDATE broadcasts SET status = 'completed' WHERE id = ? AND status = 'sending'
+        """, [broadcast_id]))
+        
+        result = {
+            'broadcast_id': broadcast_id,
+            'total_recipients': total_recipients,
+            'sent_count': sent_count,
+            'failed_count': failed_count,
+            'blocked_count': blocked_count,
+            'suppressed_count': broadcast['suppressed_count'] or 0,
+            'success_rate': (sent_count / total_recipients * 100) if total_recipients else 0,
+            'duration_seconds': round(duration, 2),
+            'messages_per_second': round((sent_count + failed_count) / duration, 2) if duration > 0 else 0
+        }
+        
+        logger.info(
+            f"Broadcast {broadcast_id} completed: {sent_count} sent, {failed_count} failed "
+            f"in {result['duration_seconds']}s ({result['messages_per_second']} msg/s)"
+        )
+        return result
+    
+    async def _claim_recipients(self, broadcast_id: str, limit: int) -> List[Dict]:
+        """Mark the next pending recipients as 'sending' and return them"""
+        def claim(conn):
+            results = conn.execute("""
+                SELECT id, telegram_id FROM broadcast_recipients
+                WHERE broadcast_id = ? AND status = 'pending'
+                LIMIT ?
+            """, [broadcast_id, limit]).fetchall()
+            
+            if results:
+                conn.execute("""
+                    UPDATE broadcast_recipients SET status = 'sending'
+                    WHERE id IN (SELECT UNNEST(?))
+                """, [[row[0] for row in results]])
+            return results
+        
+        results = await self.db_manager.aio.write(claim)
+        return [{'id': row[0], 'telegram_id': row[1]} for row in results]
+    
+    def _release_unconfirmed_recipients(self, broadcast_id: str) -> int:
+        """
+        Fail recipients claimed by a run that died before recording an outcome
         
-        # Send messages
-        sent_count = 0
-        failed_count = 0
+        Their message may or may not have been delivered, so they are not
+        retried: a missed message is better than a duplicate one.
+        """
+        def release(conn):
+            result = conn.execute("""
+                UPDATE broadcast_recipients
+                SET status = 'failed', error_message = 'Interrupted before delivery was confirmed'
+                WHERE broadcast_id = ? AND status = 'sending'
+            """, [broadcast_id]).fetchone()
+            released = result[0] if result else 0
+            
+            conn.execute("""
+                UPDATE broadcasts SET failed_count = failed_count + ? WHERE id = ?
+            """, [released, broadcast_id])
+            return released
+        
+        return self.db_manager.write(release)
+    
+    def prepare_interrupted_broadcasts(self) -> List[str]:
+        """
+        Find broadcasts left in 'sending' status by a crash or restart
         
-        for recipient in recipients:
+        Their unconfirmed recipients are failed, so sending them again only
+        reaches recipients still in 'pending' status. Call this once at
+        startup, before any broadcast is being sent.
+        
+        Returns:
+            IDs of the broadcasts to send again, oldest first
+        """
+        conn = self.db_manager.connect()
+        
+        interrupted = conn.execute("""
+            SELECT id FROM broadcasts WHERE status = 'sending' ORDER BY created_at
+        """).fetchall()
+        
+        broadcast_ids = []
+        for (broadcast_id,) in interrupted:
+            released = self._release_unconfirmed_recipients(broadcast_id)
+            logger.info(f"Resuming broadcast {broadcast_id} ({released} unconfirmed recipients skipped)")
+            broadcast_ids.append(broadcast_id)
+        
+        return broadcast_ids
+    
+    async def _send_worker(self, queue: asyncio.Queue, slots: asyncio.Semaphore, broadcast: Dict,
+                           bucket: TokenBucket, chat_limiter: ChatRateLimiter,
+                           upload_lock: asyncio.Lock, delivery_buffer: DeliveryBuffer,
+                           counters: Dict[str, int]) -> None:
+        """Take recipients from the queue and deliver them until a stop marker arrives"""
+        while True:
+            recipient = await queue.get()
+            if recipient is None:
+                return
+            
             try:
-                success = await self._send_single_message(
-                    recipient['telegram_id'],
-                    broadcast['message_text'],
-                    broadcast['message_type'],
-                    broadcast['image_path']
+                outcome = await self._deliver_with_retry(
+                    recipient['telegram_id'], broadcast, bucket, chat_limiter, upload_lock
                 )
                 
-                if success:
-                    # Update recipient status
-                    conn.execute("""
-                        UPDATE broadcast_recipients 
-                        SET status = 'sent', sent_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    """, [recipient['id']])
-                    sent_count += 1
+                if outcome == 'sent':
+                    counters['sent'] += 1
+                    await delivery_buffer.record(recipient['id'], 'sent')
+                elif outcome == 'blocked':
+                    # Skip this chat in future broadcasts
+                    counters['failed'] += 1
+                    counters['blocked'] += 1
+                    delivery_buffer.suppress(recipient['telegram_id'], 'blocked')
+                    await delivery_buffer.record(recipient['id'], 'failed', 'Bot was blocked by the user')
                 else:
-                    failed_count += 1
-                
-                # Rate limiting - wait between messages
-                await asyncio.sleep(0.1)  # 100ms delay
+                    counters['failed'] += 1
+                    await delivery_buffer.record(recipient['id'], 'failed', 'Message was not delivered')
                 
             except Exception as e:
                 logger.error(f"Failed to send to {recipient['telegram_id']}: {e}")
-                
-                # Update recipient with error
-                conn.execute("""
-                    UPDATE broadcast_recipients 
-                    SET status = 'failed', error_message = ?
-                    WHERE id = ?
-                """, [str(e), recipient['id']])
-                failed_count += 1
+                counters['failed'] += 1
+                await delivery_buffer.record(recipient['id'], 'failed', str(e))
+            finally:
+                # Let the next recipient be claimed
+                slots.release()
+    
+    async def _deliver_with_retry(self, telegram_id: int, broadcast: Dict,
+                                  bucket: TokenBucket, chat_limiter: ChatRateLimiter,
+                                  upload_lock: asyncio.Lock) -> str:
+        """
+        Send one message respecting rate limits, retrying after flood control
         
-        # Update broadcast statistics
-        conn.execute("""
-            UPDATE broadcasts 
-            SET status = 'completed', sent_count = ?, failed_count = ?
-            WHERE id = ?
-        """, [sent_count, failed_count, broadcast_id])
+        Returns:
+            'sent', 'blocked' (user blocked the bot) or 'failed'
+        """
+        for attempt in range(Config.BROADCAST_MAX_RETRIES + 1):
+            await chat_limiter.wait(telegram_id)
+            await bucket.acquire()
+            
+            try:
+                if self._needs_photo_upload(broadcast):
+                    # Upload the image once; other workers wait and reuse its file_id
+                    async with upload_lock:
+                        if self._needs_photo_upload(broadcast):
+                            success = await self._send_and_store_photo(telegram_id, broadcast)
+                            return 'sent' if success else 'failed'
+                
+                success = await self._send_single_message(
+                    telegram_id,
+                    broadcast['message_text'],
+                    broadcast['message_type'],
+                    broadcast['image_path'],
+                    broadcast['photo_file_id']
+                )
+                return 'sent' if success else 'failed'
+            except TelegramForbiddenError:
+                # User blocked the bot
+                logger.warning(f"User {telegram_id} blocked the bot")
+                return 'blocked'
+            except TelegramRetryAfter as e:
+                # Flood control applies to the whole bot, so pause every worker
+                logger.warning(f"Flood control hit, pausing broadcast for {e.retry_after}s")
+                bucket.pause(e.retry_after)
+        
+        raise RuntimeError(f"Rate limited after {Config.BROADCAST_MAX_RETRIES} retries")
+    
+    def _needs_photo_upload(self, broadcast: Dict) -> bool:
+        """Check whether the broadcast image has no Telegram file_id yet"""
+        return (broadcast['message_type'] == 'photo' and bool(broadcast['image_path'])
+                and not broadcast['photo_file_id'])
+    
+    async def _send_and_store_photo(self, telegram_id: int, broadcast: Dict) -> bool:
+        """Upload the broadcast image with the first send and keep its file_id"""
+        success = await self._send_single_message(
+            telegram_id,
+            broadcast['message_text'],
+            broadcast['message_type'],
+            broadcast['image_path']
+        )
+        
+        file_id = self._photo_file_ids.get(broadcast['image_path'])
+        if success and file_id:
+            broadcast['photo_file_id'] = file_id
+            
+            await self.db_manager.aio.write(lambda conn: conn.execute("""
+                UPDATE broadcasts SET photo_file_id = ? WHERE id = ?
+            """, [file_id, broadcast['id']]))
+            logger.info(f"Stored photo file_id for broadcast {broadcast['id']}")
         
-        result = {
-            'broadcast_id': broadcast_id,
-            'total_recipients': len(recipients),
-            'sent_count': sent_count,
-            'failed_count': failed_count,
-            'success_rate': (sent_count / len(recipients) * 100) if recipients else 0
-        }
+        return success
+    
+    def _find_photo_file_id(self, image_path: str) -> Optional[str]:
+        """Find a file_id from an earlier upload of the same image"""
+        if image_path in self._photo_file_ids:
+            return self._photo_file_ids[image_path]
         
-        logger.info(f"Broadcast {broadcast_id} completed: {sent_count} sent, {failed_count} failed")
-        return result
+        conn = self.db_manager.connect()
+        result = conn.execute("""
+            SELECT photo_file_id FROM broadcasts
+            WHERE image_path = ? AND photo_file_id IS NOT NULL
+            ORDER BY created_at DESC
+            LIMIT 1
+        """, [image_path]).fetchone()
+        
+        return result[0] if result else None
     
     async def _send_single_message(self, telegram_id: int, message_text: str,
-                                 message_type: str, image_path: str = None) -> bool:
+                                 message_type: str, image_path: str = None,
+                                 photo_file_id: str = None) -> bool:
         """Send single message to user"""
         try:
             if message_type == 'photo' and image_path:
-                from aiogram.types import FSInputFile
-                photo = FSInputFile(image_path)
-                await self.bot.send_photo(
-                    chat_id=telegram_id,
-                    photo=photo,
-                    caption=message_text
-                )
+                if photo_file_id:
+                    # Already on Telegram servers, no upload needed
+                    await self.bot.send_photo(
+                        chat_id=telegram_id,
+                        photo=photo_file_id,
+                        caption=message_text
+                    )
+                else:
+                    from aiogram.types import FSInputFile
+                    photo = FSInputFile(image_path)
+                    sent_message = await self.bot.send_photo(
+                        chat_id=telegram_id,
+                        photo=photo,
+                        caption=message_text
+                    )
+                    if sent_message.photo:
+                        self._photo_file_ids[image_path] = sent_message.photo[-1].file_id
             else:
                 await self.bot.send_message(
                     chat_id=telegram_id,
@@ -206,10 +624,9 @@ class BroadcastSystem:
             
             return True
             
-        except TelegramForbiddenError:
-            # User blocked the bot
-            logger.warning(f"User {telegram_id} blocked the bot")
-            return False
+        except (TelegramRetryAfter, TelegramForbiddenError):
+            # Handled by the caller, which owns the rate limiter and suppression list
+            raise
         except TelegramBadRequest as e:
             # Invalid user ID or other error
             logger.warning(f"Bad request for user {telegram_id}: {e}")
@@ -229,6 +646,22 @@ class BroadcastSystem:
         columns = [desc[0] for desc in conn.description]
         return [dict(zip(columns, row)) for row in results]
     
+    def get_broadcast_page(self, after: str = None, before: str = None, limit: int = None) -> Page:
+        """Get one page of broadcasts, newest first"""
+        return fetch_page(
+            self.db_manager.connect(), "*", "broadcasts", [], [],
+            key=('created_at', 'id'), key_fields=('created_at', 'id'),
+            after=after, before=before, limit=limit
+        )
+    
+    def get_broadcast_status_counts(self) -> Dict[str, int]:
+        """Count broadcasts by status"""
+        conn = self.db_manager.connect()
+        results = conn.execute("""
+            SELECT status, COUNT(*) FROM broadcasts GROUP BY status
+        """).fetchall()
+        return {row[0]: row[1] for row in results}
+    
     def get_broadcast_details(self, broadcast_id: str) -> Optional[Dict]:
         """Get detailed broadcast information"""
         conn = self.db_manager.connect()
@@ -280,46 +713,74 @@ class BroadcastSystem:
         columns = [desc[0] for desc in conn.description]
         return [dict(zip(columns, row)) for row in results]
     
+    def get_broadcast_recipients_page(self, broadcast_id: str, status: str = None, after: str = None,
+                                      before: str = None, limit: int = None) -> Page:
+        """Get one page of a broadcast's recipients, most recently sent first"""
+        conditions, params = ["br.broadcast_id = ?"], [broadcast_id]
+        if status:
+            conditions.append("br.status = ?")
+            params.append(status)
+        
+        # Unsent recipients have no sent_at; they sort last, as in get_broadcast_recipients
+        return fetch_page(
+            self.db_manager.connect(), f"br.*, p.full_name, p.username, {RECIPIENT_SENT_ORDER} AS sent_order",
+            "broadcast_recipients br LEFT JOIN participants p ON br.participant_id = p.id",
+            conditions, params,
+            key=(RECIPIENT_SENT_ORDER, 'br.id'), key_fields=('sent_order', 'id'),
+            after=after, before=before, limit=limit
+        )
+    
+    def count_broadcast_recipients(self, broadcast_id: str, status: str = None) -> int:
+        """Count recipients of a broadcast with optional status filter"""
+        conn = self.db_manager.connect()
+        query = "SELECT COUNT(*) FROM broadcast_recipients WHERE broadcast_id = ?"
+        params = [broadcast_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        return conn.execute(query, params).fetchone()[0]
+    
     def cancel_broadcast(self, broadcast_id: str) -> bool:
         """Cancel pending broadcast"""
-        conn = self.db_manager.connect()
-        
-        # Check if broadcast can be cancelled
-        broadcast = conn.execute("""
-            SELECT status FROM broadcasts WHERE id = ?
-        """, [broadcast_id]).fetchone()
+        def cancel(conn):
+            # Check if broadcast can be cancelled
+            broadcast = conn.execute("""
+                SELECT status FROM broadcasts WHERE id = ?
+            """, [broadcast_id]).fetchone()
+            
+            if not broadcast or broadcast[0] in ['completed', 'cancelled']:
+                return False
+            
+            # Cancel broadcast
+            conn.execute("""
+                UPDATE broadcasts SET status = 'cancelled' WHERE id = ?
+            """, [broadcast_id])
+            
+            # Cancel pending recipients
+            conn.execute("""
+                UPDATE broadcast_recipients 
+                SET status = 'cancelled' 
+                WHERE broadcast_id = ? AND status = 'pending'
+            """, [broadcast_id])
+            return True
         
-        if not broadcast or broadcast[0] in ['completed', 'cancelled']:
+        if not self.db_manager.write(cancel):
             return False
         
-        # Cancel broadcast
-        conn.execute("""
-            UPDATE broadcasts SET status = 'cancelled' WHERE id = ?
-        """, [broadcast_id])
-        
-        # Cancel pending recipients
-        conn.execute("""
-            UPDATE broadcast_recipients 
-            SET status = 'cancelled' 
-            WHERE broadcast_id = ? AND status = 'pending'
-        """, [broadcast_id])
+        self._refresh_schedule(broadcast_id, None)
         
         logger.info(f"Broadcast {broadcast_id} cancelled")
         return True
     
     def update_broadcast(self, broadcast_id: str, title: str = None, 
-                        message_text: str = None, target_audience: str = None) -> bool:
-        """Update broadcast details (only for draft broadcasts)"""
-        conn = self.db_manager.connect()
-        
-        # Check if broadcast can be updated
-        broadcast = conn.execute("""
-            SELECT status FROM broadcasts WHERE id = ?
-        """, [broadcast_id]).fetchone()
-        
-        if not broadcast or broadcast[0] != 'draft':
-            return False
+                        message_text: str = None, target_audience: str = None,
+                        scheduled_at: datetime = None) -> bool:
+        """
+        Update broadcast details (only for draft broadcasts)
         
+        Fields left as None are kept. Pass scheduled_at=CLEAR_SCHEDULE to
+        remove the schedule, so the broadcast is only sent by hand.
+        """
         # Build update query dynamically
         updates = []
         params = []
@@ -335,65 +796,121 @@ class BroadcastSystem:
         if target_audience is not None:
             updates.append('target_audience = ?')
             params.append(target_audience)
+        
+        if scheduled_at is CLEAR_SCHEDULE:
+            updates.append('scheduled_at = NULL')
+        elif scheduled_at is not None:
+            updates.append('scheduled_at = ?')
+            params.append(scheduled_at)
+        
+        def update(conn):
+            # Check if broadcast can be updated
+            broadcast = conn.execute("""
+                SELECT status FROM broadcasts WHERE id = ?
+            """, [broadcast_id]).fetchone()
             
-            # Update recipients if target audience changed
-            recipients = self._get_target_recipients(target_audience)
-            total_recipients = len(recipients)
+            if not broadcast or broadcast[0] != 'draft':
+                return False
             
+            if not updates:
+                return True  # Nothing to update
+            
+            # Execute update
+            query = f"UPDATE broadcasts SET {', '.join(updates)} WHERE id = ?"
+            conn.execute(query, params + [broadcast_id])
+            return True
+        
+        def rebuild_recipients(conn):
             # Delete old recipients
             conn.execute("""
                 DELETE FROM broadcast_recipients WHERE broadcast_id = ?
             """, [broadcast_id])
             
-            # Insert new recipients
-            for participant in recipients:
-                import uuid
-                recipient_id = str(uuid.uuid4())
-                conn.execute("""
-                    INSERT INTO broadcast_recipients
-                    (id, broadcast_id, participant_id, telegram_id)
-                    VALUES (?, ?, ?, ?)
-                """, [recipient_id, broadcast_id, participant.get('id'), participant['telegram_id']])
-            
-            updates.append('total_recipients = ?')
-            params.append(total_recipients)
+            # Rebuild recipients for the new audience (also refreshes total_recipients)
+            self._materialize_recipients(conn, broadcast_id, target_audience)
         
-        if not updates:
-            return True  # Nothing to update
+        if not self.db_manager.write(update):
+            return False
         
-        # Execute update
-        params.append(broadcast_id)
-        query = f"UPDATE broadcasts SET {', '.join(updates)} WHERE id = ?"
-        conn.execute(query, params)
+        # Recipients are rewritten in a separate transaction from the
+        # broadcast row (see create_broadcast)
+        if target_audience is not None:
+            self.db_manager.write(rebuild_recipients)
+        
+        if scheduled_at is CLEAR_SCHEDULE:
+            self._refresh_schedule(broadcast_id, None)
+        elif scheduled_at is not None:
+            self._refresh_schedule(broadcast_id, scheduled_at)
         
         logger.info(f"Broadcast {broadcast_id} updated")
         return True
     
     def delete_broadcast(self, broadcast_id: str) -> bool:
         """Delete broadcast (only draft or completed broadcasts)"""
-        conn = self.db_manager.connect()
-        
-        # Check if broadcast can be deleted
-        broadcast = conn.execute("""
-            SELECT status FROM broadcasts WHERE id = ?
-        """, [broadcast_id]).fetchone()
+        def delete(conn):
+            # Check if broadcast can be deleted
+            broadcast = conn.execute("""
+                SELECT status FROM broadcasts WHERE id = ?
+            """, [broadcast_id]).fetchone()
+            
+            if not broadcast or broadcast[0] == 'sending':
+                return False  # Can't delete broadcasts being sent
+            
+            # Delete recipients first (foreign key constraint)
+            conn.execute("""
+                DELETE FROM broadcast_recipients WHERE broadcast_id = ?
+            """, [broadcast_id])
+            
+            # Delete broadcast
+            conn.execute("""
+                DELETE FROM broadcasts WHERE id = ?
+            """, [broadcast_id])
+            return True
         
-        if not broadcast or broadcast[0] == 'sending':
-            return False  # Can't delete broadcasts being sent
+        if not self.db_manager.write(delete):
+            return False
         
-        # Delete recipients first (foreign key constraint)
-        conn.execute("""
-            DELETE FROM broadcast_recipients WHERE broadcast_id = ?
-        """, [broadcast_id])
-        
-        # Delete broadcast
-        conn.execute("""
-            DELETE FROM broadcasts WHERE id = ?
-        """, [broadcast_id])
+        self._refresh_schedule(broadcast_id, None)
         
         logger.info(f"Broadcast {broadcast_id} deleted")
         return True
     
+    # Suppression list
+    def get_suppressions(self, limit: int = 100) -> List[Dict]:
+        """Get chats excluded from broadcasts, newest first"""
+        conn = self.db_manager.connect()
+        
+        results = conn.execute("""
+            SELECT s.*, p.full_name, p.username
+            FROM broadcast_suppressions s
+            LEFT JOIN participants p ON s.telegram_id = p.telegram_id
+            ORDER BY s.created_at DESC
+            LIMIT ?
+        """, [limit]).fetchall()
+        
+        columns = [desc[0] for desc in conn.description]
+        return [dict(zip(columns, row)) for row in results]
+    
+    def count_suppressions(self) -> int:
+        """Count chats excluded from broadcasts"""
+        conn = self.db_manager.connect()
+        return conn.execute("SELECT COUNT(*) FROM broadcast_suppressions").fetchone()[0]
+    
+    def clear_suppressions(self, telegram_id: int = None) -> int:
+        """Remove one chat (or all chats if telegram_id is None) from the suppression list"""
+        def clear(conn):
+            if telegram_id is not None:
+                return conn.execute("""
+                    DELETE FROM broadcast_suppressions WHERE telegram_id = ?
+                """, [telegram_id]).fetchone()
+            return conn.execute("DELETE FROM broadcast_suppressions").fetchone()
+        
+        result = self.db_manager.write(clear)
+        
+        cleared = result[0] if result else 0
+        logger.info(f"Cleared {cleared} broadcast suppressions")
+        return cleared
+    
     def get_broadcast_templates(self) -> Dict[str, str]:
         """Get common broadcast message templates"""
         templates = {
@@ -0,0 +1,133 @@
+"""
+Background job runner for broadcast sending
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from utils.background import BackgroundLoop
+from utils.broadcast import BroadcastSystem
+
+logger = logging.getLogger(__name__)
+
+class BroadcastJobRunner:
+    """
+    Runs broadcast sends one at a time on a long-lived event loop
+
+    Every send goes through the runner, including broadcasts resumed after
+    a restart, so two sends never run at once.
+    """
+
+    # Finished jobs kept for progress lookups
+    MAX_FINISHED_JOBS = 100
+
+    def __init__(self, broadcast_system: BroadcastSystem, loop: BackgroundLoop = None):
+        self.broadcast_system = broadcast_system
+        self.loop = loop or BackgroundLoop('broadcast-jobs')
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Queue the broadcasts interrupted by a crash or restart"""
+        for broadcast_id in self.broadcast_system.prepare_interrupted_broadcasts():
+            self.enqueue(broadcast_id)
+
+    def enqueue(self, broadcast_id: str) -> str:
+        """
+        Queue a broadcast for sending
+
+        Returns:
+            Job ID for progress lookups
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            'job_id': job_id,
+            'broadcast_id': broadcast_id,
+            'status': 'queued',
+            'queued_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {'total': 0, 'sent': 0, 'failed': 0},
+            'result': None,
+            'error': None
+        }
+
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+            self._trim_finished_jobs()
+
+        self.loop.call_soon(self._put_job, job_id)
+        logger.info(f"Queued broadcast {broadcast_id} as job {job_id}")
+        return job_id
+
+    def _put_job(self, job_id: str) -> None:
+        """Add a job to the queue (runs on the loop thread)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._consumer = asyncio.get_running_loop().create_task(self._consume())
+        self._queue.put_nowait(job_id)
+
+    async def _consume(self) -> None:
+        """Run queued jobs one after another so sends never compete for the rate limit"""
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+            job['_started_monotonic'] = time.monotonic()
+
+            try:
+                job['result'] = await self.broadcast_system.send_broadcast(
+                    job['broadcast_id'], progress=job['progress']
+                )
+                job['status'] = 'completed'
+            except Exception as e:
+                logger.error(f"Broadcast job {job_id} failed: {e}")
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            finally:
+                job['finished_at'] = datetime.now().isoformat()
+                job['_finished_monotonic'] = time.monotonic()
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get job state with live sending rate and ETA"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        progress = dict(job['progress'])
+        processed = progress['sent'] + progress['failed']
+
+        rate = 0.0
+        eta_seconds = None
+        started = job.get('_started_monotonic')
+        if started is not None:
+            elapsed = job.get('_finished_monotonic', time.monotonic()) - started
+            if elapsed > 0:
+                rate = processed / elapsed
+            if rate > 0 and job['status'] == 'running':
+                eta_seconds = round(max(progress['total'] - processed, 0) / rate, 1)
+
+        state = {key: value for key, value in job.items() if not key.startswith('_')}
+        state['progress'] = progress
+        state['rate'] = round(rate, 2)
+        state['eta_seconds'] = eta_seconds
+        return state
+
+    def _trim_finished_jobs(self) -> None:
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] in ('completed', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
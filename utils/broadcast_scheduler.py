@@ -0,0 +1,116 @@
+"""
+Dispatcher for broadcasts scheduled for a later time
+"""
+
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.broadcast_jobs import BroadcastJobRunner
+
+logger = logging.getLogger(__name__)
+
+class BroadcastScheduler:
+    """
+    Fires scheduled broadcasts when their scheduled_at time comes
+
+    Next fire times are kept in a min-heap that is refreshed whenever a
+    broadcast is created, edited or cancelled, so the table is read only
+    once at startup. Due broadcasts go to the job runner, which sends them
+    one at a time, so campaigns scheduled close together never overlap
+    and share the rate limit.
+    """
+
+    def __init__(self, job_runner: BroadcastJobRunner):
+        self.job_runner = job_runner
+        self.loop = job_runner.loop
+        self._heap: List[Tuple[datetime, str]] = []
+        # Current fire time per broadcast; heap entries not matching it are stale
+        self._fire_times: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Load pending schedules and start the dispatch loop"""
+        conn = self.job_runner.broadcast_system.db_manager.connect()
+        results = conn.execute("""
+            SELECT id, scheduled_at FROM broadcasts
+            WHERE status = 'draft' AND scheduled_at IS NOT NULL
+        """).fetchall()
+
+        for broadcast_id, scheduled_at in results:
+            self.refresh(broadcast_id, scheduled_at)
+
+        self.loop.call_soon(self._start_dispatcher)
+        logger.info(f"Broadcast scheduler started with {len(results)} scheduled broadcasts")
+
+    def refresh(self, broadcast_id: str, scheduled_at: Optional[datetime]) -> None:
+        """
+        Set or clear the fire time of a broadcast
+
+        Args:
+            broadcast_id: Broadcast ID
+            scheduled_at: New fire time, or None to unschedule
+        """
+        with self._lock:
+            if scheduled_at is None:
+                self._fire_times.pop(broadcast_id, None)
+            else:
+                self._fire_times[broadcast_id] = scheduled_at
+                heapq.heappush(self._heap, (scheduled_at, broadcast_id))
+
+        if self._wakeup is not None:
+            self.loop.call_soon(self._wakeup.set)
+
+    def _start_dispatcher(self) -> None:
+        """Create the dispatch task (runs on the loop thread)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def _pop_due(self, now: datetime) -> Tuple[List[str], Optional[datetime]]:
+        """Remove due broadcasts from the heap and return them with the next fire time"""
+        due = []
+        with self._lock:
+            while self._heap:
+                fire_at, broadcast_id = self._heap[0]
+
+                if self._fire_times.get(broadcast_id) != fire_at:
+                    # Rescheduled or cancelled since this entry was pushed
+                    heapq.heappop(self._heap)
+                    continue
+
+                if fire_at > now:
+                    return due, fire_at
+
+                heapq.heappop(self._heap)
+                del self._fire_times[broadcast_id]
+                due.append(broadcast_id)
+
+        return due, None
+
+    async def _dispatch(self) -> None:
+        """Sleep until the earliest fire time, then queue every due broadcast"""
+        while True:
+            due, next_fire_at = self._pop_due(datetime.now())
+
+            for broadcast_id in due:
+                try:
+                    self.job_runner.enqueue(broadcast_id)
+                    logger.info(f"Scheduled broadcast {broadcast_id} dispatched")
+                except Exception as e:
+                    logger.error(f"Failed to dispatch scheduled broadcast {broadcast_id}: {e}")
+
+            self._wakeup.clear()
+            timeout = None
+            if next_fire_at is not None:
+                timeout = max((next_fire_at - datetime.now()).total_seconds(), 0)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -5,9 +5,13 @@ Lottery system with cryptographically secure random number generation
 import hashlib
 import secrets
 import logging
+import numpy as np
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from database.db_manager import DatabaseManager
+from utils.audit import check_snapshot
+from utils.merkle import build_levels, inclusion_proof, merkle_root
+from utils.selection import DEFAULT_ALGORITHM, SHA256_INDEX_V1, resolve_algorithm, select_winners, sha256_index
 
 logger = logging.getLogger(__name__)
 
@@ -43,87 +47,77 @@ class LotterySystem:
         Returns:
             Random number between 0 and max_value-1
         """
-        # Combine seed with index for multiple draws
-        combined = f"{seed}:{index}"
-        
-        # Create SHA-256 hash
-        hash_bytes = hashlib.sha256(combined.encode()).digest()
-        
-        # Convert first 8 bytes to integer
-        random_int = int.from_bytes(hash_bytes[:8], byteorder='big')
-        
-        # Return value in range [0, max_value)
-        return random_int % max_value
+        return sha256_index(seed, max_value, index)
     
-    def get_eligible_participants(self) -> List[Dict]:
-        """Get all approved participants eligible for lottery"""
-        participants = self.db_manager.get_all_participants(status='approved')
-        
-        # Filter out previous winners (if implementing single-win rule)
-        eligible = []
-        winners = self.db_manager.get_winners()
-        winner_ids = {winner['participant_id'] for winner in winners}
+    def get_eligible_participant_ids(self) -> np.ndarray:
+        """
+        Ids of the approved participants eligible for lottery, in draw order
         
-        for participant in participants:
-            if participant['id'] not in winner_ids:
-                eligible.append(participant)
+        Previous winners are excluded in SQL (single-win rule); winners are
+        selected by position in this array.
+        """
+        eligible = self.db_manager.get_eligible_participant_ids()
         
         logger.info(f"Found {len(eligible)} eligible participants")
         return eligible
     
-    def conduct_lottery(self, num_winners: int = 1, exclude_previous: bool = True) -> Dict:
+    def count_eligible_participants(self) -> int:
+        """Number of participants eligible for lottery"""
+        return self.db_manager.count_eligible_participants()
+    
+    def _snapshot(self, seed: str, algorithm: str, participant_ids) -> Dict:
+        """Frozen pool of a draw, stored with its winners"""
+        participant_ids = [str(participant_id) for participant_id in participant_ids]
+        return {
+            'seed': seed,
+            'algorithm': algorithm,
+            'participant_ids': participant_ids,
+            'merkle_root': merkle_root(participant_ids),
+        }
+    
+    def conduct_lottery(self, num_winners: int = 1, exclude_previous: bool = True,
+                        algorithm: str = DEFAULT_ALGORITHM) -> Dict:
         """
         Conduct fair lottery draw
         
         Args:
             num_winners: Number of winners to select
             exclude_previous: Whether to exclude previous winners
+            algorithm: Identifier of the selection algorithm (see utils.selection)
             
         Returns:
             Dictionary with lottery results
         """
-        participants = self.get_eligible_participants()
+        algorithm = resolve_algorithm(algorithm)
+        participant_ids = self.get_eligible_participant_ids()
         
-        if len(participants) == 0:
+        if len(participant_ids) == 0:
             raise ValueError("No eligible participants found")
         
-        if num_winners > len(participants):
-            raise ValueError(f"Cannot select {num_winners} winners from {len(participants)} participants")
+        if num_winners > len(participant_ids):
+            raise ValueError(f"Cannot select {num_winners} winners from {len(participant_ids)} participants")
         
         # Generate seed and hash
         seed, seed_hash = self.generate_seed()
         
-        # Select winners using deterministic algorithm
-        winners = []
-        remaining_participants = participants.copy()
+        # Select winners using deterministic algorithm; only the winners'
+        # rows are loaded
+        positions = select_winners(seed, len(participant_ids), num_winners, algorithm)
+        winners = self.db_manager.get_participants_by_ids([participant_ids[position] for position in positions])
         
-        for i in range(num_winners):
-            if not remaining_participants:
-                break
-            
-            # Generate random index
-            random_index = self.deterministic_random(seed, len(remaining_participants), i)
-            
-            # Select winner
-            winner = remaining_participants.pop(random_index)
-            winners.append(winner)
-            
-            logger.info(f"Selected winner {i+1}: {winner['full_name']} (index: {random_index})")
+        for i, (position, winner) in enumerate(zip(positions, winners)):
+            logger.info(f"Selected winner {i+1}: {winner['full_name']} (position: {position})")
         
-        # Save results to database
-        draw_number = len(self.db_manager.get_winners()) + 1
+        # Save results to database as the next draw, with the pool they were drawn from
+        snapshot = self._snapshot(seed, algorithm, participant_ids)
+        draw_number, winner_ids = self.db_manager.add_winners(
+            [winner['id'] for winner in winners], seed_hash, snapshot=snapshot
+        )
         
-        winner_records = []
-        for winner in winners:
-            winner_id = self.db_manager.add_winner(
-                participant_id=winner['id'],
-                seed_hash=seed_hash,
-                draw_number=draw_number
-            )
-            winner_records.append({
-                'winner_id': winner_id,
-                'participant': winner
-            })
+        winner_records = [
+            {'winner_id': winner_id, 'participant': winner}
+            for winner_id, winner in zip(winner_ids, winners)
+        ]
         
         # Prepare result
         result = {
@@ -132,16 +126,18 @@ class LotterySystem:
             'seed_hash': seed_hash,
             'seed': seed,  # Keep private! Only for verification
             'draw_number': draw_number,
-            'total_participants': len(participants),
+            'total_participants': len(participant_ids),
+            'participants_merkle_root': snapshot['merkle_root'],
             'winners': winner_records,
-            'algorithm': 'SHA-256 deterministic selection'
+            'algorithm': algorithm
         }
         
-        logger.info(f"Lottery completed: {len(winners)} winners selected from {len(participants)} participants")
+        logger.info(f"Lottery completed: {len(winners)} winners selected from {len(participant_ids)} participants")
         return result
     
     def verify_lottery_result(self, seed: str, seed_hash: str, 
-                            participants: List[Dict], winners: List[Dict]) -> bool:
+                            participants: List[Dict], winners: List[Dict],
+                            algorithm: str = None) -> bool:
         """
         Verify that lottery result is correct given the seed
         
@@ -150,6 +146,8 @@ class LotterySystem:
             seed_hash: Hash of the seed
             participants: List of participants at time of draw
             winners: Selected winners
+            algorithm: Selection algorithm recorded with the draw; callers
+                that predate the algorithm column get SHA256_INDEX_V1
             
         Returns:
             True if result is verified, False otherwise
@@ -162,16 +160,9 @@ class LotterySystem:
                 return False
             
             # Recreate the selection process
-            remaining_participants = participants.copy()
-            verified_winners = []
-            
-            for i in range(len(winners)):
-                if not remaining_participants:
-                    break
-                
-                random_index = self.deterministic_random(seed, len(remaining_participants), i)
-                winner = remaining_participants.pop(random_index)
-                verified_winners.append(winner)
+            positions = select_winners(seed, len(participants), len(winners),
+                                       algorithm or SHA256_INDEX_V1)
+            verified_winners = [participants[position] for position in positions]
             
             # Compare results
             winner_ids = {w['id'] for w in winners}
@@ -190,18 +181,73 @@ class LotterySystem:
             logger.error(f"Error during verification: {e}")
             return False
     
+    def verify_draw(self, seed_hash: str) -> bool:
+        """
+        Verify a draw or reroll from its stored snapshot alone
+        
+        Checks the seed against seed_hash, the pool against its Merkle root,
+        reruns the recorded algorithm over the pool to reproduce the
+        winners in their original order, and checks that the winner rows
+        of the draw are exactly those winners.
+        """
+        try:
+            snapshot = self.db_manager.get_draw_snapshot(seed_hash)
+            if not snapshot:
+                logger.error(f"No snapshot stored for draw {seed_hash}")
+                return False
+            
+            winner_rows = self.db_manager.get_draw_winner_participant_ids(seed_hash)
+            checks = check_snapshot(snapshot, seed_hash, winner_rows)
+            failed = [name for name, passed in checks.items() if not passed]
+            if failed:
+                logger.error(f"Draw {seed_hash} verification: FAILED ({', '.join(failed)})")
+                return False
+            
+            logger.info(f"Draw {seed_hash} verification: PASSED")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error during draw verification: {e}")
+            return False
+    
+    def get_inclusion_proof(self, seed_hash: str, participant_id: str) -> Optional[Dict]:
+        """
+        Proof that a participant was in the pool of a draw
+        
+        Anyone holding the published participants_merkle_root can check it
+        with utils.merkle.verify_inclusion in O(log N) hashes. Returns None
+        if the draw or the participant is not in the snapshots.
+        """
+        snapshot = self.db_manager.get_draw_snapshot(seed_hash)
+        if not snapshot:
+            return None
+        
+        participant_ids = snapshot['participant_ids']
+        try:
+            position = participant_ids.index(participant_id)
+        except ValueError:
+            return None
+        
+        return {
+            'seed_hash': seed_hash,
+            'participant_id': participant_id,
+            'position': position,
+            'proof': inclusion_proof(build_levels(participant_ids), position),
+            'participants_merkle_root': snapshot['merkle_root'],
+        }
+    
     def get_lottery_statistics(self) -> Dict:
         """Get lottery statistics"""
-        winners = self.db_manager.get_winners()
-        participants = self.db_manager.get_all_participants()
+        winners = self.db_manager.get_winners_columns()
+        total_participants = self.db_manager.count_participants()
         
         stats = {
-            'total_draws': len(set(w['draw_number'] for w in winners)),
+            'total_draws': len(np.unique(winners['draw_number'])),
             'total_winners': len(winners),
-            'total_participants': len(participants),
-            'eligible_participants': len(self.get_eligible_participants()),
-            'win_rate': len(winners) / len(participants) * 100 if participants else 0,
-            'last_draw_date': max([w['draw_date'] for w in winners]) if winners else None
+            'total_participants': total_participants,
+            'eligible_participants': self.count_eligible_participants(),
+            'win_rate': len(winners) / total_participants * 100 if total_participants else 0,
+            'last_draw_date': winners['draw_date'].max().item() if len(winners) else None
         }
         
         return stats
@@ -220,7 +266,7 @@ class LotterySystem:
                 raise ValueError("Failed to invalidate winner")
             
             # Get eligible participants (now includes the invalidated winner's participant)
-            eligible = self.get_eligible_participants()
+            eligible = self.get_eligible_participant_ids()
             
             if len(eligible) == 0:
                 raise ValueError("No eligible participants for reroll")
@@ -229,14 +275,15 @@ class LotterySystem:
             seed, seed_hash = self.generate_seed()
             
             # Select new winner
-            random_index = self.deterministic_random(seed, len(eligible), 0)
-            new_winner_participant = eligible[random_index]
+            position = select_winners(seed, len(eligible), 1, DEFAULT_ALGORITHM)[0]
+            new_winner_participant = self.db_manager.get_participant_by_id(eligible[position])
             
             # Save new winner to database
-            new_winner_id = self.db_manager.add_winner(
-                participant_id=new_winner_participant['id'],
-                seed_hash=seed_hash,
-                draw_number=winner['draw_number']  # Keep same draw number
+            snapshot = self._snapshot(seed, DEFAULT_ALGORITHM, eligible)
+            _, (new_winner_id,) = self.db_manager.add_winners(
+                [new_winner_participant['id']], seed_hash,
+                draw_number=winner['draw_number'],  # Keep same draw number
+                snapshot=snapshot
             )
             
             # Log the reroll action
@@ -258,6 +305,9 @@ class LotterySystem:
                 'seed_hash': seed_hash,
                 'seed': seed,
                 'draw_number': winner['draw_number'],
+                'total_participants': len(eligible),
+                'participants_merkle_root': snapshot['merkle_root'],
+                'algorithm': DEFAULT_ALGORITHM,
                 'reason': reason
             }
             
@@ -298,12 +348,14 @@ class LotterySystem:
             'seed_hash': result['seed_hash'],
             'draw_number': result['draw_number'],
             'total_participants': result['total_participants'],
+            'participants_merkle_root': result['participants_merkle_root'],
             'num_winners': len(result['winners']),
             'algorithm': result['algorithm'],
             'verification_instructions': {
                 'step1': 'Verify that SHA-256(seed) equals the published seed_hash',
                 'step2': 'Use the deterministic algorithm with the seed to reproduce results',
-                'step3': 'Compare your calculated winners with published results'
+                'step3': 'Compare your calculated winners with published results',
+                'step4': 'Check your inclusion proof against participants_merkle_root'
             }
         }
         
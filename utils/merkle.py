@@ -0,0 +1,64 @@
+"""
+Merkle commitment of an ordered list of participant ids
+
+Leaf i is SHA-256(0x00 || i as 8 big-endian bytes || id), so the root
+commits to every id and to its position in the list. An inner node is
+SHA-256(0x01 || left || right); a node without a sibling on its level is
+carried up unchanged.
+"""
+
+import hashlib
+from typing import Dict, List, Sequence
+
+def leaf_hash(position: int, participant_id: str) -> bytes:
+    return hashlib.sha256(b'\x00' + position.to_bytes(8, 'big') + participant_id.encode()).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+def build_levels(participant_ids: Sequence[str]) -> List[List[bytes]]:
+    """Every level of the tree, leaves first and the root level last"""
+    level = [leaf_hash(position, participant_id) for position, participant_id in enumerate(participant_ids)]
+    levels = [level]
+    while len(level) > 1:
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+        levels.append(level)
+    return levels
+
+def merkle_root(participant_ids: Sequence[str]) -> str:
+    """Hex root of the ids (the hash of nothing for an empty list)"""
+    if not participant_ids:
+        return hashlib.sha256(b'').hexdigest()
+    return build_levels(participant_ids)[-1][0].hex()
+
+def inclusion_proof(levels: List[List[bytes]], position: int) -> List[Dict[str, str]]:
+    """
+    Sibling hashes from leaf to root for the id at position
+
+    Each step is {'side': 'left' | 'right', 'hash': hex}, the side being
+    where the sibling goes when hashing the pair.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append({
+                'side': 'left' if sibling < position else 'right',
+                'hash': level[sibling].hex(),
+            })
+        position //= 2
+    return proof
+
+def verify_inclusion(participant_id: str, position: int, proof: List[Dict[str, str]], root: str) -> bool:
+    """Check that participant_id is at position in the list committed to by root"""
+    current = leaf_hash(position, participant_id)
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        if step['side'] == 'left':
+            current = node_hash(sibling, current)
+        else:
+            current = node_hash(current, sibling)
+    return current.hex() == root
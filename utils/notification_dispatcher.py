@@ -0,0 +1,67 @@
+"""
+Queued delivery of participant notifications on a long-lived event loop
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from config import Config
+from utils.background import BackgroundLoop
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class NotificationDispatcher:
+    """
+    Bounded notification queue drained by a fixed number of workers
+
+    Everything runs on one background loop, so the bot keeps a single
+    HTTP session instead of building one per request thread. Pass the
+    bot's shared bucket (rate_limiter.bot_bucket) so notifications and
+    broadcasts stay under Telegram's global limit together.
+    """
+
+    def __init__(self, loop: BackgroundLoop = None, workers: int = None,
+                 queue_size: int = None, bucket: TokenBucket = None):
+        self.loop = loop or BackgroundLoop('notifications')
+        self.workers = workers or Config.NOTIFICATION_WORKERS
+        self.queue_size = queue_size or Config.NOTIFICATION_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._bucket: Optional[TokenBucket] = bucket
+        self._worker_tasks = []
+
+    async def _start_workers(self) -> None:
+        """Create the queue and workers (runs on the loop thread)"""
+        if self._queue is not None:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._bucket is None:
+            self._bucket = TokenBucket(Config.BROADCAST_RATE_LIMIT)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.workers)
+        ]
+        logger.info(f"Notification dispatcher started with {self.workers} workers")
+
+    async def put(self, send: Callable[..., Awaitable], *args) -> None:
+        """Queue a notification from the loop thread, waiting while the queue is full"""
+        await self._start_workers()
+        await self._queue.put((send, args))
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all workers after a flood-control response (loop thread only)"""
+        if self._bucket is not None:
+            self._bucket.pause(seconds)
+
+    async def _worker(self, index: int) -> None:
+        """Send queued notifications one at a time"""
+        while True:
+            send, args = await self._queue.get()
+            try:
+                await self._bucket.acquire()
+                await send(*args)
+            except Exception as e:
+                logger.error(f"Notification worker {index} failed to send: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,141 @@
+"""
+Durable delivery of participant notifications from the notification_outbox table
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from config import Config
+from database.db_manager import DatabaseManager
+from utils.notification_dispatcher import NotificationDispatcher
+from utils.notifications import NotificationSystem
+
+logger = logging.getLogger(__name__)
+
+class NotificationOutbox:
+    """
+    Drains the notification outbox through the notification dispatcher
+
+    Notifications are written to the outbox in the same transaction as the
+    change that caused them, so a failed send or a restart never loses one.
+    Due rows are claimed in batches, sent by the dispatcher workers, and
+    their outcomes are written back in one statement. Failed sends are
+    retried with exponential back-off until NOTIFICATION_MAX_ATTEMPTS.
+    A batch whose outcomes could not be written is claimed again once its
+    NOTIFICATION_SENDING_TIMEOUT_SECONDS lease runs out.
+    Database calls go through db_manager.aio so they never block the loop
+    the notifications are sent from.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, notification_system: NotificationSystem,
+                 dispatcher: NotificationDispatcher):
+        self.db_manager = db_manager
+        self.notification_system = notification_system
+        self.dispatcher = dispatcher
+        self.loop = dispatcher.loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start draining, after requeueing notifications interrupted by a restart"""
+        self.loop.call_soon(self._start_drain)
+
+    def wake(self) -> None:
+        """Ask the drain loop to look for new notifications right away"""
+        if self._wakeup is not None:
+            self.loop.call_soon(self._wakeup.set)
+
+    def _start_drain(self) -> None:
+        """Create the drain task (runs on the loop thread)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self) -> None:
+        """Deliver due notifications batch by batch, then wait for new ones"""
+        try:
+            reset = await self.db_manager.aio.reset_stuck_notifications()
+            if reset:
+                logger.info(f"Requeued {reset} interrupted notifications")
+        except Exception as e:
+            logger.error(f"Failed to requeue interrupted notifications: {e}")
+
+        while True:
+            self._wakeup.clear()
+            claimed = 0
+            try:
+                claimed = await self._drain_batch()
+            except Exception as e:
+                logger.error(f"Notification outbox drain failed: {e}")
+
+            # A full batch means more rows are probably due
+            if claimed >= Config.NOTIFICATION_OUTBOX_BATCH:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), Config.NOTIFICATION_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _drain_batch(self) -> int:
+        """Claim one batch, send it through the dispatcher and record the outcomes"""
+        rows = await self.db_manager.aio.claim_due_notifications(Config.NOTIFICATION_OUTBOX_BATCH)
+        if not rows:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        results = []
+        for row in rows:
+            result = loop.create_future()
+            await self.dispatcher.put(self._deliver_one, row, result)
+            results.append(result)
+
+        outcomes = await asyncio.gather(*results)
+        await self.db_manager.aio.record_notification_outcomes(outcomes)
+
+        sent = sum(1 for outcome in outcomes if outcome[1] == 'sent')
+        logger.info(f"Notification outbox batch: {sent} of {len(rows)} delivered")
+        return len(rows)
+
+    async def _deliver_one(self, row: Dict, result: asyncio.Future) -> None:
+        """Send one notification and resolve result with its outcome tuple"""
+        try:
+            outcome = await self._send(row)
+        except Exception as e:
+            outcome = self._retry_outcome(row, str(e))
+        if not result.done():
+            result.set_result(outcome)
+
+    async def _send(self, row: Dict) -> Tuple:
+        """Send a notification and classify the result"""
+        attempts = row['attempts'] + 1
+        try:
+            await self.notification_system.deliver(row['telegram_id'], row['kind'], row['payload'])
+            return (row['id'], 'sent', attempts, None, None)
+
+        except TelegramForbiddenError:
+            logger.warning(f"User {row['telegram_id']} blocked the bot")
+            return (row['id'], 'failed', attempts, None, 'Bot was blocked by the user')
+        except TelegramBadRequest as e:
+            logger.warning(f"Bad request for user {row['telegram_id']}: {e}")
+            return (row['id'], 'failed', attempts, None, str(e))
+        except TelegramRetryAfter as e:
+            # Flood control is not the recipient's fault, so it does not use up an attempt
+            self.dispatcher.pause(e.retry_after)
+            next_attempt_at = datetime.now() + timedelta(seconds=e.retry_after)
+            return (row['id'], 'pending', row['attempts'], next_attempt_at, str(e))
+
+    def _retry_outcome(self, row: Dict, error: str) -> Tuple:
+        """Schedule another attempt with exponential back-off, or give up"""
+        attempts = row['attempts'] + 1
+        if attempts >= Config.NOTIFICATION_MAX_ATTEMPTS:
+            logger.error(f"Giving up on notification {row['id']} after {attempts} attempts: {error}")
+            return (row['id'], 'failed', attempts, None, error)
+
+        delay = min(Config.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+                    Config.NOTIFICATION_RETRY_MAX_SECONDS)
+        return (row['id'], 'pending', attempts, datetime.now() + timedelta(seconds=delay), error)
@@ -2,20 +2,117 @@
 Notification system for participant status updates
 """
 
-import asyncio
 import logging
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
-from typing import Optional
+from typing import Dict
 
 logger = logging.getLogger(__name__)
 
 class NotificationSystem:
     """System for sending notifications to participants"""
     
+    # Notification kinds stored in the outbox
+    STATUS_CHANGE = 'status_change'
+    SUPPORT_RESPONSE = 'support_response'
+    
     def __init__(self, bot: Bot):
         self.bot = bot
     
+    async def deliver(self, telegram_id: int, kind: str, payload: Dict) -> None:
+        """
+        Send an outbox notification, letting Telegram errors propagate
+        
+        Args:
+            telegram_id: Recipient's Telegram ID
+            kind: STATUS_CHANGE or SUPPORT_RESPONSE
+            payload: Arguments of the matching message builder
+        """
+        if kind == self.STATUS_CHANGE:
+            message = self.build_status_change_message(
+                payload['participant_name'], payload['new_status'], payload.get('admin_notes')
+            )
+        elif kind == self.SUPPORT_RESPONSE:
+            message = self.build_support_response_message(
+                payload['participant_name'], payload['ticket_number'], payload['response_text']
+            )
+        else:
+            raise ValueError(f"Unknown notification kind: {kind}")
+        
+        await self.bot.send_message(chat_id=telegram_id, text=message)
+        logger.info(f"{kind} notification sent to {telegram_id}")
+    
+    def build_approval_message(self, participant_name: str, admin_notes: str = None) -> str:
+        """Build approval notification text"""
+        message = (
+            f"🎉 Поздравляем, {participant_name}!\n\n"
+            "✅ Ваша заявка одобрена!\n\n"
+            "Вы успешно зарегистрированы в розыгрыше призов.\n"
+            "Следите за объявлением результатов в этом чате.\n\n"
+        )
+        
+        if admin_notes:
+            message += f"📝 Комментарий администратора:\n{admin_notes}\n\n"
+        
+        message += "Удачи! 🍀"
+        return message
+    
+    def build_rejection_message(self, participant_name: str, reason: str = None) -> str:
+        """Build rejection notification text"""
+        message = (
+            f"❌ {participant_name}, к сожалению, ваша заявка была отклонена.\n\n"
+        )
+        
+        if reason:
+            message += f"📝 Комментарий администратора:\n{reason}\n\n"
+        else:
+            message += (
+                "Возможные причины:\n"
+                "• Некорректные данные\n"
+                "• Неподходящее фото лифлета\n"
+                "• Нарушение правил участия\n\n"
+            )
+        
+        message += (
+            "🆘 Если у вас есть вопросы, обратитесь в техподдержку через кнопку '💬 Техподдержка' в главном меню.\n\n"
+            "Вы можете подать новую заявку, исправив указанные замечания."
+        )
+        return message
+    
+    def build_status_change_message(self, participant_name: str, new_status: str,
+                                    admin_notes: str = None) -> str:
+        """Build status change notification text for any status"""
+        if new_status == 'approved':
+            return self.build_approval_message(participant_name, admin_notes)
+        elif new_status == 'rejected':
+            return self.build_rejection_message(participant_name, admin_notes)
+        
+        # For pending or other statuses, build a generic notification
+        status_text = {
+            'pending': '⏳ На рассмотрении'
+        }.get(new_status, new_status)
+        
+        message = (
+            f"📋 {participant_name}, статус вашей заявки изменен.\n\n"
+            f"Новый статус: {status_text}\n\n"
+        )
+        
+        if admin_notes:
+            message += f"📝 Комментарий администратора:\n{admin_notes}\n\n"
+        
+        message += "Проверить актуальный статус можно через кнопку '📋 Мой статус' в главном меню."
+        return message
+    
+    def build_support_response_message(self, participant_name: str, ticket_number: str,
+                                       response_text: str) -> str:
+        """Build support response notification text"""
+        return (
+            f"💬 {participant_name}, вы получили ответ на обращение!\n\n"
+            f"🎫 Обращение №{ticket_number}\n\n"
+            f"📝 Ответ администратора:\n{response_text}\n\n"
+            f"🔄 Если у вас остались вопросы, обратитесь в техподдержку через кнопку '💬 Техподдержка'."
+        )
+    
     async def send_approval_notification(self, telegram_id: int, participant_name: str, admin_notes: str = None) -> bool:
         """
         Send approval notification to participant
@@ -29,21 +126,9 @@ class NotificationSystem:
             bool: True if sent successfully, False otherwise
         """
         try:
-            message = (
-                f"🎉 Поздравляем, {participant_name}!\n\n"
-                "✅ Ваша заявка одобрена!\n\n"
-                "Вы успешно зарегистрированы в розыгрыше призов.\n"
-                "Следите за объявлением результатов в этом чате.\n\n"
-            )
-            
-            if admin_notes:
-                message += f"📝 Комментарий администратора:\n{admin_notes}\n\n"
-            
-            message += "Удачи! 🍀"
-            
             await self.bot.send_message(
                 chat_id=telegram_id,
-                text=message
+                text=self.build_approval_message(participant_name, admin_notes)
             )
             
             logger.info(f"Approval notification sent to {telegram_id}")
@@ -72,28 +157,9 @@ class NotificationSystem:
             bool: True if sent successfully, False otherwise
         """
         try:
-            message = (
-                f"❌ {participant_name}, к сожалению, ваша заявка была отклонена.\n\n"
-            )
-            
-            if reason:
-                message += f"📝 Комментарий администратора:\n{reason}\n\n"
-            else:
-                message += (
-                    "Возможные причины:\n"
-                    "• Некорректные данные\n"
-                    "• Неподходящее фото лифлета\n"
-                    "• Нарушение правил участия\n\n"
-                )
-            
-            message += (
-                "🆘 Если у вас есть вопросы, обратитесь в техподдержку через кнопку '💬 Техподдержка' в главном меню.\n\n"
-                "Вы можете подать новую заявку, исправив указанные замечания."
-            )
-            
             await self.bot.send_message(
                 chat_id=telegram_id,
-                text=message
+                text=self.build_rejection_message(participant_name, reason)
             )
             
             logger.info(f"Rejection notification sent to {telegram_id}")
@@ -130,23 +196,9 @@ class NotificationSystem:
         else:
             # For pending or other statuses, send a generic notification
             try:
-                status_text = {
-                    'pending': '⏳ На рассмотрении'
-                }.get(new_status, new_status)
-                
-                message = (
-                    f"📋 {participant_name}, статус вашей заявки изменен.\n\n"
-                    f"Новый статус: {status_text}\n\n"
-                )
-                
-                if admin_notes:
-                    message += f"📝 Комментарий администратора:\n{admin_notes}\n\n"
-                
-                message += "Проверить актуальный статус можно через кнопку '📋 Мой статус' в главном меню."
-                
                 await self.bot.send_message(
                     chat_id=telegram_id,
-                    text=message
+                    text=self.build_status_change_message(participant_name, new_status, admin_notes)
                 )
                 
                 logger.info(f"Status change notification sent to {telegram_id}")
@@ -171,16 +223,9 @@ class NotificationSystem:
             bool: True if sent successfully, False otherwise
         """
         try:
-            message = (
-                f"💬 {participant_name}, вы получили ответ на обращение!\n\n"
-                f"🎫 Обращение №{ticket_number}\n\n"
-                f"📝 Ответ администратора:\n{response_text}\n\n"
-                f"🔄 Если у вас остались вопросы, обратитесь в техподдержку через кнопку '💬 Техподдержка'."
-            )
-            
             await self.bot.send_message(
                 chat_id=telegram_id,
-                text=message
+                text=self.build_support_response_message(participant_name, ticket_number, response_text)
             )
             
             logger.info(f"Support response notification sent to {telegram_id} for ticket {ticket_number}")
@@ -0,0 +1,99 @@
+"""
+Rate limiting primitives for Telegram message sending
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Global token bucket shared by all sending workers"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: Tokens added per second (messages per second)
+            capacity: Maximum burst size (defaults to one second of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Add tokens accumulated since the last refill"""
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                # Whole bucket is paused after a flood-control response
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds"""
+        resume_at = time.monotonic() + seconds
+        if resume_at > self._paused_until:
+            self._paused_until = resume_at
+            # Do not let tokens pile up while paused
+            self._tokens = 0
+            self._updated_at = resume_at
+
+
+_bot_buckets: Dict[str, TokenBucket] = {}
+_bot_buckets_lock = threading.Lock()
+
+
+def bot_bucket(bot, rate: float) -> TokenBucket:
+    """
+    The token bucket shared by everything sent with a bot's token
+
+    Telegram's global limit applies per token, so broadcasts and
+    notifications must draw from the same bucket (and the same flood-control
+    pause). The bucket is used from one event loop only.
+    """
+    key = getattr(bot, 'token', None) or str(id(bot))
+    with _bot_buckets_lock:
+        bucket = _bot_buckets.get(key)
+        if bucket is None:
+            bucket = _bot_buckets[key] = TokenBucket(rate)
+        return bucket
+
+
+class ChatRateLimiter:
+    """Minimum interval between messages to the same chat"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_allowed: Dict[int, float] = {}
+
+    async def wait(self, chat_id: int) -> None:
+        """Wait until the chat may receive another message and reserve the slot"""
+        now = time.monotonic()
+        allowed_at = self._next_allowed.get(chat_id, now)
+        self._next_allowed[chat_id] = max(allowed_at, now) + self.min_interval
+
+        if allowed_at > now:
+            await asyncio.sleep(allowed_at - now)
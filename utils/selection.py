@@ -0,0 +1,160 @@
+"""
+Deterministic winner selection algorithms
+
+Each algorithm is registered under an identifier that is recorded with the
+draw, so a draw can always be re-verified with the algorithm it used.
+"""
+
+import hashlib
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Draw index i removes the participant at position
+# SHA-256(f"{seed}:{i}")[:8] mod len(remaining) from the remaining list
+SHA256_INDEX_V1 = 'sha256-index-v1'
+
+# Draw index i removes the participant at position r_i from the remaining
+# list, where r_i is uniform in [0, len(remaining)): 64-bit words are read
+# from the counter-mode stream SHA-256(seed || ":" || block as 8 big-endian
+# bytes), four big-endian words per block, and a word w is used for r_i only
+# if w - (w mod m) <= 2**64 - m (otherwise the next word is tried), which
+# removes the bias of reducing modulo m
+SHA256_CTR_V2 = 'sha256-ctr-v2'
+
+# Identifier recorded by draws made before algorithms were versioned
+LEGACY_ALGORITHM_NAMES = {
+    'SHA-256 deterministic selection': SHA256_INDEX_V1,
+}
+
+def sha256_index(seed: str, max_value: int, index: int = 0) -> int:
+    """Random number in [0, max_value) derived from the seed and draw index"""
+    hash_bytes = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(hash_bytes[:8], byteorder='big') % max_value
+
+class _RemainingPositions:
+    """
+    Fenwick tree over positions 0..size-1 that are still in the draw
+
+    Finding the r-th remaining position and removing it both take
+    O(log size), instead of O(size) for list.pop().
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # With every position present, node i covers lowbit(i) positions
+        nodes = np.arange(size + 1)
+        self._tree = (nodes & -nodes).tolist()
+        self._top = 1 << (size.bit_length() - 1) if size else 0
+
+    def pop(self, rank: int) -> int:
+        """Remove and return the position that has rank remaining positions before it"""
+        tree = self._tree
+        node, remaining = 0, rank + 1
+        step = self._top
+        while step:
+            candidate = node + step
+            if candidate <= self.size and tree[candidate] < remaining:
+                node = candidate
+                remaining -= tree[candidate]
+            step >>= 1
+
+        position = node
+        node += 1
+        while node <= self.size:
+            tree[node] -= 1
+            node += node & -node
+        return position
+
+def select_sha256_index_v1(seed: str, population: int, count: int) -> List[int]:
+    """Positions of the winners in the order drawn by SHA256_INDEX_V1"""
+    remaining = _RemainingPositions(population)
+    return [
+        remaining.pop(sha256_index(seed, population - i, i))
+        for i in range(min(count, population))
+    ]
+
+class CounterStream:
+    """64-bit words of the SHA256_CTR_V2 stream of a seed, generated in batches"""
+
+    WORDS_PER_BLOCK = 4
+
+    def __init__(self, seed: str):
+        self._prefix = hashlib.sha256(f"{seed}:".encode())
+        self._block = 0
+
+    def words(self, count: int) -> np.ndarray:
+        """The next count words (rounded up to whole blocks) as uint64"""
+        blocks = -(-count // self.WORDS_PER_BLOCK)
+        digests = []
+        for block in range(self._block, self._block + blocks):
+            digest = self._prefix.copy()
+            digest.update(block.to_bytes(8, 'big'))
+            digests.append(digest.digest())
+        self._block += blocks
+        return np.frombuffer(b''.join(digests), dtype='>u8').astype(np.uint64)
+
+def sha256_ctr_ranks(seed: str, population: int, count: int) -> np.ndarray:
+    """
+    Unbiased ranks r_0..r_{count-1} with r_i in [0, population - i)
+
+    Every rank is computed from one vectorized pass over a batch of words;
+    only a rejected word (probability below population / 2**64) shifts the
+    remaining ranks onto the following words.
+    """
+    ranks = np.empty(count, dtype=np.uint64)
+    bounds = np.arange(population, population - count, -1, dtype=np.uint64)
+    stream = CounterStream(seed)
+    words = np.empty(0, dtype=np.uint64)
+
+    done = 0
+    while done < count:
+        if len(words) < count - done:
+            words = np.concatenate([words, stream.words(count - done - len(words))])
+
+        pending_bounds = bounds[done:]
+        pending_words = words[:count - done]
+        remainders = pending_words % pending_bounds
+        # w - r <= 2**64 - m, with 2**64 - m computed as 0 - m in uint64
+        accepted = (pending_words - remainders) <= (np.uint64(0) - pending_bounds)
+
+        rejected = np.flatnonzero(~accepted)
+        usable = rejected[0] if len(rejected) else len(pending_bounds)
+        ranks[done:done + usable] = remainders[:usable]
+        done += usable
+        # The rejected word is skipped and the next word tried for that rank
+        words = words[usable + 1:] if len(rejected) else words[usable:]
+
+    return ranks
+
+def select_sha256_ctr_v2(seed: str, population: int, count: int) -> List[int]:
+    """Positions of the winners in the order drawn by SHA256_CTR_V2"""
+    count = min(count, population)
+    remaining = _RemainingPositions(population)
+    return [remaining.pop(int(rank)) for rank in sha256_ctr_ranks(seed, population, count)]
+
+ALGORITHMS: Dict[str, Callable[[str, int, int], List[int]]] = {
+    SHA256_INDEX_V1: select_sha256_index_v1,
+    SHA256_CTR_V2: select_sha256_ctr_v2,
+}
+
+DEFAULT_ALGORITHM = SHA256_CTR_V2
+
+def resolve_algorithm(name: str) -> str:
+    """Return the identifier of a registered algorithm, accepting legacy names"""
+    name = LEGACY_ALGORITHM_NAMES.get(name, name)
+    if name not in ALGORITHMS:
+        raise ValueError(f"Unknown selection algorithm: {name}")
+    return name
+
+def select_winners(seed: str, population: int, count: int, algorithm: str) -> List[int]:
+    """
+    Positions (into the ordered list of eligible participants) of the winners
+
+    Args:
+        seed: Secret seed of the draw
+        population: Number of eligible participants
+        count: Number of winners to draw
+        algorithm: Identifier of the selection algorithm
+    """
+    return ALGORITHMS[resolve_algorithm(algorithm)](seed, population, count)
@@ -5,14 +5,21 @@ Flask web application for admin panel
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, session
 from werkzeug.security import check_password_hash, generate_password_hash
 from functools import wraps
+import atexit
 import os
 import logging
 from datetime import datetime
 from database.db_manager import DatabaseManager
 from config import Config
 from utils.lottery import LotterySystem
-from utils.broadcast import BroadcastSystem
+from utils.broadcast import CLEAR_SCHEDULE, BroadcastSystem
+from utils.broadcast_jobs import BroadcastJobRunner
+from utils.broadcast_scheduler import BroadcastScheduler
 from utils.notifications import NotificationSystem
+from utils.notification_dispatcher import NotificationDispatcher
+from utils.notification_outbox import NotificationOutbox
+from utils.background import BackgroundLoop
+from utils.rate_limiter import bot_bucket
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +39,30 @@ def create_app():
     # Initialize Bot for broadcast system and notifications
     from aiogram import Bot
     bot = Bot(token=Config.BOT_TOKEN)
+    
+    # All bot traffic runs on one long-lived loop so the bot keeps one HTTP session
+    background_loop = BackgroundLoop('admin-panel')
     broadcast_system = BroadcastSystem(db_manager, bot)
+    broadcast_jobs = BroadcastJobRunner(broadcast_system, background_loop)
+    broadcast_jobs.start()
+    broadcast_scheduler = BroadcastScheduler(broadcast_jobs)
+    broadcast_system.scheduler = broadcast_scheduler
+    broadcast_scheduler.start()
+    notification_dispatcher = NotificationDispatcher(
+        background_loop, bucket=bot_bucket(bot, Config.BROADCAST_RATE_LIMIT)
+    )
     notification_system = NotificationSystem(bot)
+    notification_outbox = NotificationOutbox(db_manager, notification_system, notification_dispatcher)
+    notification_outbox.start()
+    
+    def shutdown():
+        """Stop background sending, then close the database (runs at exit)"""
+        background_loop.stop()
+        db_manager.close()
+    
+    # Also called by main.py before it closes the databases
+    app.extensions['shutdown'] = shutdown
+    atexit.register(shutdown)
     
     # Simple admin authentication (in production use proper auth system)
     ADMIN_USERNAME = "admin"
@@ -67,6 +96,21 @@ def create_app():
             }
         }
     
+    def parse_scheduled_at(value):
+        """Parse a datetime-local form value, empty means send manually"""
+        if not value:
+            return None
+        return datetime.fromisoformat(value)
+    
+    def page_args():
+        """Keyset pagination parameters of the current request"""
+        limit = request.args.get('limit', type=int)
+        return {
+            'after': request.args.get('after') or None,
+            'before': request.args.get('before') or None,
+            'limit': limit,
+        }
+    
     def login_required(f):
         """Decorator for login required routes"""
         @wraps(f)
@@ -104,7 +148,7 @@ def create_app():
     def dashboard():
         """Main dashboard"""
         stats = db_manager.get_statistics()
-        recent_participants = db_manager.get_all_participants()[:10]  # Last 10
+        recent_participants = db_manager.get_participants_page(limit=10).items  # Last 10
         
         return render_template('dashboard.html', 
                              stats=stats, 
@@ -117,28 +161,25 @@ def create_app():
         status_filter = request.args.get('status', '')
         search = request.args.get('search', '')
         
-        try:
-            if status_filter:
-                participants_list = db_manager.get_all_participants(status=status_filter)
-            else:
-                participants_list = db_manager.get_all_participants()
-            
-            logger.info(f"Found {len(participants_list)} participants.")
-
-            # Simple search by name or phone
+        def load_page(**args):
             if search:
-                participants_list = [
-                    p for p in participants_list 
-                    if search.lower() in p['full_name'].lower() or 
-                       search in p['phone_number']
-                ]
+                return db_manager.search_participants(search, status=status_filter or None, **args)
+            return db_manager.get_participants_page(status=status_filter or None, **args)
+        
+        try:
+            page = load_page(**page_args())
+        except ValueError as e:
+            logger.warning(f"Bad participants page request: {e}")
+            page = load_page()
+            flash("Неверная ссылка на страницу, показана первая страница.", "info")
         except Exception as e:
             logger.error(f"Error fetching participants: {e}")
-            participants_list = []
+            page = None
             flash("Произошла ошибка при загрузке участников.", "error")
         
         return render_template('participants.html', 
-                             participants=participants_list,
+                             participants=page.items if page else [],
+                             page=page,
                              current_status=status_filter,
                              search_query=search)
     
@@ -171,49 +212,14 @@ def create_app():
             # In a real app, get admin_id from session
             admin_id = 123456789  # Placeholder
             
+            # Notification is written to the outbox together with the status
             success = db_manager.update_participant_status(
-                participant_id, new_status, admin_id, notes
+                participant_id, new_status, admin_id, notes, notify=True
             )
             
             if success:
                 flash(f'Статус обновлен на: {new_status}', 'success')
-                
-                # Send notification to participant
-                async def send_notification():
-                    try:
-                        await notification_system.send_status_change_notification(
-                            participant['telegram_id'],
-                            participant['full_name'],
-                            new_status,
-                            notes if notes else None
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send notification: {e}")
-                
-                # Run notification in background
-                import asyncio
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        # Create a new thread for the async notification
-                        import threading
-                        def run_notification():
-                            new_loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(new_loop)
-                            new_loop.run_until_complete(send_notification())
-                            new_loop.close()
-                        
-                        notification_thread = threading.Thread(target=run_notification)
-                        notification_thread.start()
-                    else:
-                        loop.run_until_complete(send_notification())
-                except RuntimeError:
-                    # No event loop, create a new one
-                    new_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(new_loop)
-                    new_loop.run_until_complete(send_notification())
-                    new_loop.close()
-                
+                notification_outbox.wake()
             else:
                 flash('Ошибка при обновлении статуса', 'error')
         else:
@@ -243,44 +249,19 @@ def create_app():
         
         admin_id = 123456789  # Placeholder
         success_count = 0
-        participants_to_notify = []
         
         for participant_id in participant_ids:
             # Get participant info before updating
             participant = db_manager.get_participant_by_id(participant_id)
             if participant:
                 success = db_manager.update_participant_status(
-                    participant_id, new_status, admin_id, notes
+                    participant_id, new_status, admin_id, notes, notify=True
                 )
                 if success:
                     success_count += 1
-                    participants_to_notify.append(participant)
-        
-        # Send notifications to all updated participants
-        if participants_to_notify:
-            async def send_mass_notifications():
-                for participant in participants_to_notify:
-                    try:
-                        await notification_system.send_status_change_notification(
-                            participant['telegram_id'],
-                            participant['full_name'],
-                            new_status,
-                            notes if notes else None
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send mass notification to {participant['telegram_id']}: {e}")
-            
-            # Run notifications in background
-            import asyncio
-            import threading
-            def run_mass_notifications():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                new_loop.run_until_complete(send_mass_notifications())
-                new_loop.close()
-            
-            notification_thread = threading.Thread(target=run_mass_notifications)
-            notification_thread.start()
+        
+        if success_count:
+            notification_outbox.wake()
         
         flash(f'Обновлено статусов: {success_count} из {len(participant_ids)}. Уведомления отправляются.', 'success')
         return redirect(url_for('participants'))
@@ -310,10 +291,8 @@ def create_app():
         import pandas as pd
         from io import BytesIO
         
-        participants = db_manager.get_all_participants()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(participants)
+        # Build the DataFrame straight from the column arrays
+        df = db_manager.get_all_participants_columns().to_pandas()
         
         # Create Excel file in memory
         output = BytesIO()
@@ -385,6 +364,12 @@ def create_app():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/cache_stats')
+    @login_required
+    def api_cache_stats():
+        """Get hit and miss counters of the participant cache"""
+        return jsonify({'participant_cache': db_manager.get_participant_cache_stats()})
+
     @app.route('/lottery')
     @login_required
     def lottery():
@@ -392,13 +377,11 @@ def create_app():
         lottery_stats = lottery_system.get_lottery_statistics()
         dashboard_stats = db_manager.get_statistics()  # For base template
         winners = db_manager.get_winners()
-        eligible = lottery_system.get_eligible_participants()
-        
         return render_template('lottery.html', 
                              lottery_stats=lottery_stats,
                              stats=dashboard_stats,  # For base template navigation
                              winners=winners,
-                             eligible_count=len(eligible))
+                             eligible_count=lottery_stats['eligible_participants'])
     
     @app.route('/lottery/conduct', methods=['POST'])
     @login_required
@@ -478,11 +461,10 @@ def create_app():
         """API endpoint for lottery statistics"""
         try:
             lottery_system = LotterySystem(db_manager)
-            eligible_participants = lottery_system.get_eligible_participants()
             stats = lottery_system.get_lottery_statistics()
             
             return jsonify({
-                'eligible_count': len(eligible_participants),
+                'eligible_count': stats['eligible_participants'],
                 'total_draws': stats['total_draws'],
                 'total_winners': stats['total_winners'],
                 'total_participants': stats['total_participants'],
@@ -491,16 +473,33 @@ def create_app():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/draws/<seed_hash>/inclusion/<participant_id>')
+    @login_required
+    def api_draw_inclusion(seed_hash, participant_id):
+        """Merkle proof that a participant was in the pool of a draw"""
+        proof = lottery_system.get_inclusion_proof(seed_hash, participant_id)
+        if proof is None:
+            return jsonify({'error': 'Participant is not in the snapshot of this draw'}), 404
+        return jsonify(proof)
+    
     @app.route('/broadcasts')
     @login_required
     def broadcasts():
         """Broadcast management page"""
-        broadcasts = broadcast_system.get_broadcast_list()
+        try:
+            page = broadcast_system.get_broadcast_page(**page_args())
+        except ValueError:
+            page = broadcast_system.get_broadcast_page()
+            flash("Неверная ссылка на страницу, показана первая страница.", "info")
         templates = broadcast_system.get_broadcast_templates()
+        suppressed_count = broadcast_system.count_suppressions()
         
         return render_template('broadcasts.html', 
-                             broadcasts=broadcasts,
-                             templates=templates)
+                             broadcasts=page.items,
+                             page=page,
+                             status_counts=broadcast_system.get_broadcast_status_counts(),
+                             templates=templates,
+                             suppressed_count=suppressed_count)
     
     @app.route('/broadcasts/create', methods=['POST'])
     @login_required
@@ -510,16 +509,21 @@ def create_app():
             title = request.form.get('title')
             message_text = request.form.get('message_text')
             target_audience = request.form.get('target_audience')
+            scheduled_at = parse_scheduled_at(request.form.get('scheduled_at'))
             admin_id = 123456789  # TODO: Get from session
             
             broadcast_id = broadcast_system.create_broadcast(
                 title=title,
                 message_text=message_text,
                 target_audience=target_audience,
-                created_by=admin_id
+                created_by=admin_id,
+                scheduled_at=scheduled_at
             )
             
-            flash(f'Broadcast created successfully! ID: {broadcast_id}', 'success')
+            if scheduled_at:
+                flash(f'Broadcast scheduled for {scheduled_at.strftime("%d.%m.%Y %H:%M")}! ID: {broadcast_id}', 'success')
+            else:
+                flash(f'Broadcast created successfully! ID: {broadcast_id}', 'success')
             
         except Exception as e:
             flash(f'Error creating broadcast: {str(e)}', 'error')
@@ -529,20 +533,35 @@ def create_app():
     @app.route('/broadcasts/<broadcast_id>/send', methods=['POST'])
     @login_required
     def send_broadcast(broadcast_id):
-        """Send a broadcast"""
+        """Queue a broadcast for sending in the background"""
         try:
-            import asyncio
+            job_id = broadcast_jobs.enqueue(broadcast_id)
             
-            # Run the async broadcast function
-            result = asyncio.run(broadcast_system.send_broadcast(broadcast_id))
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({
+                    'job_id': job_id,
+                    'status_url': url_for('api_broadcast_job', job_id=job_id)
+                }), 202
             
-            flash(f'Broadcast sent! {result["sent_count"]} messages delivered, {result["failed_count"]} failed.', 'success')
+            flash(f'Broadcast queued for sending! Job ID: {job_id}', 'success')
             
         except Exception as e:
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'error': str(e)}), 500
             flash(f'Error sending broadcast: {str(e)}', 'error')
         
         return redirect(url_for('broadcasts'))
     
+    @app.route('/api/broadcast_jobs/<job_id>')
+    @login_required
+    def api_broadcast_job(job_id):
+        """Get live progress of a broadcast sending job"""
+        job = broadcast_jobs.get_job(job_id)
+        if job:
+            return jsonify(job)
+        else:
+            return jsonify({'error': 'Job not found'}), 404
+    
     @app.route('/api/broadcast/<broadcast_id>')
     @login_required
     def api_get_broadcast(broadcast_id):
@@ -564,12 +583,14 @@ def create_app():
             title = request.form.get('title')
             message_text = request.form.get('message_text')
             target_audience = request.form.get('target_audience')
+            scheduled_at = parse_scheduled_at(request.form.get('scheduled_at'))
             
             success = broadcast_system.update_broadcast(
                 broadcast_id=broadcast_id,
                 title=title,
                 message_text=message_text,
-                target_audience=target_audience
+                target_audience=target_audience,
+                scheduled_at=scheduled_at
             )
             
             if success:
@@ -582,6 +603,34 @@ def create_app():
         
         return redirect(url_for('broadcasts'))
     
+    @app.route('/broadcasts/<broadcast_id>/cancel', methods=['POST'])
+    @login_required
+    def cancel_broadcast(broadcast_id):
+        """Cancel a draft, scheduled or sending broadcast"""
+        try:
+            if broadcast_system.cancel_broadcast(broadcast_id):
+                flash('Рассылка отменена', 'success')
+            else:
+                flash('Эту рассылку нельзя отменить', 'error')
+        except Exception as e:
+            flash(f'Ошибка при отмене рассылки: {str(e)}', 'error')
+        
+        return redirect(url_for('broadcasts'))
+    
+    @app.route('/broadcasts/<broadcast_id>/unschedule', methods=['POST'])
+    @login_required
+    def unschedule_broadcast(broadcast_id):
+        """Remove the schedule of a draft broadcast, keeping it as a draft"""
+        try:
+            if broadcast_system.update_broadcast(broadcast_id, scheduled_at=CLEAR_SCHEDULE):
+                flash('Запланированная отправка отменена', 'success')
+            else:
+                flash('Расписание этой рассылки нельзя изменить', 'error')
+        except Exception as e:
+            flash(f'Ошибка при отмене расписания: {str(e)}', 'error')
+        
+        return redirect(url_for('broadcasts'))
+    
     @app.route('/broadcasts/<broadcast_id>/delete', methods=['DELETE', 'POST'])
     @login_required
     def delete_broadcast(broadcast_id):
@@ -616,11 +665,19 @@ def create_app():
     def api_broadcast_recipients(broadcast_id):
         """Get broadcast recipients count"""
         try:
-            recipients = broadcast_system.get_broadcast_recipients(broadcast_id)
+            args = page_args()
+            # First 10 for preview unless a page size is requested
+            args['limit'] = args['limit'] or 10
+            status = request.args.get('status') or None
+            page = broadcast_system.get_broadcast_recipients_page(broadcast_id, status=status, **args)
             return jsonify({
-                'total_count': len(recipients),
-                'recipients': recipients[:10]  # First 10 for preview
+                'total_count': broadcast_system.count_broadcast_recipients(broadcast_id, status),
+                'recipients': page.items,
+                'next_cursor': page.next_cursor,
+                'prev_cursor': page.prev_cursor
             })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -630,23 +687,54 @@ def create_app():
         """Get recipient count for target audience"""
         try:
             audience = request.args.get('audience', 'all')
-            recipients = broadcast_system._get_target_recipients(audience)
             return jsonify({
-                'count': len(recipients),
+                'count': broadcast_system.count_target_recipients(audience),
                 'audience': audience
             })
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/broadcast_suppressions')
+    @login_required
+    def api_broadcast_suppressions():
+        """Get chats excluded from broadcasts because they blocked the bot"""
+        try:
+            limit = min(int(request.args.get('limit', 100)), 1000)
+            return jsonify({
+                'count': broadcast_system.count_suppressions(),
+                'suppressions': broadcast_system.get_suppressions(limit)
+            })
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/broadcasts/suppressions/clear', methods=['POST'])
+    @login_required
+    def clear_broadcast_suppressions():
+        """Clear one chat or the whole suppression list"""
+        try:
+            telegram_id = request.form.get('telegram_id')
+            cleared = broadcast_system.clear_suppressions(int(telegram_id) if telegram_id else None)
+            flash(f'Удалено из списка блокировок: {cleared}', 'success')
+        except Exception as e:
+            flash(f'Ошибка при очистке списка: {str(e)}', 'error')
+        
+        return redirect(url_for('broadcasts'))
+    
     @app.route('/support_tickets')
     @login_required
     def support_tickets():
         """Support tickets management page"""
         status_filter = request.args.get('status', '')
-        tickets = db_manager.get_support_tickets(status=status_filter if status_filter else None)
+        try:
+            page = db_manager.get_support_tickets_page(status=status_filter or None, **page_args())
+        except ValueError:
+            page = db_manager.get_support_tickets_page(status=status_filter or None)
+            flash("Неверная ссылка на страницу, показана первая страница.", "info")
         
         return render_template('support_tickets.html', 
-                             tickets=tickets,
+                             tickets=page.items,
+                             page=page,
+                             status_counts=db_manager.get_support_ticket_status_counts(),
                              current_status=status_filter)
     
     @app.route('/support_tickets/<ticket_id>')
@@ -675,37 +763,15 @@ def create_app():
             
             # Add admin response
             admin_id = 123456789  # TODO: Get from session
+            # Notification to the user is written to the outbox with the message
             db_manager.add_support_message(
                 ticket_id=ticket_id,
                 sender_id=admin_id,
                 sender_type='admin',
-                message_text=response_text
+                message_text=response_text,
+                notify=True
             )
-            
-            # Send notification to user
-            ticket = db_manager.get_support_ticket_by_id(ticket_id)
-            if ticket:
-                async def send_response_notification():
-                    try:
-                        await notification_system.send_support_response_notification(
-                            ticket['user_id'],
-                            ticket['ticket_number'],
-                            response_text
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send support response notification: {e}")
-                
-                # Run notification in background
-                import asyncio
-                import threading
-                def run_notification():
-                    new_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(new_loop)
-                    new_loop.run_until_complete(send_response_notification())
-                    new_loop.close()
-                
-                notification_thread = threading.Thread(target=run_notification)
-                notification_thread.start()
+            notification_outbox.wake()
             
             flash('Ответ отправлен!', 'success')
             
@@ -725,10 +791,7 @@ def create_app():
                 return redirect(url_for('support_ticket_detail', ticket_id=ticket_id))
             
             # Update ticket status in database
-            conn = db_manager.connect()
-            conn.execute("""
-                UPDATE support_tickets SET status = ? WHERE id = ?
-            """, [new_status, ticket_id])
+            db_manager.update_support_ticket_status(ticket_id, new_status)
             
             status_names = {
                 'open': 'Открыт',